@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from uuid import uuid4
+
+from redis import Redis
+from rq import Queue, SimpleWorker
+from rq.timeouts import TimerDeathPenalty
+from rq.worker import WorkerStatus
+
+from .config import load_app_config
+from .job_affinity import worker_queue_name
+from .preload import preload_worker_modules
+from .worker import (
+    configure_analysis_slots,
+    configure_message_cache,
+    forget_job_dispatched,
+    mark_job_dispatched,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentWorker(SimpleWorker):
+    """RQ worker that runs up to ``concurrency`` jobs at once on a thread pool.
+
+    Fetch jobs mostly wait on HTTP and ``interruptible_sleep``, so one process can
+    drive many of them. Every job still goes through ``perform_job``, which keeps
+    RQ's registries, timeouts and result handling intact. Signal based timeouts
+    only work on the main thread, hence ``TimerDeathPenalty``.
+    """
+
+    death_penalty_class = TimerDeathPenalty
+
+    def __init__(
+        self,
+        *args,
+        concurrency: int = 10,
+        private_queue: Optional[str] = None,
+        handoff_queue: Optional[str] = None,
+        **kwargs,
+    ) -> None:
+        self._thread_state = threading.local()
+        super().__init__(*args, **kwargs)
+        self._private_queue = private_queue
+        self._handoff_queue = handoff_queue
+        self.concurrency = max(1, int(concurrency))
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="rq-job"
+        )
+
+    # RQ keeps the running job's Execution on the worker; with several jobs in
+    # flight each thread needs its own.
+    @property
+    def execution(self):
+        return getattr(self._thread_state, "execution", None)
+
+    @execution.setter
+    def execution(self, value) -> None:
+        self._thread_state.execution = value
+
+    def dequeue_job_and_maintain_ttl(self, *args, **kwargs):
+        # Only take a job off the queue once a thread is free to run it, so
+        # queued jobs stay visible to other workers in the meantime.
+        while not self._slots.acquire(timeout=max(1, self.worker_ttl // 3)):
+            self.heartbeat()
+        try:
+            result = super().dequeue_job_and_maintain_ttl(*args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        if result is None:
+            self._slots.release()
+        return result
+
+    def execute_job(self, job, queue) -> None:
+        self.set_state(WorkerStatus.BUSY)
+        mark_job_dispatched(job.id)
+        self._executor.submit(self._perform_in_thread, job, queue)
+
+    def _perform_in_thread(self, job, queue) -> None:
+        try:
+            self.prepare_execution(job)
+            self.perform_job(job, queue)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Job %s crashed outside of perform_job handling", job.id)
+        finally:
+            forget_job_dispatched(job.id)
+            self._slots.release()
+
+    def teardown(self) -> None:
+        # Let running jobs finish before the worker unregisters itself.
+        self.shutdown_pool()
+        self._hand_off_private_jobs()
+        super().teardown()
+
+    def shutdown_pool(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _hand_off_private_jobs(self) -> None:
+        # Nobody else listens to the private queue, so its jobs move to the shared one.
+        if not self._private_queue or not self._handoff_queue:
+            return
+        private = Queue(self._private_queue, connection=self.connection)
+        shared = Queue(self._handoff_queue, connection=self.connection)
+        for job in private.get_jobs():
+            private.remove(job)
+            shared.enqueue_job(job)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="複数ジョブを並行実行する RQ ワーカー")
+    parser.add_argument("queues", nargs="*", help="監視するキュー名 (省略時は設定値)")
+    parser.add_argument("--concurrency", type=int, default=None, help="同時実行ジョブ数")
+    parser.add_argument("--burst", action="store_true", help="キューが空になったら終了")
+    args = parser.parse_args()
+
+    app_config = load_app_config()
+    redis_cfg = app_config["REDIS"]
+    worker_cfg = app_config["WORKER"]
+
+    connection = Redis.from_url(redis_cfg["url"])
+    queue_names = args.queues or [redis_cfg["fetch_queue_name"]]
+    worker_name = uuid4().hex
+    private_queue = None
+    interactive_queue = redis_cfg["interactive_queue_name"]
+    if interactive_queue in queue_names:
+        # Recomputes for pipelines this worker has in memory are routed here first.
+        private_queue = worker_queue_name(interactive_queue, worker_name)
+        queue_names = [private_queue, *queue_names]
+    queues = [Queue(name, connection=connection) for name in queue_names]
+
+    preload_worker_modules()
+    configure_analysis_slots(
+        worker_cfg["analysis_concurrency"], worker_cfg["interactive_analysis_concurrency"]
+    )
+    configure_message_cache(
+        worker_cfg["message_cache_mb"] * 1024 * 1024, worker_name, private_queue
+    )
+    worker = ConcurrentWorker(
+        queues,
+        name=worker_name,
+        connection=connection,
+        concurrency=args.concurrency or worker_cfg["concurrency"],
+        private_queue=private_queue,
+        handoff_queue=interactive_queue,
+    )
+    try:
+        worker.work(burst=args.burst)
+    finally:
+        worker.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,18 @@ def load_yaml_config(config_path: Path) -> Dict[str, Any]:
         return yaml.safe_load(fh) or {}
 
 
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
+def _repo_path(value: str) -> str:
+    # Relative paths in settings.yaml are relative to the repository, not the cwd.
+    path = Path(value)
+    return str(path if path.is_absolute() else BASE_DIR / path)
+
+
 def load_app_config(config_path: Path | None = None) -> Dict[str, Any]:
     load_dotenv(BASE_DIR / ".env")
     path = config_path or DEFAULT_CONFIG_PATH
@@ -49,6 +61,36 @@ def load_app_config(config_path: Path | None = None) -> Dict[str, Any]:
                     file_config.get("youtube", {}).get("parallel_segments", 1),
                 )
             ),
+            "fan_out_segments": _as_bool(
+                os.getenv(
+                    "YOUTUBE_FAN_OUT_SEGMENTS",
+                    file_config.get("youtube", {}).get("fan_out_segments", False),
+                )
+            ),
+            "metadata_ttl_seconds": int(
+                os.getenv(
+                    "YOUTUBE_METADATA_TTL_SECONDS",
+                    file_config.get("youtube", {}).get("metadata_ttl_seconds", 86400),
+                )
+            ),
+            "metadata_missing_ttl_seconds": int(
+                os.getenv(
+                    "YOUTUBE_METADATA_MISSING_TTL_SECONDS",
+                    file_config.get("youtube", {}).get("metadata_missing_ttl_seconds", 600),
+                )
+            ),
+            "metadata_live_ttl_seconds": int(
+                os.getenv(
+                    "YOUTUBE_METADATA_LIVE_TTL_SECONDS",
+                    file_config.get("youtube", {}).get("metadata_live_ttl_seconds", 60),
+                )
+            ),
+            "metadata_concurrency": int(
+                os.getenv(
+                    "YOUTUBE_METADATA_CONCURRENCY",
+                    file_config.get("youtube", {}).get("metadata_concurrency", 4),
+                )
+            ),
         },
         "CPS": {
             "bucket_size_seconds": float(
@@ -100,6 +142,36 @@ def load_app_config(config_path: Path | None = None) -> Dict[str, Any]:
             "queue_name": os.getenv(
                 "REDIS_QUEUE_NAME", file_config.get("redis", {}).get("queue_name", "analysis")
             ),
+            "interactive_queue_name": os.getenv(
+                "REDIS_INTERACTIVE_QUEUE_NAME",
+                file_config.get("redis", {}).get("interactive_queue_name", "interactive"),
+            ),
+            "fetch_queue_name": os.getenv(
+                "REDIS_FETCH_QUEUE_NAME",
+                file_config.get("redis", {}).get("fetch_queue_name", "fetch"),
+            ),
+            "batch_queue_name": os.getenv(
+                "REDIS_BATCH_QUEUE_NAME",
+                file_config.get("redis", {}).get("batch_queue_name", "batch"),
+            ),
+            "fetch_retries": int(
+                os.getenv(
+                    "REDIS_FETCH_RETRIES",
+                    file_config.get("redis", {}).get("fetch_retries", 2),
+                )
+            ),
+            "analysis_retries": int(
+                os.getenv(
+                    "REDIS_ANALYSIS_RETRIES",
+                    file_config.get("redis", {}).get("analysis_retries", 1),
+                )
+            ),
+            "retry_interval_seconds": int(
+                os.getenv(
+                    "REDIS_RETRY_INTERVAL_SECONDS",
+                    file_config.get("redis", {}).get("retry_interval_seconds", 30),
+                )
+            ),
             "job_timeout": int(
                 os.getenv(
                     "REDIS_JOB_TIMEOUT",
@@ -113,4 +185,240 @@ def load_app_config(config_path: Path | None = None) -> Dict[str, Any]:
                 )
             ),
         },
+        "RATE_LIMIT": {
+            "enabled": _as_bool(
+                os.getenv(
+                    "RATE_LIMIT_ENABLED",
+                    file_config.get("rate_limit", {}).get("enabled", False),
+                )
+            ),
+            "global_rate_per_second": float(
+                os.getenv(
+                    "RATE_LIMIT_GLOBAL_RATE_PER_SECOND",
+                    file_config.get("rate_limit", {}).get("global_rate_per_second", 20),
+                )
+            ),
+            "global_burst": float(
+                os.getenv(
+                    "RATE_LIMIT_GLOBAL_BURST",
+                    file_config.get("rate_limit", {}).get("global_burst", 20),
+                )
+            ),
+            "per_video_rate_per_second": float(
+                os.getenv(
+                    "RATE_LIMIT_PER_VIDEO_RATE_PER_SECOND",
+                    file_config.get("rate_limit", {}).get("per_video_rate_per_second", 5),
+                )
+            ),
+            "per_video_burst": float(
+                os.getenv(
+                    "RATE_LIMIT_PER_VIDEO_BURST",
+                    file_config.get("rate_limit", {}).get("per_video_burst", 5),
+                )
+            ),
+            "throttle_penalty_seconds": float(
+                os.getenv(
+                    "RATE_LIMIT_THROTTLE_PENALTY_SECONDS",
+                    file_config.get("rate_limit", {}).get("throttle_penalty_seconds", 5),
+                )
+            ),
+        },
+        "CHECKPOINT": {
+            "enabled": _as_bool(
+                os.getenv(
+                    "CHECKPOINT_ENABLED",
+                    file_config.get("checkpoint", {}).get("enabled", True),
+                )
+            ),
+            "interval_seconds": float(
+                os.getenv(
+                    "CHECKPOINT_INTERVAL_SECONDS",
+                    file_config.get("checkpoint", {}).get("interval_seconds", 30),
+                )
+            ),
+            "ttl_seconds": int(
+                os.getenv(
+                    "CHECKPOINT_TTL_SECONDS",
+                    file_config.get("checkpoint", {}).get("ttl_seconds", 86400),
+                )
+            ),
+        },
+        "ARCHIVE": {
+            "enabled": _as_bool(
+                os.getenv(
+                    "CHAT_ARCHIVE_ENABLED",
+                    file_config.get("archive", {}).get("enabled", True),
+                )
+            ),
+            "directory": _repo_path(
+                os.getenv(
+                    "CHAT_ARCHIVE_DIR",
+                    file_config.get("archive", {}).get("directory", "data/archive"),
+                )
+            ),
+        },
+        "HTTP_CACHE": {
+            "mode": os.getenv(
+                "HTTP_CACHE_MODE", file_config.get("http_cache", {}).get("mode", "off")
+            ),
+            "directory": _repo_path(
+                os.getenv(
+                    "HTTP_CACHE_DIR",
+                    file_config.get("http_cache", {}).get("directory", "data/http_cache"),
+                )
+            ),
+        },
+        "PYRAMID": {
+            "enabled": _as_bool(
+                os.getenv(
+                    "PYRAMID_ENABLED",
+                    file_config.get("pyramid", {}).get("enabled", True),
+                )
+            ),
+            "base_bucket_seconds": float(
+                os.getenv(
+                    "PYRAMID_BASE_BUCKET_SECONDS",
+                    file_config.get("pyramid", {}).get("base_bucket_seconds", 1),
+                )
+            ),
+            "max_tile_bins": int(
+                os.getenv(
+                    "PYRAMID_MAX_TILE_BINS",
+                    file_config.get("pyramid", {}).get("max_tile_bins", 4096),
+                )
+            ),
+        },
+        "RESPONSES": {
+            "gzip_min_bytes": int(
+                os.getenv(
+                    "RESPONSES_GZIP_MIN_BYTES",
+                    file_config.get("responses", {}).get("gzip_min_bytes", 1024),
+                )
+            ),
+            "cache_entries": int(
+                os.getenv(
+                    "RESPONSES_CACHE_ENTRIES",
+                    file_config.get("responses", {}).get("cache_entries", 64),
+                )
+            ),
+        },
+        "SERIES": {
+            "default_points": int(
+                os.getenv(
+                    "SERIES_DEFAULT_POINTS",
+                    file_config.get("series", {}).get("default_points", 1000),
+                )
+            ),
+            "max_points": int(
+                os.getenv(
+                    "SERIES_MAX_POINTS",
+                    file_config.get("series", {}).get("max_points", 5000),
+                )
+            ),
+        },
+        "EVENTS": {
+            "heartbeat_seconds": float(
+                os.getenv(
+                    "EVENTS_HEARTBEAT_SECONDS",
+                    file_config.get("events", {}).get("heartbeat_seconds", 15),
+                )
+            ),
+            "max_stream_seconds": float(
+                os.getenv(
+                    "EVENTS_MAX_STREAM_SECONDS",
+                    file_config.get("events", {}).get("max_stream_seconds", 300),
+                )
+            ),
+        },
+        "WORKER": {
+            "concurrency": int(
+                os.getenv(
+                    "WORKER_CONCURRENCY",
+                    file_config.get("worker", {}).get("concurrency", 10),
+                )
+            ),
+            "analysis_concurrency": int(
+                os.getenv(
+                    "WORKER_ANALYSIS_CONCURRENCY",
+                    file_config.get("worker", {}).get("analysis_concurrency", 1),
+                )
+            ),
+            "interactive_analysis_concurrency": int(
+                os.getenv(
+                    "WORKER_INTERACTIVE_ANALYSIS_CONCURRENCY",
+                    file_config.get("worker", {}).get("interactive_analysis_concurrency", 1),
+                )
+            ),
+            "cancel_poll_seconds": float(
+                os.getenv(
+                    "WORKER_CANCEL_POLL_SECONDS",
+                    file_config.get("worker", {}).get("cancel_poll_seconds", 2),
+                )
+            ),
+            "progress_interval_ms": int(
+                os.getenv(
+                    "WORKER_PROGRESS_INTERVAL_MS",
+                    file_config.get("worker", {}).get("progress_interval_ms", 500),
+                )
+            ),
+            "message_cache_mb": int(
+                os.getenv(
+                    "WORKER_MESSAGE_CACHE_MB",
+                    file_config.get("worker", {}).get("message_cache_mb", 256),
+                )
+            ),
+        },
+        "BATCH": {
+            "max_concurrent_videos": int(
+                os.getenv(
+                    "BATCH_MAX_CONCURRENT_VIDEOS",
+                    file_config.get("batch", {}).get("max_concurrent_videos", 8),
+                )
+            ),
+            "videos_per_minute": float(
+                os.getenv(
+                    "BATCH_VIDEOS_PER_MINUTE",
+                    file_config.get("batch", {}).get("videos_per_minute", 30),
+                )
+            ),
+            "max_videos": int(
+                os.getenv(
+                    "BATCH_MAX_VIDEOS",
+                    file_config.get("batch", {}).get("max_videos", 50),
+                )
+            ),
+            "video_type": os.getenv(
+                "BATCH_VIDEO_TYPE", file_config.get("batch", {}).get("video_type", "live")
+            ),
+            "poll_seconds": float(
+                os.getenv(
+                    "BATCH_POLL_SECONDS",
+                    file_config.get("batch", {}).get("poll_seconds", 5),
+                )
+            ),
+            "spikes_per_video": int(
+                os.getenv(
+                    "BATCH_SPIKES_PER_VIDEO",
+                    file_config.get("batch", {}).get("spikes_per_video", 10),
+                )
+            ),
+            "top_spikes": int(
+                os.getenv(
+                    "BATCH_TOP_SPIKES",
+                    file_config.get("batch", {}).get("top_spikes", 20),
+                )
+            ),
+            "ttl_seconds": int(
+                os.getenv(
+                    "BATCH_TTL_SECONDS",
+                    file_config.get("batch", {}).get("ttl_seconds", 604800),
+                )
+            ),
+            "job_timeout_seconds": int(
+                os.getenv(
+                    "BATCH_JOB_TIMEOUT_SECONDS",
+                    file_config.get("batch", {}).get("job_timeout_seconds", 86400),
+                )
+            ),
+        },
     }
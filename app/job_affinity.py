@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+from rq.worker import Worker
+
+AFFINITY_KEY_PREFIX = "analysis:affinity:"
+
+
+def affinity_key(pipeline_id: str) -> str:
+    return f"{AFFINITY_KEY_PREFIX}{pipeline_id}"
+
+
+def worker_queue_name(interactive_queue_name: str, worker_name: str) -> str:
+    """Queue only one worker listens to, for jobs that want that worker's memory."""
+    return f"{interactive_queue_name}:{worker_name}"
+
+
+def record_affinity(
+    connection: Redis, pipeline_id: str, worker_name: str, queue_name: str, ttl_seconds: int
+) -> None:
+    connection.set(
+        affinity_key(pipeline_id),
+        json.dumps({"worker": worker_name, "queue": queue_name}),
+        ex=max(1, int(ttl_seconds)),
+    )
+
+
+def forget_affinity(connection: Redis, pipeline_id: str, worker_name: str) -> None:
+    """Drop the affinity of ``pipeline_id`` unless another worker has claimed it since."""
+    key = affinity_key(pipeline_id)
+
+    def drop(pipe) -> None:
+        raw = pipe.get(key)
+        if raw is None or json.loads(raw)["worker"] != worker_name:
+            return
+        pipe.multi()
+        pipe.delete(key)
+
+    connection.transaction(drop, key)
+
+
+def affinity_queue(connection: Redis, pipeline_id: str) -> Optional[str]:
+    """Queue of the live worker holding ``pipeline_id`` in memory, if there is one."""
+    raw = connection.get(affinity_key(pipeline_id))
+    if raw is None:
+        return None
+    owner = json.loads(raw)
+    if not _worker_alive(connection, owner["worker"]):
+        return None
+    return owner["queue"]
+
+
+def rescue_orphaned_job(connection: Redis, job: Job, shared_queue_name: str) -> bool:
+    """Move ``job`` from the private queue of a worker that is gone to the shared queue.
+
+    A worker that stops cleanly hands its private jobs over itself; one that
+    dies leaves them behind until somebody notices, e.g. a client polling.
+    """
+    prefix = f"{shared_queue_name}:"
+    origin = job.origin or ""
+    if not origin.startswith(prefix) or job.get_status() != "queued":
+        return False
+    if _worker_alive(connection, origin[len(prefix):]):
+        return False
+    # Only the caller that takes the job off the private queue moves it.
+    if not Queue(origin, connection=connection).remove(job):
+        return False
+    Queue(shared_queue_name, connection=connection).enqueue_job(job)
+    return True
+
+
+def _worker_alive(connection: Redis, worker_name: str) -> bool:
+    # RQ drops the worker key on shutdown and lets it expire when a worker dies.
+    return bool(connection.exists(f"{Worker.redis_worker_namespace_prefix}{worker_name}"))
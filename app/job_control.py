@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from redis import Redis
+
+CANCEL_KEY_PREFIX = "analysis:cancel:"
+
+
+def cancel_key(job_id: str) -> str:
+    return f"{CANCEL_KEY_PREFIX}{job_id}"
+
+
+def request_cancel(connection: Redis, job_id: str, ttl_seconds: int) -> None:
+    connection.set(cancel_key(job_id), 1, ex=max(1, int(ttl_seconds)))
+
+
+def is_cancel_requested(connection: Redis, job_id: str) -> bool:
+    return bool(connection.exists(cancel_key(job_id)))
+
+
+class CancelWatcher:
+    """Throttled, thread-safe check of a job's cancellation flag in Redis."""
+
+    def __init__(self, connection: Redis, job_id: str, poll_interval_seconds: float = 2.0) -> None:
+        self._connection = connection
+        self._job_id = job_id
+        self._interval = max(0.0, poll_interval_seconds)
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._cancelled = False
+
+    def __call__(self) -> bool:
+        if self._cancelled:
+            return True
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            if self._cancelled or now < self._next_check:
+                return self._cancelled
+            self._next_check = now + self._interval
+            self._cancelled = is_cancel_requested(self._connection, self._job_id)
+        return self._cancelled
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+from redis import Redis
+
+from .job_graph import (
+    FETCH_STAGE,
+    KEYWORD_STAGE,
+    RESULT_FIELDS,
+    ResultView,
+    load_pipeline_status,
+    load_stage_result,
+    map_status,
+)
+from .services.progress_store import ProgressStore
+
+EVENT_CHANNEL_PREFIX = "analysis:events:"
+TERMINAL_STATUSES = {"completed", "error", "cancelled"}
+# Put on every stream's queue when the hub loses Redis and events may be missing.
+_LOST = object()
+
+logger = logging.getLogger(__name__)
+
+
+def event_channel(pipeline_id: str) -> str:
+    return f"{EVENT_CHANNEL_PREFIX}{pipeline_id}"
+
+
+def publish_event(connection: Redis, pipeline_id: str, stage: str, **fields) -> None:
+    if "status" in fields:
+        fields["status"] = map_status(fields["status"])
+    connection.publish(event_channel(pipeline_id), _event_payload(stage, fields))
+
+
+class ProgressPublisher:
+    """Coalesces the progress updates of one stage job.
+
+    Updates are merged in memory and written at most every
+    ``interval_seconds``. A flush writes only the fields whose value changed
+    to the pipeline's ``ProgressStore`` hash and publishes the event in the
+    same pipelined round trip, so progress no longer rewrites the job meta.
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        pipeline_id: str,
+        stage: str,
+        ttl_seconds: int,
+        interval_seconds: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._connection = connection
+        self._store = ProgressStore(connection, ttl_seconds)
+        self._pipeline_id = pipeline_id
+        self._stage = stage
+        self._interval = max(0.0, interval_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._written: Dict[str, Any] = {}
+        self._next_flush = 0.0
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            self._pending.update(fields)
+            if self._clock() >= self._next_flush:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._next_flush = self._clock() + self._interval
+        changed = {
+            name: value
+            for name, value in self._pending.items()
+            if name not in self._written or self._written[name] != value
+        }
+        self._pending.clear()
+        if not changed:
+            return
+        self._written.update(changed)
+        pipe = self._connection.pipeline(transaction=False)
+        self._store.write(self._pipeline_id, self._stage, changed, pipe=pipe)
+        pipe.publish(event_channel(self._pipeline_id), _event_payload(self._stage, self._written))
+        pipe.execute()
+
+
+class EventHub:
+    """Relays pipeline events to SSE streams over one pub/sub connection per process.
+
+    A listener thread pattern-subscribes to every pipeline channel and puts each
+    event on the queues of the streams watching that pipeline; events nobody
+    watches are dropped. If the listener loses Redis, every stream is ended so
+    that EventSource reconnects and starts from a fresh status.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Redis],
+        subscribe_timeout: float = 5.0,
+        reconnect_seconds: float = 1.0,
+    ) -> None:
+        self._connect = connect
+        self._subscribe_timeout = subscribe_timeout
+        self._reconnect_seconds = reconnect_seconds
+        self._lock = threading.Lock()
+        self._watchers: Dict[str, Set[queue.Queue]] = {}
+        self._listening = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, pipeline_id: str) -> queue.Queue:
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            self._watchers.setdefault(pipeline_id, set()).add(events)
+            # Started on first use so that it runs in the serving process, after any fork.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._listen, name="event-hub", daemon=True
+                )
+                self._thread.start()
+        # Until the subscription is confirmed, published events would be lost.
+        if not self._listening.wait(self._subscribe_timeout):
+            self.unsubscribe(pipeline_id, events)
+            raise ConnectionError("event listener is not subscribed to Redis")
+        return events
+
+    def unsubscribe(self, pipeline_id: str, events: queue.Queue) -> None:
+        with self._lock:
+            watchers = self._watchers.get(pipeline_id)
+            if watchers is None:
+                return
+            watchers.discard(events)
+            if not watchers:
+                del self._watchers[pipeline_id]
+
+    def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._connect().pubsub()
+                pubsub.psubscribe(f"{EVENT_CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    if message["type"] == "psubscribe":
+                        self._listening.set()
+                    elif message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Event listener lost its Redis subscription", exc_info=True)
+            finally:
+                self._listening.clear()
+                self._drop_watchers()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:  # pylint: disable=broad-except
+                        pass
+            time.sleep(self._reconnect_seconds)
+
+    def _dispatch(self, channel: bytes, data: bytes) -> None:
+        pipeline_id = channel.decode()[len(EVENT_CHANNEL_PREFIX):]
+        with self._lock:
+            watchers = list(self._watchers.get(pipeline_id, ()))
+        for events in watchers:
+            events.put(data)
+
+    def _drop_watchers(self) -> None:
+        with self._lock:
+            watchers = [events for group in self._watchers.values() for events in group]
+            self._watchers.clear()
+        for events in watchers:
+            events.put(_LOST)
+
+
+def stream_pipeline_events(
+    connection: Redis,
+    hub: EventHub,
+    pipeline_id: str,
+    store_ttl: int,
+    heartbeat_seconds: float = 15.0,
+    max_stream_seconds: float = 300.0,
+    view: Optional[ResultView] = None,
+) -> Iterator[str]:
+    """Yield Server-Sent Events for one pipeline until it finishes.
+
+    The current status goes out first, then ``progress`` and ``result`` events
+    relayed from the workers' pub/sub channel by ``hub``, and a final ``status`` once a
+    stage reports a terminal state that finishes the pipeline. Redis is only
+    read on connect and on stage completions, so its load follows the number
+    of events rather than how long viewers watch. Streams end after
+    ``max_stream_seconds``; EventSource reconnects and starts from a fresh
+    status. Results are shaped by ``view`` like on the status endpoint.
+    """
+    # Subscribe before reading the status so nothing published in between is lost.
+    events = hub.subscribe(pipeline_id)
+    view = view or ResultView()
+    try:
+        yield "retry: 3000\n\n"
+        status = load_pipeline_status(connection, pipeline_id, store_ttl, view)
+        if status is None:
+            yield _frame("error", {"error": "job not found"})
+            return
+        yield _frame("status", status)
+        if status["status"] in TERMINAL_STATUSES:
+            return
+
+        sent_results = set()
+        for stage in RESULT_FIELDS:
+            if status["stages"].get(stage) != "completed":
+                continue
+            result = view.stage_result(load_stage_result(connection, pipeline_id, stage), stage)
+            if result is None:
+                continue
+            keyword = status.get("keyword") if stage == KEYWORD_STAGE else None
+            yield _frame("result", {"stage": stage, "keyword": keyword, "result": result})
+            sent_results.add(stage)
+
+        segment_processed: Dict[str, int] = {}
+        deadline = time.monotonic() + max_stream_seconds
+        while time.monotonic() < deadline:
+            try:
+                data = events.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if data is _LOST:
+                return
+            event = json.loads(data)
+            stage = event.get("stage")
+            progress = _progress(event, segment_processed)
+            if progress is not None:
+                yield _frame("progress", progress)
+            if "result" in event:
+                event["result"] = view.stage_result(event["result"], stage)
+                yield _frame("result", event)
+                sent_results.add(stage)
+            if event.get("status") in TERMINAL_STATUSES:
+                status = load_pipeline_status(connection, pipeline_id, store_ttl, view)
+                if status and status["status"] in TERMINAL_STATUSES:
+                    # Results the client already has are not sent twice.
+                    for sent in sent_results:
+                        status.pop(RESULT_FIELDS[sent], None)
+                    if not any(field in status for field in RESULT_FIELDS.values()):
+                        status.pop("time_axis", None)
+                    yield _frame("status", status)
+                    return
+    finally:
+        hub.unsubscribe(pipeline_id, events)
+
+
+def _progress(event: Dict, segment_processed: Dict[str, int]) -> Optional[Dict]:
+    if "processed_messages" not in event:
+        return None
+    stage = event.get("stage") or ""
+    if stage.startswith("segment"):
+        segment_processed[stage] = int(event["processed_messages"] or 0)
+        return {"processed_messages": sum(segment_processed.values()), "last_timestamp": None}
+    if stage == FETCH_STAGE:
+        return {
+            "processed_messages": event["processed_messages"],
+            "last_timestamp": event.get("last_timestamp"),
+        }
+    return None
+
+
+def _event_payload(stage: str, fields: Dict) -> str:
+    return json.dumps({"stage": stage, **fields}, ensure_ascii=False)
+
+
+def _frame(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,667 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid5
+
+import numpy as np
+from redis import Redis
+from rq import Queue, Retry
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.worker import Worker
+
+from .job_affinity import affinity_queue
+from .job_control import request_cancel
+from .job_utils import encode_result_base64, jsonable_result, project_result, unpack_result
+from .services.analysis_pipeline import Segment
+from .services.downsample import apply_downsample, downsample_result, plan_shared_downsample
+from .services.progress_store import ProgressStore
+from .services.result_cache import load_recomputed
+from .services.segment_store import SegmentStore
+
+FETCH_STAGE = "fetch"
+REDUCE_STAGE = "reduce"
+TOTAL_STAGE = "total"
+KEYWORD_STAGE = "keyword"
+RECOMPUTE_STAGE = "recompute"
+STAGES = (FETCH_STAGE, TOTAL_STAGE, KEYWORD_STAGE)
+RESULT_FIELDS = {TOTAL_STAGE: "result_total", KEYWORD_STAGE: "result_keyword"}
+# Series whose shape drives the downsampling of each stage's result.
+PRIMARY_SERIES = {TOTAL_STAGE: "smoothed_total", KEYWORD_STAGE: "smoothed_keyword"}
+PIPELINE_CONFIG_KEYS = (
+    "CHATDOWNLOADER",
+    "YOUTUBE",
+    "CPS",
+    "SPIKE_DETECTION",
+    "REDIS",
+    "WORKER",
+    "RATE_LIMIT",
+    "CHECKPOINT",
+    "ARCHIVE",
+    "HTTP_CACHE",
+    "PYRAMID",
+)
+
+
+@dataclass(frozen=True)
+class ResultView:
+    """How results are shaped for a response: sample count, projected fields and encoding.
+
+    ``encoding`` is ``json`` (plain lists) or ``base64`` (series packed with
+    ``series_codec`` into a ``series_b64`` string).
+    """
+
+    points: Optional[int] = None
+    fields: Optional[FrozenSet[str]] = None
+    encoding: str = "json"
+
+    def shape(self, result: Optional[Dict], stage: str) -> Optional[Dict]:
+        return project_result(
+            downsample_result(unpack_result(result), self.points, PRIMARY_SERIES[stage]),
+            self.fields,
+        )
+
+    def render(self, result: Optional[Dict]) -> Optional[Dict]:
+        if not result:
+            return result
+        if self.encoding == "base64":
+            return encode_result_base64(result)
+        return jsonable_result(result)
+
+    def stage_result(self, result: Optional[Dict], stage: str) -> Optional[Dict]:
+        return self.render(self.shape(result, stage))
+
+    def cache_key(self) -> Tuple:
+        return (self.points, sorted(self.fields) if self.fields is not None else None, self.encoding)
+
+    def apply_to_payload(self, payload: Dict) -> None:
+        """Shape the results of a status payload, sending a time axis they share only once."""
+        results = {
+            stage: unpack_result(payload[field])
+            for stage, field in RESULT_FIELDS.items()
+            if payload.get(field)
+        }
+        axes = [(result.get("series") or {}).get("time_axis") for result in results.values()]
+        if (
+            len(results) < 2
+            or axes[0] is None
+            or any(axis is None or not np.array_equal(axis, axes[0]) for axis in axes[1:])
+        ):
+            for stage, result in results.items():
+                payload[RESULT_FIELDS[stage]] = self.stage_result(result, stage)
+            return
+
+        # One plan for every result keeps the sampled axes identical; it is
+        # picked on all their primary series so no result loses its peaks.
+        plan = plan_shared_downsample(
+            [(result, PRIMARY_SERIES[stage]) for stage, result in results.items()], self.points
+        )
+        for stage, result in results.items():
+            shaped = apply_downsample(result, plan)
+            series = dict(shaped["series"])
+            time_axis = series.pop("time_axis")
+            payload[RESULT_FIELDS[stage]] = self.render(
+                project_result({**shaped, "series": series}, self.fields)
+            )
+        if self.fields is not None and "time_axis" not in self.fields:
+            return
+        shared = self.render({"series": {"time_axis": time_axis}})
+        if self.encoding == "base64":
+            payload["time_axis_b64"] = shared["series_b64"]
+        else:
+            payload["time_axis"] = shared["series"]["time_axis"]
+
+
+def stage_job_id(pipeline_id: str, stage: str) -> str:
+    if stage == FETCH_STAGE:
+        return pipeline_id
+    return f"{pipeline_id}-{stage}"
+
+
+def split_stage_job_id(job_id: str) -> Tuple[str, str]:
+    """Inverse of ``stage_job_id``, also for segment (``<pipeline>-segment<i>``) and
+    recompute (``<pipeline>-recompute<hash>``) jobs."""
+    head, _, suffix = job_id.rpartition("-")
+    if head and (
+        suffix in (TOTAL_STAGE, KEYWORD_STAGE, REDUCE_STAGE)
+        or (suffix.startswith("segment") and suffix[len("segment"):].isdigit())
+        or (suffix.startswith(RECOMPUTE_STAGE) and suffix[len(RECOMPUTE_STAGE):].isalnum())
+    ):
+        return head, suffix
+    return job_id, FETCH_STAGE
+
+
+def pipeline_config(app_config: Dict) -> Dict:
+    """Pick the config sections that pipeline stages need from the Flask config."""
+    return {key: app_config.get(key, {}) for key in PIPELINE_CONFIG_KEYS}
+
+
+def enqueue_pipeline(
+    connection: Redis,
+    pipeline_id: str,
+    url: str,
+    keyword: Optional[str],
+    app_config: Dict,
+    video: Optional[Dict] = None,
+) -> Job:
+    """Enqueue the fetch stage of a pipeline and return it.
+
+    The fetch job id doubles as the pipeline id that clients poll. In the
+    default mode the analysis stages depend on it directly; in fan-out mode it
+    is a planner that enqueues segment jobs, a reducer and the analysis stages
+    itself once it knows the segments.
+    """
+    config = pipeline_config(app_config)
+    redis_cfg = config["REDIS"]
+    store_ttl = redis_cfg["result_ttl"]
+    meta = {
+        "status": "queued",
+        "processed_messages": 0,
+        "last_timestamp": None,
+        "keyword": keyword,
+        "url": url,
+        "video": video,
+    }
+
+    if config["YOUTUBE"].get("fan_out_segments"):
+        return _fetch_queue(connection, redis_cfg).enqueue(
+            "app.worker.run_segment_planner_stage",
+            kwargs={
+                "url": url,
+                "keyword": keyword,
+                "pipeline_config": config,
+            },
+            job_id=stage_job_id(pipeline_id, FETCH_STAGE),
+            result_ttl=store_ttl,
+            meta={**meta, "fan_out": True},
+        )
+
+    fetch_job = _fetch_queue(connection, redis_cfg).enqueue(
+        "app.worker.run_fetch_stage",
+        kwargs={
+            "url": url,
+            "chat_config": config["CHATDOWNLOADER"],
+            "youtube_config": config["YOUTUBE"],
+            "store_ttl_seconds": store_ttl,
+            "worker_config": config["WORKER"],
+            "rate_limit_config": config["RATE_LIMIT"],
+            "checkpoint_config": config["CHECKPOINT"],
+            "archive_config": config["ARCHIVE"],
+            "http_cache_config": config["HTTP_CACHE"],
+        },
+        job_id=stage_job_id(pipeline_id, FETCH_STAGE),
+        result_ttl=store_ttl,
+        retry=_build_retry(redis_cfg["fetch_retries"], redis_cfg),
+        meta=meta,
+    )
+    enqueue_analysis_stages(connection, pipeline_id, url, keyword, config, depends_on=fetch_job)
+    return fetch_job
+
+
+def enqueue_analysis_stages(
+    connection: Redis,
+    pipeline_id: str,
+    url: str,
+    keyword: Optional[str],
+    config: Dict,
+    depends_on: Optional[Job] = None,
+) -> List[Job]:
+    redis_cfg = config["REDIS"]
+    analysis_queue = _analysis_queue(connection, redis_cfg)
+    stage_keywords = {TOTAL_STAGE: None}
+    if keyword:
+        stage_keywords[KEYWORD_STAGE] = keyword
+    return [
+        analysis_queue.enqueue(
+            "app.worker.run_analysis_stage",
+            kwargs={
+                "pipeline_id": pipeline_id,
+                "url": url,
+                "keyword": stage_keyword,
+                "cps_config": config["CPS"],
+                "spike_config": config["SPIKE_DETECTION"],
+                "store_ttl_seconds": redis_cfg["result_ttl"],
+                "pyramid_config": config.get("PYRAMID"),
+                "archive_config": config.get("ARCHIVE"),
+            },
+            job_id=stage_job_id(pipeline_id, stage),
+            depends_on=depends_on,
+            result_ttl=redis_cfg["result_ttl"],
+            retry=_build_retry(redis_cfg["analysis_retries"], redis_cfg),
+            meta={"status": "queued", "keyword": stage_keyword},
+        )
+        for stage, stage_keyword in stage_keywords.items()
+    ]
+
+
+def enqueue_recompute(
+    connection: Redis,
+    pipeline_id: str,
+    url: str,
+    keyword: Optional[str],
+    config: Dict,
+    cache_key: str,
+) -> Job:
+    """Queue a keyword recompute, reusing one already in flight.
+
+    The job goes to the private queue of the worker that already holds the
+    pipeline's messages in memory when that worker is alive, and to the shared
+    interactive queue otherwise.
+    """
+    redis_cfg = config["REDIS"]
+    shared_queue = redis_cfg["interactive_queue_name"]
+    queue_name = affinity_queue(connection, pipeline_id) or shared_queue
+    job_id = stage_job_id(pipeline_id, f"{RECOMPUTE_STAGE}{cache_key.rsplit(':', 1)[-1][:12]}")
+    try:
+        existing = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        existing = None
+    if existing is not None:
+        status = existing.get_status()
+        # A job waiting on the queue of a worker that has since died is queued again.
+        if status == "started" or (
+            status in {"queued", "deferred"} and existing.origin in {queue_name, shared_queue}
+        ):
+            return existing
+    return _interactive_queue(connection, redis_cfg, queue_name).enqueue(
+        "app.worker.run_recompute_stage",
+        kwargs={
+            "pipeline_id": pipeline_id,
+            "url": url,
+            "keyword": keyword,
+            "cps_config": config["CPS"],
+            "spike_config": config["SPIKE_DETECTION"],
+            "store_ttl_seconds": redis_cfg["result_ttl"],
+            "cache_key": cache_key,
+            "archive_config": config.get("ARCHIVE"),
+            "pyramid_config": config.get("PYRAMID"),
+        },
+        job_id=job_id,
+        result_ttl=redis_cfg["result_ttl"],
+        meta={"status": "queued", "keyword": keyword, "cache_key": cache_key},
+    )
+
+
+def batch_pipeline_id(batch_id: str, video_id: str) -> str:
+    """Pipeline id of one video of a batch; the same on every run of the batch driver."""
+    return str(uuid5(UUID(batch_id), video_id))
+
+
+def enqueue_channel_batch(
+    connection: Redis,
+    batch_id: str,
+    url: str,
+    channel: Dict[str, str],
+    keyword: Optional[str],
+    video_type: str,
+    app_config: Dict,
+) -> Job:
+    """Queue the driver of a channel batch unless a live one already runs it.
+
+    The driver keeps its state in ``BatchStore``, so queueing it again for a
+    batch whose driver died (worker killed, job timed out, failed) resumes it.
+    It mostly waits on its videos, so it runs on its own queue rather than
+    holding a slot of the fetch workers.
+    """
+    config = pipeline_config(app_config)
+    redis_cfg = config["REDIS"]
+    batch_cfg = app_config["BATCH"]
+    try:
+        existing = Job.fetch(batch_id, connection=connection)
+    except NoSuchJobError:
+        existing = None
+    if existing is not None:
+        status = existing.get_status()
+        if status in {"queued", "deferred", "scheduled"}:
+            return existing
+        # A started job whose worker is gone will never finish.
+        if status == "started" and existing.worker_name and connection.exists(
+            f"{Worker.redis_worker_namespace_prefix}{existing.worker_name}"
+        ):
+            return existing
+    return Queue(redis_cfg["batch_queue_name"], connection=connection).enqueue(
+        "app.worker.run_channel_batch_stage",
+        kwargs={
+            "batch_id": batch_id,
+            "url": url,
+            "channel": channel,
+            "keyword": keyword,
+            "video_type": video_type,
+            "batch_config": batch_cfg,
+            "pipeline_config": config,
+        },
+        job_id=batch_id,
+        job_timeout=batch_cfg["job_timeout_seconds"],
+        result_ttl=batch_cfg["ttl_seconds"],
+        meta={"status": "queued", "url": url, "keyword": keyword},
+    )
+
+
+def enqueue_segment_fan_out(
+    connection: Redis,
+    pipeline_id: str,
+    url: str,
+    segments: Sequence[Segment],
+    config: Dict,
+) -> Job:
+    """Enqueue one fetch job per segment plus a reducer that waits for all of them."""
+    redis_cfg = config["REDIS"]
+    store_ttl = redis_cfg["result_ttl"]
+    fetch_queue = _fetch_queue(connection, redis_cfg)
+    children = [
+        fetch_queue.enqueue(
+            "app.worker.run_segment_fetch_stage",
+            kwargs={
+                "pipeline_id": pipeline_id,
+                "index": index,
+                "url": url,
+                "segment": tuple(segment),
+                "chat_config": config["CHATDOWNLOADER"],
+                "store_ttl_seconds": store_ttl,
+                "worker_config": config["WORKER"],
+                "rate_limit_config": config["RATE_LIMIT"],
+                "checkpoint_config": config["CHECKPOINT"],
+                "http_cache_config": config["HTTP_CACHE"],
+            },
+            job_id=stage_job_id(pipeline_id, f"segment{index}"),
+            result_ttl=store_ttl,
+            retry=_build_retry(redis_cfg["fetch_retries"], redis_cfg),
+            meta={"status": "queued"},
+        )
+        for index, segment in enumerate(segments)
+    ]
+    return _analysis_queue(connection, redis_cfg).enqueue(
+        "app.worker.run_segment_reduce_stage",
+        kwargs={
+            "pipeline_id": pipeline_id,
+            "chat_config": config["CHATDOWNLOADER"],
+            "store_ttl_seconds": store_ttl,
+            "url": url,
+            "archive_config": config["ARCHIVE"],
+            "checkpoint_config": config["CHECKPOINT"],
+        },
+        job_id=stage_job_id(pipeline_id, REDUCE_STAGE),
+        depends_on=children,
+        result_ttl=store_ttl,
+        retry=_build_retry(redis_cfg["analysis_retries"], redis_cfg),
+        meta={"status": "queued"},
+    )
+
+
+def pipeline_stage_jobs(connection: Redis, pipeline_id: str) -> Dict[str, Job]:
+    """Every existing job of a pipeline by stage, including fan-out segments and the reducer."""
+    jobs = {stage: job for stage, job in fetch_pipeline_jobs(connection, pipeline_id).items() if job}
+    fetch_job = jobs.get(FETCH_STAGE)
+    segments_total = int(((fetch_job.meta or {}) if fetch_job else {}).get("segments_total") or 0)
+    extra = [REDUCE_STAGE] + [f"segment{index}" for index in range(segments_total)]
+    extra_jobs = Job.fetch_many(
+        [stage_job_id(pipeline_id, stage) for stage in extra], connection=connection
+    )
+    jobs.update({stage: job for stage, job in zip(extra, extra_jobs) if job is not None})
+    return jobs
+
+
+def cancel_pipeline(connection: Redis, pipeline_id: str, cancel_ttl: int) -> str:
+    """Cancel every unfinished stage of a pipeline.
+
+    Waiting jobs are cancelled outright; running ones are asked to stop
+    through the cancel flag. Returns ``cancelled`` when nothing was running,
+    else ``cancelling``.
+    """
+    request_cancel(connection, pipeline_id, cancel_ttl)
+    return "cancelling" if cancel_waiting_stages(connection, pipeline_id) else "cancelled"
+
+
+def cancel_waiting_stages(connection: Redis, pipeline_id: str) -> bool:
+    """Cancel the stages that are queued or deferred, e.g. on a stage that was just
+    cancelled and so will never finish. Returns whether any stage is still running."""
+    running = False
+    for job in pipeline_stage_jobs(connection, pipeline_id).values():
+        status = job.get_status()
+        if status in {"queued", "deferred", "scheduled"}:
+            job.cancel()
+            _mark_cancelled(job)
+        elif status == "started":
+            running = True
+    return running
+
+
+def _mark_cancelled(job: Job) -> None:
+    meta = job.meta or {}
+    meta.update({"status": "cancelled", "error": "解析はキャンセルされました。"})
+    job.meta = meta
+    job.save_meta()
+
+
+def load_pipeline_status(
+    connection: Redis, pipeline_id: str, store_ttl: int, view: Optional[ResultView] = None
+) -> Optional[Dict]:
+    payload = load_pipeline_payload(connection, pipeline_id, store_ttl)
+    if payload is not None:
+        (view or ResultView()).apply_to_payload(payload)
+    return payload
+
+
+def load_pipeline_payload(connection: Redis, pipeline_id: str, store_ttl: int) -> Optional[Dict]:
+    """Status with the results still in their stored form; ``ResultView`` renders them."""
+    jobs = fetch_pipeline_jobs(connection, pipeline_id)
+    fetch_job = jobs.get(FETCH_STAGE)
+    if fetch_job is None:
+        return None
+    progress = ProgressStore(connection, store_ttl).read(pipeline_id)
+    segment_progress = None
+    if (fetch_job.meta or {}).get("fan_out"):
+        segment_progress = SegmentStore(connection, store_ttl).progress(pipeline_id)
+        # Each segment reports its own count, so a retried segment overwrites it.
+        segment_progress["processed"] = sum(
+            int(fields.get("processed_messages") or 0)
+            for stage, fields in progress.items()
+            if stage.startswith("segment")
+        )
+    return serialize_pipeline(
+        pipeline_id,
+        jobs,
+        segment_progress,
+        progress.get(FETCH_STAGE),
+        load_recomputed(connection, pipeline_id),
+    )
+
+
+def result_versions(payload: Dict) -> Optional[Dict[str, str]]:
+    """Digests of a finished pipeline's results, or ``None`` when any result lacks one."""
+    if payload.get("status") != "completed":
+        return None
+    versions = {}
+    for stage, field in RESULT_FIELDS.items():
+        result = payload.get(field)
+        if result is None:
+            continue
+        if not result.get("digest"):
+            return None
+        versions[stage] = result["digest"]
+    return versions
+
+
+def load_pipeline_stats(connection: Redis, pipeline_id: str) -> Optional[Dict]:
+    """Collect the timing stats recorded by every stage job of a pipeline."""
+    jobs = fetch_pipeline_jobs(connection, pipeline_id)
+    fetch_job = jobs.get(FETCH_STAGE)
+    if fetch_job is None:
+        return None
+    segments_total = int((fetch_job.meta or {}).get("segments_total") or 0)
+    extra_ids = [stage_job_id(pipeline_id, REDUCE_STAGE)] + [
+        stage_job_id(pipeline_id, f"segment{index}") for index in range(segments_total)
+    ]
+    reducer, *segment_jobs = Job.fetch_many(extra_ids, connection=connection)
+    stages = {stage: _job_stats(job) for stage, job in jobs.items() if job is not None}
+    if reducer is not None:
+        stages[REDUCE_STAGE] = _job_stats(reducer)
+    segments = [_job_stats(job) for job in segment_jobs if job is not None]
+    return {
+        "job_id": pipeline_id,
+        "status": _aggregate_status({stage: stats["status"] for stage, stats in stages.items()}),
+        "stages": stages,
+        "segments": segments,
+        "totals": _sum_stats(list(stages.values()) + segments),
+    }
+
+
+def load_stage_result(connection: Redis, pipeline_id: str, stage: str) -> Optional[Dict]:
+    """Stored result of one analysis stage, preferring a recomputed keyword result."""
+    if stage == KEYWORD_STAGE:
+        recomputed = load_recomputed(connection, pipeline_id)
+        if recomputed:
+            return recomputed["result"]
+    try:
+        job = Job.fetch(stage_job_id(pipeline_id, stage), connection=connection)
+    except NoSuchJobError:
+        return None
+    return _stage_result(job)
+
+
+def fetch_pipeline_jobs(connection: Redis, pipeline_id: str) -> Dict[str, Optional[Job]]:
+    job_ids = [stage_job_id(pipeline_id, stage) for stage in STAGES]
+    jobs = Job.fetch_many(job_ids, connection=connection)
+    return dict(zip(STAGES, jobs))
+
+
+def serialize_pipeline(
+    pipeline_id: str,
+    jobs: Dict[str, Optional[Job]],
+    segment_progress: Optional[Dict[str, int]] = None,
+    fetch_progress: Optional[Dict] = None,
+    recomputed: Optional[Dict] = None,
+) -> Dict:
+    """``recomputed`` is the latest keyword recompute, which replaces the keyword result."""
+    fetch_job = jobs.get(FETCH_STAGE)
+    fetch_meta = (fetch_job.meta or {}) if fetch_job else {}
+    stage_status = {
+        stage: resolve_status(job) for stage, job in jobs.items() if job is not None
+    }
+    if fetch_progress and stage_status.get(FETCH_STAGE) != "completed":
+        # Live counts come from the progress hash; the meta holds the final ones.
+        fetch_meta = {**fetch_meta, **fetch_progress}
+
+    payload: Dict = {
+        "job_id": pipeline_id,
+        "status": _aggregate_status(stage_status),
+        "stages": stage_status,
+        "processed_messages": fetch_meta.get("processed_messages", 0),
+        "last_timestamp": fetch_meta.get("last_timestamp"),
+        "keyword": recomputed["keyword"] if recomputed else fetch_meta.get("keyword"),
+        "video": fetch_meta.get("video"),
+        "error": _first_error(jobs),
+    }
+    if segment_progress is not None:
+        payload["segments"] = {
+            "total": segment_progress.get("total", 0),
+            "completed": segment_progress.get("completed", 0),
+        }
+        if payload["stages"].get(FETCH_STAGE) != "completed":
+            payload["processed_messages"] = segment_progress.get("processed", 0)
+        elif "segments_completed" in fetch_meta:
+            # The reducer deletes the segment store once it has merged it.
+            payload["segments"] = {
+                "total": fetch_meta.get("segments_total", 0),
+                "completed": fetch_meta["segments_completed"],
+            }
+    if payload["status"] == "completed":
+        payload["result_total"] = _stage_result(jobs.get(TOTAL_STAGE))
+        payload["result_keyword"] = (
+            recomputed["result"] if recomputed else _stage_result(jobs.get(KEYWORD_STAGE))
+        )
+    return payload
+
+
+def resolve_status(job: Job) -> str:
+    meta = job.meta or {}
+    return map_status(meta.get("status") or job.get_status())
+
+
+def map_status(raw_status: str | None) -> str:
+    if raw_status in {"queued", "scheduled", "deferred"}:
+        return "queued"
+    if raw_status in {"started", "running", "retrying"}:
+        return "running"
+    if raw_status in {"finished", "completed"}:
+        return "completed"
+    if raw_status in {"failed", "error"}:
+        return "error"
+    if raw_status in {"canceled", "cancelled", "stopped"}:
+        return "cancelled"
+    return raw_status or "queued"
+
+
+def _aggregate_status(stage_status: Dict[str, str]) -> str:
+    if not stage_status:
+        return "error"
+    statuses = set(stage_status.values())
+    for terminal in ("cancelled", "error"):
+        if terminal in statuses:
+            return terminal
+    if statuses == {"completed"}:
+        return "completed"
+    if statuses == {"queued"}:
+        return "queued"
+    return "running"
+
+
+def _first_error(jobs: Dict[str, Optional[Job]]) -> Optional[str]:
+    for stage in STAGES:
+        job = jobs.get(stage)
+        if job is not None and (job.meta or {}).get("error"):
+            return job.meta["error"]
+    return None
+
+
+def _job_stats(job: Job) -> Dict:
+    return {"status": resolve_status(job), **((job.meta or {}).get("stats") or {})}
+
+
+def _sum_stats(entries: Sequence[Dict]) -> Dict:
+    stage_seconds: Dict[str, float] = {}
+    totals: Dict = {"requests": 0, "bytes": 0}
+    for entry in entries:
+        totals["requests"] += entry.get("requests", 0)
+        totals["bytes"] += entry.get("bytes", 0)
+        for name, stage in (entry.get("stages") or {}).items():
+            stage_seconds[name] = stage_seconds.get(name, 0.0) + stage.get("seconds", 0.0)
+    totals["stage_seconds"] = {name: round(value, 6) for name, value in stage_seconds.items()}
+    return totals
+
+
+def _stage_result(job: Optional[Job]) -> Optional[Dict]:
+    if job is None:
+        return None
+    return (job.result or {}).get("result")
+
+
+def _fetch_queue(connection: Redis, redis_cfg: Dict) -> Queue:
+    return Queue(
+        redis_cfg["fetch_queue_name"],
+        connection=connection,
+        default_timeout=redis_cfg["job_timeout"],
+    )
+
+
+def _analysis_queue(connection: Redis, redis_cfg: Dict) -> Queue:
+    return Queue(
+        redis_cfg["queue_name"],
+        connection=connection,
+        default_timeout=redis_cfg["job_timeout"],
+    )
+
+
+def _interactive_queue(connection: Redis, redis_cfg: Dict, name: str) -> Queue:
+    return Queue(
+        name,
+        connection=connection,
+        default_timeout=redis_cfg["job_timeout"],
+    )
+
+
+def _build_retry(max_retries: int, redis_cfg: Dict) -> Optional[Retry]:
+    if max_retries <= 0:
+        return None
+    return Retry(max=max_retries, interval=redis_cfg["retry_interval_seconds"])
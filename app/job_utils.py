@@ -1,15 +1,27 @@
 from __future__ import annotations
 
-from typing import Dict
+import base64
+import hashlib
+import json
+from typing import AbstractSet, Any, Dict, Optional, Sequence
 from urllib.parse import urlencode, urlparse, urlunparse
 
+from .services.series_codec import decode_arrays, encode_arrays
 
-def format_result(url: str, data: Dict) -> Dict:
+# Series each analysis stage keeps; the rest are zeros or copies of the total stage's.
+TOTAL_RESULT_SERIES = ("time_axis", "total", "member", "smoothed_total")
+KEYWORD_RESULT_SERIES = ("time_axis", "keyword", "smoothed_keyword")
+
+
+def format_result(url: str, data: Dict, series_names: Optional[Sequence[str]] = None) -> Dict:
     sorted_spikes = sorted(
         data["spikes"], key=lambda spike: spike.get("peak_value", 0), reverse=True
     )
+    series = data["series"]
+    if series_names is not None:
+        series = {name: series[name] for name in series_names if name in series}
     return {
-        "series": data["series"],
+        "series": series,
         "spikes": [
             {
                 **spike,
@@ -20,6 +32,101 @@ def format_result(url: str, data: Dict) -> Dict:
     }
 
 
+def project_result(result: Optional[Dict], fields: Optional[AbstractSet[str]]) -> Optional[Dict]:
+    """Keep only the requested series plus ``spikes``/``envelope`` when named in ``fields``."""
+    if not result or fields is None:
+        return result
+    projected = {
+        key: value for key, value in result.items() if key not in ("series", "spikes", "envelope")
+    }
+    projected["series"] = {
+        name: values for name, values in (result.get("series") or {}).items() if name in fields
+    }
+    if "spikes" in fields and "spikes" in result:
+        projected["spikes"] = result["spikes"]
+    if "envelope" in fields and "envelope" in result:
+        projected["envelope"] = {
+            name: bounds for name, bounds in result["envelope"].items() if name in fields
+        }
+    return projected
+
+
+def pack_result(result: Optional[Dict], as_text: bool = False) -> Optional[Dict]:
+    """Replace the series of ``result`` with one encoded blob (base64 for JSON transports).
+
+    ``digest`` hashes the blob and spikes so responses can be validated
+    without decoding the result.
+    """
+    if not result or "series" not in result:
+        return result
+    blob = encode_arrays(result["series"])
+    packed = {key: value for key, value in result.items() if key != "series"}
+    spikes = json.dumps(result.get("spikes") or [], sort_keys=True, default=str).encode("utf-8")
+    packed["digest"] = hashlib.sha1(blob + spikes).hexdigest()[:16]
+    if as_text:
+        packed["series_b64"] = base64.b64encode(blob).decode("ascii")
+    else:
+        packed["series_blob"] = blob
+    return packed
+
+
+def unpack_result(result: Optional[Dict]) -> Optional[Dict]:
+    """Inverse of ``pack_result``; series come back as arrays, plain results pass through."""
+    if not result:
+        return result
+    if "series_blob" in result:
+        blob = result["series_blob"]
+    elif "series_b64" in result:
+        blob = base64.b64decode(result["series_b64"])
+    else:
+        return result
+    series, _ = decode_arrays(blob)
+    rest = {
+        key: value
+        for key, value in result.items()
+        if key not in ("series_blob", "series_b64", "digest")
+    }
+    return {**rest, "series": series}
+
+
+def encode_result(result: Dict) -> bytes:
+    """Binary form of a whole result; everything but the arrays travels in the header."""
+    meta = {key: value for key, value in result.items() if key not in ("series", "envelope")}
+    return encode_arrays(_result_arrays(result), meta=meta)
+
+
+def encode_result_base64(result: Dict) -> Dict:
+    rest = {key: value for key, value in result.items() if key not in ("series", "envelope")}
+    blob = encode_arrays(_result_arrays(result))
+    return {**rest, "series_b64": base64.b64encode(blob).decode("ascii")}
+
+
+def jsonable_result(result: Optional[Dict]) -> Optional[Dict]:
+    if not result:
+        return result
+    series = result.get("series") or {}
+    jsonable = {**result, "series": {name: _to_list(values) for name, values in series.items()}}
+    if "envelope" in result:
+        jsonable["envelope"] = {
+            name: {bound: _to_list(values) for bound, values in bounds.items()}
+            for name, bounds in result["envelope"].items()
+        }
+    return jsonable
+
+
+def _result_arrays(result: Dict) -> Dict[str, Any]:
+    # Envelope bounds ride along as ``<series>:min`` / ``<series>:max``.
+    arrays = dict(result.get("series") or {})
+    for name, bounds in (result.get("envelope") or {}).items():
+        arrays[f"{name}:min"] = bounds["min"]
+        arrays[f"{name}:max"] = bounds["max"]
+    return arrays
+
+
+def _to_list(values: Any) -> list:
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
 def build_jump_url(url: str, timestamp_seconds: float) -> str:
     parsed = urlparse(url)
     query = parsed.query
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# What a job pulls in on first use: numpy, requests, chat_downloader with the
+# patched sites/youtube.py, and everything app.worker imports.
+PRELOAD_MODULES = (
+    "numpy",
+    "requests",
+    "chat_downloader",
+    "chat_downloader.sites.youtube",
+    "app.worker",
+)
+# Matches none of the sites, so every site's URL patterns are compiled.
+_UNMATCHED_URL = "https://preload.invalid/"
+
+
+def preload_worker_modules() -> Dict[str, float]:
+    """Import and warm what jobs need so a worker pays for it once, not per job.
+
+    A forking worker should call this in the parent before the first fork; the
+    work horses then start with the modules, compiled regexes and numpy code
+    paths already in memory. Returns the seconds spent per step.
+    """
+    timings: Dict[str, float] = {}
+
+    started = time.perf_counter()
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from chat_downloader.sites import get_all_sites  # pylint: disable=import-outside-toplevel
+
+    # re caches compiled patterns per process, and forked children inherit it.
+    for site in get_all_sites():
+        site.matches(_UNMATCHED_URL)
+    timings["regex"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _warm_analysis()
+    timings["analysis"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from .services.youtube_api import http_session  # pylint: disable=import-outside-toplevel
+
+    http_session()
+    timings["http"] = time.perf_counter() - started
+
+    logger.info(
+        "Preloaded worker modules in %.3fs (%s)",
+        sum(timings.values()),
+        ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()),
+    )
+    return timings
+
+
+def _warm_analysis() -> None:
+    # pylint: disable=import-outside-toplevel
+    from .job_utils import TOTAL_RESULT_SERIES, format_result, pack_result
+    from .services.analysis_pipeline import analyze_messages
+    from .services.chat_loader import ChatMessage
+
+    messages = [
+        ChatMessage(timestamp_seconds=float(second), message="w", is_member=second % 2 == 0)
+        for second in range(120)
+    ]
+    cps_config = {"bucket_size_seconds": 1.0, "smoothing_window_seconds": 5.0}
+    spike_config = {"min_prominence": 1.0, "min_gap_seconds": 10.0}
+    data = analyze_messages(messages, "w", cps_config, spike_config)
+    pack_result(format_result("", data, TOTAL_RESULT_SERIES))
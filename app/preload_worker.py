@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+
+from redis import Redis
+from rq import Queue, SimpleWorker, Worker
+
+from .config import load_app_config
+from .preload import preload_worker_modules
+from .worker import configure_analysis_slots, forget_job_dispatched, mark_job_dispatched
+
+
+class _DispatchTimingMixin:
+    def execute_job(self, job, queue):
+        mark_job_dispatched(job.id)
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            forget_job_dispatched(job.id)
+
+
+class PreloadingWorker(_DispatchTimingMixin, Worker):
+    """Forking RQ worker whose work horses start from a warmed-up parent.
+
+    The stock worker forks from a process that never imported the job code, so
+    every horse imports numpy, chat_downloader and ``app.worker`` again. Here
+    the parent does that once and the horses inherit it copy-on-write; only the
+    HTTP session is recreated per horse so no socket is shared across a fork.
+    """
+
+
+class InProcessWorker(_DispatchTimingMixin, SimpleWorker):
+    """Runs one job at a time in the worker process itself.
+
+    Nothing is forked, so module state such as ``lru_cache`` and the message
+    cache carries over between jobs. Jobs keep their per-job state (timers,
+    progress, cancellation) keyed by job id, and a job that crashes the
+    interpreter takes the worker down with it, which the container restarts.
+    """
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="モジュールを事前に読み込んでおく RQ ワーカー")
+    parser.add_argument("queues", nargs="*", help="監視するキュー名 (省略時は設定値)")
+    parser.add_argument("--no-fork", action="store_true", help="ジョブをフォークせずに実行する")
+    parser.add_argument("--burst", action="store_true", help="キューが空になったら終了")
+    args = parser.parse_args()
+
+    app_config = load_app_config()
+    redis_cfg = app_config["REDIS"]
+
+    connection = Redis.from_url(redis_cfg["url"])
+    queue_names = args.queues or [redis_cfg["queue_name"]]
+    queues = [Queue(name, connection=connection) for name in queue_names]
+
+    preload_worker_modules()
+    configure_analysis_slots(app_config["WORKER"]["analysis_concurrency"])
+    worker_class = InProcessWorker if args.no_fork else PreloadingWorker
+    worker_class(queues, connection=connection).work(burst=args.burst)
+
+
+if __name__ == "__main__":
+    main()
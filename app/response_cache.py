@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from flask import Response
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/octet-stream", "text/plain"}
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    mimetype: str
+    gzipped: Optional[bytes]
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the JSON form of ``parts``; weak because gzip changes the bytes."""
+    digest = hashlib.sha1(
+        json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return digest[:32]
+
+
+class ResponseCache:
+    """In-process LRU of rendered bodies of finished results keyed by ETag.
+
+    Entries keep the gzipped body next to the plain one, so repeat requests
+    from other tabs or clients skip loading, rendering and compressing.
+    """
+
+    def __init__(self, max_entries: int = 64, gzip_min_bytes: int = 1024) -> None:
+        self._max_entries = max(0, max_entries)
+        self._gzip_min_bytes = gzip_min_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    def get_or_render(self, etag: str, render: Callable[[], Response]) -> CachedBody:
+        with self._lock:
+            cached = self._entries.get(etag)
+            if cached is not None:
+                self._entries.move_to_end(etag)
+                return cached
+        rendered = render()
+        body = rendered.get_data()
+        gzipped = None
+        if len(body) >= self._gzip_min_bytes and rendered.mimetype in COMPRESSIBLE_MIMETYPES:
+            gzipped = gzip.compress(body, compresslevel=6)
+        cached = CachedBody(body=body, mimetype=rendered.mimetype, gzipped=gzipped)
+        if self._max_entries:
+            with self._lock:
+                self._entries[etag] = cached
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return cached
+
+
+def compress_response(response: Response, accept_encoding: str, min_bytes: int) -> Response:
+    """Gzip large buffered bodies for clients that accept it; streams are left alone."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "gzip" not in accept_encoding
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
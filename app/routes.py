@@ -1,20 +1,84 @@
 from __future__ import annotations
 
-from typing import Dict
+import time
+from typing import Callable, Dict, Optional
 from uuid import uuid4
 
-from flask import Blueprint, Flask, current_app, jsonify, render_template, request
+import requests
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, render_template, request
 from redis import Redis
 from rq import Queue
 from rq.exceptions import NoSuchJobError
 from rq.job import Job
 
-from .job_utils import format_result
-from .services.analysis_pipeline import analyze_messages
+from .job_affinity import rescue_orphaned_job
+from .job_events import EventHub, publish_event, stream_pipeline_events
+from .job_graph import (
+    FETCH_STAGE,
+    KEYWORD_STAGE,
+    RESULT_FIELDS,
+    ResultView,
+    cancel_pipeline,
+    enqueue_channel_batch,
+    enqueue_pipeline,
+    enqueue_recompute,
+    load_pipeline_payload,
+    load_pipeline_stats,
+    load_stage_result,
+    pipeline_stage_jobs,
+    resolve_status,
+    result_versions,
+    split_stage_job_id,
+)
+from .job_utils import encode_result
+from .response_cache import ResponseCache, compress_response, make_etag
+from .services.batch_store import BatchStore, channel_batch_key, top_spikes
+from .services.chat_loader import CHANNEL_VIDEO_TYPES
+from .services.metrics import MetricsRegistry, read_metrics, render_metrics
+from .services.rate_limiter import read_cluster_stats
+from .services.result_cache import ResultCache, result_cache_key, save_recomputed
+from .services.series_pyramid import SERIES_NAMES, SeriesPyramid, TileRangeError
+from .services.video_metadata import VideoMetadataCache
+from .services.youtube_api import extract_channel, extract_video_id
+
+
+_metrics = MetricsRegistry()
 
 
 def register_routes(app: Flask) -> None:
     bp = Blueprint("main", __name__)
+    responses_cfg = app.config["RESPONSES"]
+    responses = ResponseCache(
+        max_entries=responses_cfg["cache_entries"],
+        gzip_min_bytes=responses_cfg["gzip_min_bytes"],
+    )
+    redis_url = app.config["REDIS"]["url"]
+    event_hub = EventHub(lambda: Redis.from_url(redis_url))
+
+    @bp.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @bp.after_request
+    def record_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            _metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+                method=request.method,
+                status=str(response.status_code),
+            )
+        return response
+
+    @bp.after_request
+    def compress(response):
+        return compress_response(
+            response,
+            request.headers.get("Accept-Encoding", ""),
+            responses_cfg["gzip_min_bytes"],
+        )
 
     @bp.get("/")
     def index():
@@ -28,37 +92,240 @@ def register_routes(app: Flask) -> None:
         if not url:
             return jsonify({"error": "URL is required"}), 400
 
-        job_id = str(uuid4())
-        queue = _get_queue()
-        redis_cfg = current_app.config["REDIS"]
-        job = queue.enqueue(
-            "app.worker.run_analysis_job",
-            kwargs={
-                "url": url,
-                "keyword": keyword,
-                "chat_config": current_app.config["CHATDOWNLOADER"],
-                "youtube_config": current_app.config.get("YOUTUBE", {}),
-                "cps_config": current_app.config["CPS"],
-                "spike_config": current_app.config["SPIKE_DETECTION"],
-            },
-            job_id=job_id,
-            result_ttl=redis_cfg["result_ttl"],
-            meta={
-                "status": "queued",
-                "processed_messages": 0,
-                "last_timestamp": None,
-                "keyword": keyword,
-            },
+        connection = _redis_connection()
+        youtube_cfg = current_app.config["YOUTUBE"]
+        video = None
+        video_id = extract_video_id(url)
+        if video_id and youtube_cfg["api_key"]:
+            try:
+                video = VideoMetadataCache.from_config(connection, youtube_cfg).lookup(
+                    video_id, youtube_cfg["api_key"]
+                )
+            except (requests.RequestException, ValueError):
+                # The fetch does not need the metadata, so an API outage is not fatal.
+                current_app.logger.warning("Video metadata lookup failed for %s", video_id)
+            else:
+                if video is None:
+                    return jsonify({"error": "video not found"}), 404
+
+        video_info = video.to_dict() if video else None
+        job = enqueue_pipeline(
+            connection,
+            pipeline_id=str(uuid4()),
+            url=url,
+            keyword=keyword,
+            app_config=current_app.config,
+            video=video_info,
         )
+        _metrics.inc("chat_pipelines_started_total")
+        return jsonify({"job_id": job.id, "video": video_info})
 
-        return jsonify({"job_id": job.id})
+    @bp.post("/analyze/channel")
+    def start_channel_batch():
+        payload = request.get_json(silent=True) or request.form
+        url = (payload.get("url") or "").strip()
+        keyword = (payload.get("keyword") or "").strip() or None
+        batch_cfg = current_app.config["BATCH"]
+        video_type = (payload.get("video_type") or batch_cfg["video_type"]).strip().lower()
+        channel = extract_channel(url)
+        if channel is None:
+            return jsonify({"error": "channel URL is required"}), 400
+        if video_type not in CHANNEL_VIDEO_TYPES:
+            return jsonify({"error": "unknown video_type"}), 400
+
+        connection = _redis_connection()
+        store = BatchStore(connection, batch_cfg["ttl_seconds"])
+        channel_key = channel_batch_key(channel, video_type, keyword)
+        # The same request again continues an unfinished batch instead of starting over.
+        batch_id = store.current(channel_key)
+        info = store.info(batch_id) if batch_id else None
+        resumed = info is not None and _batch_status(info, _fetch_job(batch_id)) not in {
+            "completed",
+            "cancelled",
+        }
+        if resumed and info.get("status") == "error":
+            store.update(batch_id, status="queued", error=None)
+        elif not resumed:
+            batch_id = str(uuid4())
+            store.update(
+                batch_id,
+                status="queued",
+                url=url,
+                channel=channel,
+                keyword=keyword,
+                video_type=video_type,
+                created_at=time.time(),
+            )
+            store.set_current(channel_key, batch_id)
+        enqueue_channel_batch(
+            connection, batch_id, url, channel, keyword, video_type, current_app.config
+        )
+        return jsonify({"batch_id": batch_id, "resumed": resumed}), 202
+
+    @bp.get("/analyze/channel/<batch_id>")
+    def channel_batch_status(batch_id: str):
+        batch_cfg = current_app.config["BATCH"]
+        store = BatchStore(_redis_connection(), batch_cfg["ttl_seconds"])
+        info = store.info(batch_id)
+        if info is None:
+            return jsonify({"error": "batch not found"}), 404
+        records = sorted(store.done(batch_id), key=lambda record: record.get("index") or 0)
+        counts = store.counts(batch_id)
+        return jsonify(
+            {
+                "batch_id": batch_id,
+                "status": _batch_status(info, _fetch_job(batch_id)),
+                "url": info.get("url"),
+                "keyword": info.get("keyword"),
+                "video_type": info.get("video_type"),
+                "error": info.get("error"),
+                "videos": {
+                    "total": info.get("total"),
+                    "pending": counts["pending"],
+                    "running": counts["running"],
+                    "completed": sum(1 for record in records if record["status"] == "completed"),
+                    "failed": sum(1 for record in records if record["status"] != "completed"),
+                    "skipped": len(info.get("skipped") or []),
+                },
+                "skipped": info.get("skipped") or [],
+                "results": records,
+                "top_spikes": top_spikes(records, batch_cfg["top_spikes"]),
+            }
+        )
 
     @bp.get("/analyze/status/<job_id>")
     def job_status(job_id: str):
-        job = _fetch_job(job_id)
-        if not job:
+        payload = load_pipeline_payload(
+            _redis_connection(), job_id, current_app.config["REDIS"]["result_ttl"]
+        )
+        if payload is None:
+            return jsonify({"error": "job not found"}), 404
+        view = _result_view()
+        versions = result_versions(payload)
+
+        def render():
+            view.apply_to_payload(payload)
+            return jsonify(payload)
+
+        if versions is None:
+            return render()
+        payload["result_versions"] = versions
+        etag = make_etag("status", job_id, versions, payload.get("keyword"), view.cache_key())
+        return _finished_response(etag, render, cache=responses)
+
+    @bp.get("/analyze/events/<job_id>")
+    def job_events(job_id: str):
+        if _fetch_job(job_id) is None:
             return jsonify({"error": "job not found"}), 404
-        return jsonify(_serialize_job(job))
+        events_cfg = current_app.config["EVENTS"]
+        stream = stream_pipeline_events(
+            _redis_connection(),
+            event_hub,
+            job_id,
+            current_app.config["REDIS"]["result_ttl"],
+            heartbeat_seconds=events_cfg["heartbeat_seconds"],
+            max_stream_seconds=events_cfg["max_stream_seconds"],
+            view=_result_view(),
+        )
+        return Response(
+            stream,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @bp.get("/analyze/stats/<job_id>")
+    def job_stats(job_id: str):
+        payload = load_pipeline_stats(_redis_connection(), job_id)
+        if payload is None:
+            return jsonify({"error": "job not found"}), 404
+        return jsonify(payload)
+
+    @bp.get("/analyze/result/<job_id>/<stage>")
+    def stage_result(job_id: str, stage: str):
+        if stage not in RESULT_FIELDS:
+            return jsonify({"error": "unknown stage"}), 400
+        result = load_stage_result(_redis_connection(), job_id, stage)
+        if result is None:
+            return jsonify({"error": "result not found"}), 404
+        view = _result_view()
+        binary = request.args.get("encoding") == "binary"
+
+        def render():
+            shaped = view.shape(result, stage)
+            if binary:
+                return Response(encode_result(shaped), mimetype="application/octet-stream")
+            return jsonify(view.render(shaped))
+
+        digest = result.get("digest")
+        if not digest:
+            return render()
+        etag = make_etag("result", job_id, stage, digest, view.cache_key(), binary)
+        # A URL naming the digest always gets the same bytes.
+        immutable = request.args.get("v") == digest
+        return _finished_response(etag, render, cache=responses, immutable=immutable)
+
+    @bp.get("/analyze/tiles/<job_id>")
+    def tile_levels(job_id: str):
+        levels = _pyramid().describe(job_id)
+        if not levels:
+            return jsonify({"error": "tiles not found"}), 404
+        return jsonify({"job_id": job_id, "series": levels})
+
+    @bp.get("/analyze/tiles/<job_id>/<series>/<int:level>")
+    def tile(job_id: str, series: str, level: int):
+        if series not in SERIES_NAMES:
+            return jsonify({"error": "unknown series"}), 400
+        t0 = request.args.get("t0", type=float)
+        t1 = request.args.get("t1", type=float)
+        if t0 is None or t1 is None or t1 <= t0:
+            return jsonify({"error": "t0 and t1 are required and t1 must be greater"}), 400
+        # Keyword series hold the latest recompute; naming the keyword avoids
+        # mixing tiles of two keywords while the chart is zoomed.
+        keyword = request.args.get("keyword") or None
+        pyramid = _pyramid()
+        version = pyramid.version(job_id, series, keyword)
+        if version is None:
+            return jsonify({"error": "tiles not found"}), 404
+
+        def render():
+            payload = pyramid.tile(
+                job_id,
+                series,
+                level,
+                t0,
+                t1,
+                current_app.config["PYRAMID"]["max_tile_bins"],
+                keyword=keyword,
+            )
+            if payload is None:
+                raise TileRangeError("tiles expired")
+            return jsonify(payload.to_dict())
+
+        etag = make_etag("tile", job_id, series, level, t0, t1, version)
+        try:
+            return _finished_response(etag, render, immutable=request.args.get("v") == version)
+        except TileRangeError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+    @bp.get("/analyze/rate-limit/stats")
+    def rate_limit_stats():
+        return jsonify(read_cluster_stats(_redis_connection()))
+
+    @bp.post("/analyze/cancel/<job_id>")
+    def cancel(job_id: str):
+        connection = _redis_connection()
+        jobs = pipeline_stage_jobs(connection, job_id)
+        if FETCH_STAGE not in jobs:
+            return jsonify({"error": "job not found"}), 404
+        if all(
+            resolve_status(job) in {"completed", "error", "cancelled"} for job in jobs.values()
+        ):
+            return jsonify({"error": "job already finished"}), 400
+
+        status = cancel_pipeline(connection, job_id, current_app.config["REDIS"]["job_timeout"])
+        if status == "cancelled":
+            publish_event(connection, job_id, FETCH_STAGE, status="cancelled")
+        return jsonify({"job_id": job_id, "status": status})
 
     @bp.post("/analyze/recompute/<job_id>")
     def recompute(job_id: str):
@@ -67,24 +334,72 @@ def register_routes(app: Flask) -> None:
         job = _fetch_job(job_id)
         if job is None:
             return jsonify({"error": "job not found"}), 404
-        if job.get_status() != "finished":
+        if resolve_status(job) != "completed":
             return jsonify({"error": "job not ready"}), 400
 
-        job_payload = job.result or {}
-        messages = job_payload.get("messages")
-        job_url = job_payload.get("url")
-        if not messages or not job_url:
+        job_url = (job.meta or {}).get("url")
+        if not job_url:
             return jsonify({"error": "job payload missing"}), 400
 
-        cps_config = current_app.config["CPS"]
-        spike_config = current_app.config["SPIKE_DETECTION"]
-        data = analyze_messages(messages, keyword, cps_config, spike_config)
-        result = format_result(job_url, data)
-        meta = job.meta or {}
-        meta.update({"result_keyword": result, "keyword": keyword})
-        job.meta = meta
-        job.save_meta()
-        return jsonify({"result": result})
+        connection = _redis_connection()
+        config = current_app.config
+        cache_key = result_cache_key(
+            extract_video_id(job_url),
+            keyword,
+            (job.meta or {}).get("processed_messages"),
+            config["CPS"],
+            config["SPIKE_DETECTION"],
+        )
+        cached = ResultCache(connection, config["REDIS"]["result_ttl"]).get(cache_key)
+        if cached is not None:
+            save_recomputed(connection, job.id, keyword, cached, config["REDIS"]["result_ttl"])
+            return jsonify(
+                {
+                    "status": "completed",
+                    "cached": True,
+                    "result": _result_view().stage_result(cached, KEYWORD_STAGE),
+                }
+            )
+        task = enqueue_recompute(connection, job.id, job_url, keyword, config, cache_key)
+        return jsonify({"status": "queued", "task_id": task.id}), 202
+
+    @bp.get("/analyze/recompute/status/<task_id>")
+    def recompute_status(task_id: str):
+        task = _fetch_job(task_id)
+        if task is None or split_stage_job_id(task_id)[1] == FETCH_STAGE:
+            return jsonify({"error": "job not found"}), 404
+        if rescue_orphaned_job(
+            _redis_connection(), task, current_app.config["REDIS"]["interactive_queue_name"]
+        ):
+            current_app.logger.info("Moved recompute %s off the queue of a dead worker", task_id)
+        meta = task.meta or {}
+        status = resolve_status(task)
+        payload = {"status": status, "keyword": meta.get("keyword"), "error": meta.get("error")}
+        if status == "completed":
+            result = ResultCache(
+                _redis_connection(), current_app.config["REDIS"]["result_ttl"]
+            ).get(meta.get("cache_key", ""))
+            if result is None and isinstance(task.result, dict):
+                result = task.result.get("result")
+            payload["result"] = _result_view().stage_result(result, KEYWORD_STAGE)
+        return jsonify(payload)
+
+    @bp.get("/metrics")
+    def metrics():
+        connection = _redis_connection()
+        redis_cfg = current_app.config["REDIS"]
+        gauges = MetricsRegistry()
+        for name in (
+            redis_cfg["fetch_queue_name"],
+            redis_cfg["queue_name"],
+            redis_cfg["interactive_queue_name"],
+            redis_cfg["batch_queue_name"],
+        ):
+            queue = Queue(name, connection=connection)
+            gauges.set("rq_queue_depth", queue.count, queue=name)
+            gauges.set("rq_jobs_running", queue.started_job_registry.count, queue=name)
+        body = render_metrics(_metrics.snapshot(), read_metrics(connection), gauges.snapshot())
+        return Response(body, mimetype="text/plain; version=0.0.4")
 
     app.register_blueprint(bp)
 
@@ -94,50 +409,76 @@ def _redis_connection() -> Redis:
     return Redis.from_url(redis_cfg["url"])
 
 
-def _get_queue() -> Queue:
-    redis_cfg = current_app.config["REDIS"]
-    return Queue(
-        redis_cfg["queue_name"],
-        connection=_redis_connection(),
-        default_timeout=redis_cfg["job_timeout"],
+def _batch_status(info: Dict, driver: Job | None) -> str:
+    # A driver cancelled while still queued never got to record that itself.
+    status = info.get("status") or "queued"
+    if status in {"queued", "listing", "running"} and driver is not None:
+        if resolve_status(driver) == "cancelled":
+            return "cancelled"
+    return status
+
+
+def _finished_response(
+    etag: str,
+    render: Callable[[], Response],
+    cache: Optional[ResponseCache] = None,
+    immutable: bool = False,
+) -> Response:
+    """Serve a finished artifact with a weak ETag, answering revalidations with 304.
+
+    ``immutable`` marks versioned URLs cacheable for as long as results live
+    in Redis; everything else must be revalidated, since a keyword recompute
+    replaces the keyword result under the same URL.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif cache is not None:
+        cached = cache.get_or_render(etag, render)
+        use_gzip = cached.gzipped is not None and "gzip" in request.headers.get(
+            "Accept-Encoding", ""
+        )
+        response = Response(cached.gzipped if use_gzip else cached.body, mimetype=cached.mimetype)
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        if cached.gzipped is not None:
+            response.vary.add("Accept-Encoding")
+    else:
+        response = render()
+    response.set_etag(etag, weak=True)
+    if immutable:
+        max_age = current_app.config["REDIS"]["result_ttl"]
+        response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _pyramid() -> SeriesPyramid:
+    return SeriesPyramid(_redis_connection(), current_app.config["REDIS"]["result_ttl"])
+
+
+def _result_view() -> ResultView:
+    fields = request.args.get("fields")
+    return ResultView(
+        points=_series_points(),
+        fields=frozenset(name.strip() for name in fields.split(",")) if fields else None,
+        encoding="base64" if request.args.get("encoding") == "base64" else "json",
     )
 
 
+def _series_points() -> int | None:
+    """Sample count requested with ``?points=``; 0 asks for full resolution."""
+    series_cfg = current_app.config["SERIES"]
+    points = request.args.get("points", type=int)
+    if points is None:
+        return series_cfg["default_points"]
+    if points <= 0:
+        return None
+    return min(max(points, 3), series_cfg["max_points"])
+
+
 def _fetch_job(job_id: str) -> Job | None:
     try:
         return Job.fetch(job_id, connection=_redis_connection())
     except NoSuchJobError:
         return None
-
-
-def _serialize_job(job: Job) -> Dict:
-    meta = job.meta or {}
-    job_status = meta.get("status") or job.get_status()
-    status = _map_status(job_status or job.get_status())
-    payload: Dict = {
-        "job_id": job.id,
-        "status": status,
-        "processed_messages": meta.get("processed_messages", 0),
-        "last_timestamp": meta.get("last_timestamp"),
-        "keyword": meta.get("keyword"),
-        "error": meta.get("error"),
-    }
-    if status == "completed":
-        result = job.result or {}
-        payload["result_total"] = result.get("result_total") or meta.get("result_total")
-        payload["result_keyword"] = result.get("result_keyword") or meta.get(
-            "result_keyword"
-        )
-    return payload
-
-
-def _map_status(raw_status: str | None) -> str:
-    if raw_status in {"queued", "scheduled"}:
-        return "queued"
-    if raw_status in {"started", "running"}:
-        return "running"
-    if raw_status in {"finished", "completed"}:
-        return "completed"
-    if raw_status in {"failed", "error"}:
-        return "error"
-    return raw_status or "queued"
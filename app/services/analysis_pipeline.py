@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from .chat_loader import ChatLoader, ChatMessage
-from .cps_analyzer import CPSAnalyzer
+from .chat_loader import ChatLoader, ChatMessage, RequestHook
+from .checkpoint import SegmentCheckpoint
+from .coverage import CoverageStore, uncovered_segments
+from .cps_analyzer import ChatColumns, CPSAnalyzer, CPSResult
 from .spike_detector import SpikeDetector
+from .stage_timer import StageTimer, timed, timing_hook
 from .youtube_api import extract_video_id, fetch_video_duration_seconds
 
 ProgressCallback = Callable[[int, Optional[float]], None]
+CancelCheck = Callable[[], bool]
+Segment = Tuple[int, Optional[int]]
+CheckpointFactory = Callable[[Segment], SegmentCheckpoint]
+DurationLookup = Callable[[str], Optional[int]]
+
+
+class FetchCancelled(Exception):
+    """Raised when ``should_cancel`` reports that the fetch should stop."""
 
 
 def fetch_chat_messages(
@@ -17,14 +29,42 @@ def fetch_chat_messages(
     youtube_config: Optional[Dict] = None,
     progress_callback: Optional[ProgressCallback] = None,
     chunk_size: int = 1000,
+    should_cancel: Optional[CancelCheck] = None,
+    request_hooks: Sequence[RequestHook] = (),
+    checkpoint_factory: Optional[CheckpointFactory] = None,
+    fetch_info: Optional[Dict] = None,
+    timer: Optional[StageTimer] = None,
+    duration_lookup: Optional[DurationLookup] = None,
+    coverage: Optional[CoverageStore] = None,
 ) -> List[ChatMessage]:
+    """Fetch every chat message of ``url``.
+
+    When ``fetch_info`` is given it is filled with details about the source,
+    currently the ``stream_status`` reported by chat_downloader. ``timer``
+    collects per-stage timings, request counts and bytes. ``duration_lookup``
+    replaces the Data API call used to plan parallel segments. With
+    ``coverage``, time ranges fetched by earlier runs are merged from it instead
+    of being fetched again, and every finished replay range is added to it; it
+    is ignored when ``message_limit`` is set.
+    """
     youtube_config = youtube_config or {}
+    if chat_config.get("message_limit"):
+        coverage = None
+    if coverage and fetch_info is None:
+        fetch_info = {}
     if _can_parallel_fetch(youtube_config):
         result = _fetch_parallel_messages(
             url=url,
             chat_config=chat_config,
             youtube_config=youtube_config,
             progress_callback=progress_callback,
+            should_cancel=should_cancel,
+            request_hooks=request_hooks,
+            checkpoint_factory=checkpoint_factory,
+            fetch_info=fetch_info,
+            timer=timer,
+            duration_lookup=duration_lookup,
+            coverage=coverage,
         )
         if result is not None:
             return result
@@ -34,35 +74,167 @@ def fetch_chat_messages(
         chat_config=chat_config,
         progress_callback=progress_callback,
         chunk_size=chunk_size,
+        should_cancel=should_cancel,
+        request_hooks=request_hooks,
+        checkpoint_factory=checkpoint_factory,
+        fetch_info=fetch_info,
+        timer=timer,
+        coverage=coverage,
     )
 
 
+def _raise_if_cancelled(should_cancel: Optional[CancelCheck]) -> None:
+    if should_cancel and should_cancel():
+        raise FetchCancelled()
+
+
 def _fetch_sequential_messages(
     url: str,
     chat_config: Dict,
     progress_callback: Optional[ProgressCallback],
     chunk_size: int,
+    should_cancel: Optional[CancelCheck] = None,
+    request_hooks: Sequence[RequestHook] = (),
+    checkpoint_factory: Optional[CheckpointFactory] = None,
+    fetch_info: Optional[Dict] = None,
+    timer: Optional[StageTimer] = None,
+    coverage: Optional[CoverageStore] = None,
 ) -> List[ChatMessage]:
-    loader = ChatLoader(request_timeout=chat_config["request_timeout"])
-    messages: List[ChatMessage] = []
-    processed = 0
-    last_timestamp: Optional[float] = None
-    chunk: List[ChatMessage] = []
-
+    gaps, batches = _covered_batches(coverage, [(0, None)])
+    processed = sum(len(batch) for batch in batches)
+    for gap in gaps:
+        messages = _fetch_range(
+            url=url,
+            chat_config=chat_config,
+            segment=gap,
+            message_limit=chat_config.get("message_limit"),
+            progress_callback=_offset_progress(progress_callback, processed),
+            chunk_size=chunk_size,
+            should_cancel=should_cancel,
+            request_hooks=request_hooks,
+            checkpoint=checkpoint_factory(gap) if checkpoint_factory else None,
+            fetch_info=fetch_info,
+            timer=timer,
+        )
+        _record_coverage(coverage, gap, messages, fetch_info)
+        batches.append(messages)
+        processed += len(messages)
+    if len(batches) == 1:
+        return batches[0]
+    with timed(timer, "merge"):
+        return merge_segment_messages(batches, chat_config.get("message_limit"))
+
+
+def _covered_batches(
+    coverage: Optional[CoverageStore], segments: Sequence[Segment]
+) -> Tuple[List[Segment], List[List[ChatMessage]]]:
+    """What is left to fetch of ``segments``, and the messages already covered."""
+    if not coverage:
+        return list(segments), []
+    return uncovered_segments(segments, coverage.intervals()), coverage.load_batches()
+
+
+def _record_coverage(
+    coverage: Optional[CoverageStore],
+    segment: Segment,
+    messages: Sequence[ChatMessage],
+    fetch_info: Optional[Dict],
+) -> None:
+    # Live chat keeps growing, so only replays count as covered.
+    if coverage and (fetch_info or {}).get("stream_status") not in ("live", "upcoming"):
+        coverage.add(segment, messages)
+
+
+def _offset_progress(
+    progress_callback: Optional[ProgressCallback], offset: int
+) -> Optional[ProgressCallback]:
+    if not progress_callback or not offset:
+        return progress_callback
+    return lambda processed, last_timestamp: progress_callback(offset + processed, last_timestamp)
+
+
+def _fetch_range(
+    url: str,
+    chat_config: Dict,
+    segment: Segment,
+    message_limit: Optional[int],
+    progress_callback: Optional[ProgressCallback],
+    chunk_size: int,
+    should_cancel: Optional[CancelCheck],
+    request_hooks: Sequence[RequestHook],
+    checkpoint: Optional[SegmentCheckpoint],
+    fetch_info: Optional[Dict] = None,
+    timer: Optional[StageTimer] = None,
+) -> List[ChatMessage]:
+    start_sec, end_sec = segment
+    resumed: List[ChatMessage] = []
+    if checkpoint:
+        # Replays can be entered at any offset, so resume just before the last
+        # checkpointed message; the overlap is removed by merge_segment_messages.
+        resumed, offset = checkpoint.load()
+        if offset is not None:
+            start_sec = max(start_sec, int(offset))
+
+    if timer:
+        # Innermost, so cache hits and rate limit waits are not network time.
+        request_hooks = [*request_hooks, timing_hook(timer)]
+    loader = ChatLoader(
+        request_timeout=chat_config["request_timeout"],
+        request_hooks=request_hooks,
+        timer=timer,
+    )
     message_iter = loader.fetch_messages(
         url=url,
-        message_limit=chat_config.get("message_limit"),
+        start_time=_format_seconds(start_sec) if start_sec else None,
+        end_time=_format_seconds(end_sec) if end_sec is not None else None,
+        message_limit=message_limit,
     )
+    if fetch_info is not None and loader.stream_status:
+        fetch_info["stream_status"] = loader.stream_status
+    messages = _collect_messages(
+        message_iter,
+        progress_callback,
+        chunk_size,
+        should_cancel,
+        checkpoint=checkpoint,
+        initial_processed=len(resumed),
+    )
+    if not resumed:
+        return messages
+    return merge_segment_messages([resumed, messages], message_limit)
+
+
+def _collect_messages(
+    message_iter: Iterable[ChatMessage],
+    progress_callback: Optional[ProgressCallback],
+    chunk_size: int,
+    should_cancel: Optional[CancelCheck],
+    checkpoint: Optional[SegmentCheckpoint] = None,
+    initial_processed: int = 0,
+) -> List[ChatMessage]:
+    messages: List[ChatMessage] = []
+    processed = initial_processed
+    last_timestamp: Optional[float] = None
+    chunk: List[ChatMessage] = []
 
-    for msg in message_iter:
-        chunk.append(msg)
-        last_timestamp = msg.timestamp_seconds
-        if len(chunk) >= chunk_size:
-            messages.extend(chunk)
-            processed += len(chunk)
-            chunk.clear()
-            if progress_callback:
-                progress_callback(processed, last_timestamp)
+    try:
+        for msg in message_iter:
+            _raise_if_cancelled(should_cancel)
+            chunk.append(msg)
+            last_timestamp = msg.timestamp_seconds
+            if len(chunk) >= chunk_size:
+                if checkpoint:
+                    checkpoint.add(chunk)
+                messages.extend(chunk)
+                processed += len(chunk)
+                chunk.clear()
+                if progress_callback:
+                    progress_callback(processed, last_timestamp)
+    finally:
+        # Also runs on timeouts and cancellation so the partial chunk survives.
+        if checkpoint:
+            checkpoint.add(chunk)
+            checkpoint.flush()
 
     if chunk:
         messages.extend(chunk)
@@ -73,16 +245,13 @@ def _fetch_sequential_messages(
     return messages
 
 
-def _fetch_parallel_messages(
-    url: str,
-    chat_config: Dict,
-    youtube_config: Dict,
-    progress_callback: Optional[ProgressCallback],
-) -> Optional[List[ChatMessage]]:
+def plan_fetch_segments(
+    url: str, youtube_config: Dict, duration_lookup: Optional[DurationLookup] = None
+) -> Optional[Sequence[Segment]]:
+    """Split the video into fixed-length segments, or ``None`` if that is not possible."""
     api_key = youtube_config.get("api_key")
     segment_seconds = int(youtube_config.get("segment_duration_seconds", 0))
-    max_workers = int(youtube_config.get("parallel_segments", 1))
-    if not api_key or segment_seconds <= 0 or max_workers <= 1:
+    if not api_key or segment_seconds <= 0:
         return None
 
     video_id = extract_video_id(url)
@@ -90,57 +259,158 @@ def _fetch_parallel_messages(
         return None
 
     try:
-        duration = fetch_video_duration_seconds(video_id, api_key)
+        if duration_lookup:
+            duration = duration_lookup(video_id)
+        else:
+            duration = fetch_video_duration_seconds(video_id, api_key)
     except Exception:  # requests error or parsing error
         return None
 
     if not duration or duration <= segment_seconds:
         return None
 
-    segments = _build_segments(duration, segment_seconds)
-    if not segments:
-        return None
+    return _build_segments(duration, segment_seconds) or None
+
 
+def fetch_segment_messages(
+    url: str,
+    chat_config: Dict,
+    segment: Segment,
+    progress_callback: Optional[ProgressCallback] = None,
+    should_cancel: Optional[CancelCheck] = None,
+    chunk_size: int = 1000,
+    request_hooks: Sequence[RequestHook] = (),
+    checkpoint_factory: Optional[CheckpointFactory] = None,
+    fetch_info: Optional[Dict] = None,
+    timer: Optional[StageTimer] = None,
+) -> List[ChatMessage]:
+    return _fetch_range(
+        url=url,
+        chat_config=chat_config,
+        segment=segment,
+        message_limit=None,
+        progress_callback=progress_callback,
+        chunk_size=chunk_size,
+        should_cancel=should_cancel,
+        request_hooks=request_hooks,
+        checkpoint=checkpoint_factory(segment) if checkpoint_factory else None,
+        fetch_info=fetch_info,
+        timer=timer,
+    )
+
+
+def merge_segment_messages(
+    batches: Iterable[Sequence[ChatMessage]], message_limit: Optional[int] = None
+) -> List[ChatMessage]:
+    """Combine per-segment results, dropping messages repeated on segment boundaries.
+
+    Messages with an id are unique by id. Messages without one are matched by
+    content, and only against what an earlier batch returned for the same
+    time range, so identical messages sent within one segment are all kept.
+    """
+    seen_ids = set()
+    earlier: List[Tuple[float, float, Counter]] = []
     messages: List[ChatMessage] = []
-    processed = 0
-
-    def fetch_segment(segment: Tuple[int, Optional[int]]) -> List[ChatMessage]:
-        start_sec, end_sec = segment
-        loader = ChatLoader(request_timeout=chat_config["request_timeout"])
-        start_label = _format_seconds(start_sec)
-        end_label = _format_seconds(end_sec) if end_sec is not None else None
-        iterator = loader.fetch_messages(
-            url=url,
-            start_time=start_label,
-            end_time=end_label,
-            message_limit=None,
+    for batch in batches:
+        batch = list(batch)
+        for msg in batch:
+            if msg.message_id:
+                if msg.message_id in seen_ids:
+                    continue
+                seen_ids.add(msg.message_id)
+            elif _consume_overlap(earlier, msg):
+                continue
+            messages.append(msg)
+        if batch:
+            timestamps = [msg.timestamp_seconds for msg in batch]
+            earlier.append(
+                (
+                    min(timestamps),
+                    max(timestamps),
+                    Counter(_content_key(msg) for msg in batch if not msg.message_id),
+                )
+            )
+
+    messages.sort(key=lambda msg: msg.timestamp_seconds)
+    if message_limit:
+        return messages[: int(message_limit)]
+    return messages
+
+
+def _content_key(msg: ChatMessage) -> Tuple:
+    return (msg.timestamp_seconds, msg.message, msg.is_member)
+
+
+def _consume_overlap(earlier: List[Tuple[float, float, Counter]], msg: ChatMessage) -> bool:
+    key = _content_key(msg)
+    for first, last, counts in earlier:
+        if first <= msg.timestamp_seconds <= last and counts[key] > 0:
+            counts[key] -= 1
+            return True
+    return False
+
+
+def _fetch_parallel_messages(
+    url: str,
+    chat_config: Dict,
+    youtube_config: Dict,
+    progress_callback: Optional[ProgressCallback],
+    should_cancel: Optional[CancelCheck] = None,
+    request_hooks: Sequence[RequestHook] = (),
+    checkpoint_factory: Optional[CheckpointFactory] = None,
+    fetch_info: Optional[Dict] = None,
+    timer: Optional[StageTimer] = None,
+    duration_lookup: Optional[DurationLookup] = None,
+    coverage: Optional[CoverageStore] = None,
+) -> Optional[List[ChatMessage]]:
+    max_workers = int(youtube_config.get("parallel_segments", 1))
+    if max_workers <= 1:
+        return None
+
+    with timed(timer, "plan"):
+        segments = plan_fetch_segments(url, youtube_config, duration_lookup)
+    if not segments:
+        return None
+    segments, batches = _covered_batches(coverage, segments)
+    processed = sum(len(batch) for batch in batches)
+
+    def fetch_segment(segment: Segment) -> List[ChatMessage]:
+        messages = fetch_segment_messages(
+            url,
+            chat_config,
+            segment,
+            should_cancel=should_cancel,
+            request_hooks=request_hooks,
+            checkpoint_factory=checkpoint_factory,
+            fetch_info=fetch_info,
+            timer=timer,
         )
-        return list(iterator)
+        _record_coverage(coverage, segment, messages, fetch_info)
+        return messages
 
     try:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_map = {executor.submit(fetch_segment, segment): segment for segment in segments}
             for future in as_completed(future_map):
                 segment_messages = future.result()
-                messages.extend(segment_messages)
+                batches.append(segment_messages)
                 processed += len(segment_messages)
                 if progress_callback:
                     last_ts = (
                         segment_messages[-1].timestamp_seconds if segment_messages else None
                     )
                     progress_callback(processed, last_ts)
+    except FetchCancelled:
+        raise
     except Exception:
         return None
 
-    messages.sort(key=lambda msg: msg.timestamp_seconds)
-    limit = chat_config.get("message_limit")
-    if limit:
-        return messages[: int(limit)]
-    return messages
+    with timed(timer, "merge"):
+        return merge_segment_messages(batches, chat_config.get("message_limit"))
 
 
-def _build_segments(duration_seconds: int, segment_seconds: int) -> Sequence[Tuple[int, Optional[int]]]:
-    segments: List[Tuple[int, Optional[int]]] = []
+def _build_segments(duration_seconds: int, segment_seconds: int) -> Sequence[Segment]:
+    segments: List[Segment] = []
     start = 0
     while start < duration_seconds:
         end = min(duration_seconds, start + segment_seconds)
@@ -171,37 +441,67 @@ def analyze_messages(
     keyword: Optional[str],
     cps_config: Dict,
     spike_config: Dict,
+    timer: Optional[StageTimer] = None,
 ) -> Dict:
-    analyzer = CPSAnalyzer(
+    with timed(timer, "cps"):
+        result = _cps_analyzer(cps_config).analyze(messages, keyword=keyword)
+    return _detect_spikes(result, keyword, spike_config, timer)
+
+
+def analyze_columns(
+    chat: ChatColumns,
+    keyword: Optional[str],
+    cps_config: Dict,
+    spike_config: Dict,
+    timer: Optional[StageTimer] = None,
+) -> Dict:
+    """``analyze_messages`` for a chat held as arrays, e.g. one opened from the archive."""
+    with timed(timer, "cps"):
+        result = _cps_analyzer(cps_config).analyze_columns(chat, keyword=keyword)
+    return _detect_spikes(result, keyword, spike_config, timer)
+
+
+def _cps_analyzer(cps_config: Dict) -> CPSAnalyzer:
+    return CPSAnalyzer(
         bucket_size_seconds=cps_config["bucket_size_seconds"],
         smoothing_window_seconds=cps_config["smoothing_window_seconds"],
         smoothing_average_window=cps_config.get("smoothing_average_window", 6),
     )
+
+
+def _detect_spikes(
+    result: CPSResult,
+    keyword: Optional[str],
+    spike_config: Dict,
+    timer: Optional[StageTimer],
+) -> Dict:
     detector = SpikeDetector(
         min_prominence=spike_config["min_prominence"],
         min_gap_seconds=spike_config["min_gap_seconds"],
         pre_start_buffer_seconds=spike_config.get("pre_start_buffer_seconds", 0.0),
     )
 
-    result = analyzer.analyze(messages, keyword=keyword)
     target_series = result.smoothed_keyword if keyword else result.smoothed_total
-    spikes = detector.detect(result.time_axis, target_series)
-
-    return {
-        "series": {
-            "time_axis": result.time_axis.tolist(),
-            "total": result.total_cps.tolist(),
-            "member": result.member_cps.tolist(),
-            "keyword": result.keyword_cps.tolist(),
-            "smoothed_total": result.smoothed_total.tolist(),
-            "smoothed_keyword": result.smoothed_keyword.tolist(),
-        },
-        "spikes": [
-            {
-                "start_time": spike.start_time,
-                "peak_time": spike.peak_time,
-                "peak_value": spike.peak_value,
-            }
-            for spike in spikes
-        ],
-    }
+    with timed(timer, "spike_detect"):
+        spikes = detector.detect(result.time_axis, target_series)
+
+    # Series stay arrays; they are packed or turned into lists only when sent.
+    with timed(timer, "serialize"):
+        return {
+            "series": {
+                "time_axis": result.time_axis,
+                "total": result.total_cps,
+                "member": result.member_cps,
+                "keyword": result.keyword_cps,
+                "smoothed_total": result.smoothed_total,
+                "smoothed_keyword": result.smoothed_keyword,
+            },
+            "spikes": [
+                {
+                    "start_time": spike.start_time,
+                    "peak_time": spike.peak_time,
+                    "peak_value": spike.peak_value,
+                }
+                for spike in spikes
+            ],
+        }
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from redis import Redis
+
+BATCH_KEY_PREFIX = "analysis:batch:"
+CURRENT_BATCH_PREFIX = "analysis:batch-current:"
+
+
+def channel_batch_key(channel: Dict[str, str], video_type: str, keyword: Optional[str]) -> str:
+    """Identifies repeated requests for the same channel tab and keyword."""
+    fingerprint = json.dumps([channel, video_type, (keyword or "").lower()], sort_keys=True)
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:24]
+
+
+class BatchStore:
+    """State of a channel batch: its videos waiting, in flight and finished.
+
+    Everything the batch driver needs to pick up where it stopped lives here,
+    so a driver that is restarted after a crash or a deploy lists nothing again
+    and starts no video twice. Hash fields and list items hold JSON values.
+    """
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def key(batch_id: str, part: str = "") -> str:
+        return f"{BATCH_KEY_PREFIX}{batch_id}{':' + part if part else ''}"
+
+    def _keys(self, batch_id: str) -> List[str]:
+        return [self.key(batch_id, part) for part in ("", "pending", "running", "done")]
+
+    def _touch(self, pipe, batch_id: str) -> None:
+        for key in self._keys(batch_id):
+            pipe.expire(key, self._ttl)
+
+    def current(self, channel_key: str) -> Optional[str]:
+        """Latest batch started for a channel, which a new request resumes unless it finished."""
+        raw = self._connection.get(f"{CURRENT_BATCH_PREFIX}{channel_key}")
+        return raw.decode() if raw is not None else None
+
+    def set_current(self, channel_key: str, batch_id: str) -> None:
+        self._connection.set(f"{CURRENT_BATCH_PREFIX}{channel_key}", batch_id, ex=self._ttl)
+
+    def info(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        raw = self._connection.hgetall(self.key(batch_id))
+        if not raw:
+            return None
+        return {field.decode(): json.loads(value) for field, value in raw.items()}
+
+    def update(self, batch_id: str, **fields: Any) -> None:
+        pipe = self._connection.pipeline(transaction=False)
+        pipe.hset(
+            self.key(batch_id),
+            mapping={name: json.dumps(value, ensure_ascii=False) for name, value in fields.items()},
+        )
+        self._touch(pipe, batch_id)
+        pipe.execute()
+
+    def fill(self, batch_id: str, videos: Sequence[Dict[str, Any]], **fields: Any) -> None:
+        """Queue the listed videos and record ``fields`` in one transaction."""
+        pipe = self._connection.pipeline()
+        pipe.delete(self.key(batch_id, "pending"))
+        if videos:
+            pipe.rpush(
+                self.key(batch_id, "pending"),
+                *(json.dumps(video, ensure_ascii=False) for video in videos),
+            )
+        pipe.hset(
+            self.key(batch_id),
+            mapping={name: json.dumps(value, ensure_ascii=False) for name, value in fields.items()},
+        )
+        self._touch(pipe, batch_id)
+        pipe.execute()
+
+    def next_pending(self, batch_id: str, count: int) -> List[Dict[str, Any]]:
+        if count <= 0:
+            return []
+        return [
+            json.loads(raw)
+            for raw in self._connection.lrange(self.key(batch_id, "pending"), 0, count - 1)
+        ]
+
+    def mark_started(self, batch_id: str, entries: Sequence[Dict[str, Any]]) -> None:
+        """Move the first ``len(entries)`` pending videos to the running set."""
+        if not entries:
+            return
+        pipe = self._connection.pipeline()
+        pipe.hset(
+            self.key(batch_id, "running"),
+            mapping={
+                entry["video_id"]: json.dumps(entry, ensure_ascii=False) for entry in entries
+            },
+        )
+        pipe.ltrim(self.key(batch_id, "pending"), len(entries), -1)
+        self._touch(pipe, batch_id)
+        pipe.execute()
+
+    def running(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        return {
+            video_id.decode(): json.loads(raw)
+            for video_id, raw in self._connection.hgetall(self.key(batch_id, "running")).items()
+        }
+
+    def finish(self, batch_id: str, video_id: str, record: Dict[str, Any]) -> None:
+        pipe = self._connection.pipeline()
+        pipe.hdel(self.key(batch_id, "running"), video_id)
+        pipe.hset(self.key(batch_id, "done"), video_id, json.dumps(record, ensure_ascii=False))
+        self._touch(pipe, batch_id)
+        pipe.execute()
+
+    def done(self, batch_id: str) -> List[Dict[str, Any]]:
+        return [
+            json.loads(raw) for raw in self._connection.hvals(self.key(batch_id, "done"))
+        ]
+
+    def counts(self, batch_id: str) -> Dict[str, int]:
+        pipe = self._connection.pipeline(transaction=False)
+        pipe.llen(self.key(batch_id, "pending"))
+        pipe.hlen(self.key(batch_id, "running"))
+        pipe.hlen(self.key(batch_id, "done"))
+        pending, running, done = pipe.execute()
+        return {"pending": pending, "running": running, "done": done}
+
+
+def top_spikes(records: Sequence[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """The strongest spikes across every finished video of a batch."""
+    spikes = [
+        {**spike, "video_id": record["video_id"], "title": record.get("title")}
+        for record in records
+        for spike in record.get("spikes") or []
+    ]
+    spikes.sort(key=lambda spike: spike.get("peak_value", 0), reverse=True)
+    return spikes[: max(0, int(limit))]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from functools import cached_property
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .chat_loader import ChatMessage
+from .cps_analyzer import ChatColumns
+
+ARCHIVE_VERSION = 1
+_SAFE_VIDEO_ID_RE = re.compile(r"[0-9A-Za-z_-]+")
+
+TIMESTAMPS_FILE = "timestamps.npy"
+MEMBERS_FILE = "members.npy"
+TEXT_OFFSETS_FILE = "text.offsets.npy"
+TEXT_BLOB_FILE = "text.bin.z"
+ID_OFFSETS_FILE = "ids.offsets.npy"
+ID_BLOB_FILE = "ids.bin"
+META_FILE = "meta.json"
+
+
+class ArchivedChat:
+    """Read side of one archived video.
+
+    Numeric columns are opened with ``np.load(mmap_mode="r")`` so that count
+    based analyses never touch the text blob; text and ids are only decoded
+    when asked for.
+    """
+
+    def __init__(self, path: Path, meta: dict) -> None:
+        self.path = path
+        self.meta = meta
+
+    @property
+    def count(self) -> int:
+        return int(self.meta.get("count", 0))
+
+    @cached_property
+    def timestamps(self) -> np.ndarray:
+        return np.load(self.path / TIMESTAMPS_FILE, mmap_mode="r")
+
+    @cached_property
+    def members(self) -> np.ndarray:
+        packed = np.load(self.path / MEMBERS_FILE, mmap_mode="r")
+        return np.unpackbits(packed, count=self.count).astype(bool)
+
+    def texts(self) -> List[str]:
+        offsets = np.load(self.path / TEXT_OFFSETS_FILE, mmap_mode="r")
+        blob = zlib.decompress((self.path / TEXT_BLOB_FILE).read_bytes())
+        return _split_blob(blob, offsets)
+
+    def message_ids(self) -> List[Optional[str]]:
+        offsets = np.load(self.path / ID_OFFSETS_FILE, mmap_mode="r")
+        blob = (self.path / ID_BLOB_FILE).read_bytes()
+        return [value or None for value in _split_blob(blob, offsets)]
+
+    def columns(self) -> ChatColumns:
+        """The archive as analysis input, reading the memory-mapped arrays in place."""
+        text_offsets = np.load(self.path / TEXT_OFFSETS_FILE, mmap_mode="r")
+        return ChatColumns(
+            timestamps=self.timestamps,
+            members=self.members,
+            load_texts=self.texts,
+            text_bytes=int(text_offsets[-1]),
+        )
+
+    def to_messages(self) -> List[ChatMessage]:
+        timestamps = self.timestamps.tolist()
+        members = self.members.tolist()
+        return [
+            ChatMessage(
+                timestamp_seconds=ts,
+                message=text,
+                is_member=member,
+                message_id=message_id,
+            )
+            for ts, text, member, message_id in zip(
+                timestamps, self.texts(), members, self.message_ids()
+            )
+        ]
+
+
+class ChatArchive:
+    """Per-video columnar chat archive on local (or network mounted) disk."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def path_for(self, video_id: str) -> Path:
+        if not video_id or not _SAFE_VIDEO_ID_RE.fullmatch(video_id):
+            raise ValueError(f"invalid video id for archive: {video_id!r}")
+        return self.root / video_id
+
+    def exists(self, video_id: Optional[str]) -> bool:
+        if not video_id or not _SAFE_VIDEO_ID_RE.fullmatch(video_id):
+            return False
+        return (self.path_for(video_id) / META_FILE).exists()
+
+    def open(self, video_id: Optional[str]) -> Optional[ArchivedChat]:
+        if not self.exists(video_id):
+            return None
+        # Resolve the symlink once so a concurrent rewrite cannot mix two versions.
+        path = self.path_for(video_id).resolve()
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        if meta.get("version") != ARCHIVE_VERSION:
+            return None
+        return ArchivedChat(path, meta)
+
+    def write(
+        self,
+        video_id: str,
+        messages: Sequence[ChatMessage],
+        stream_status: Optional[str] = None,
+    ) -> Path:
+        target = self.path_for(video_id)
+        ordered = sorted(messages, key=lambda msg: msg.timestamp_seconds)
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{video_id}-", dir=self.root))
+        try:
+            np.save(
+                staging / TIMESTAMPS_FILE,
+                np.fromiter((msg.timestamp_seconds for msg in ordered), dtype=np.float64),
+            )
+            np.save(
+                staging / MEMBERS_FILE,
+                np.packbits(np.fromiter((msg.is_member for msg in ordered), dtype=bool)),
+            )
+            text_offsets, text_blob = _join_blob(msg.message or "" for msg in ordered)
+            np.save(staging / TEXT_OFFSETS_FILE, text_offsets)
+            (staging / TEXT_BLOB_FILE).write_bytes(zlib.compress(text_blob, 6))
+            id_offsets, id_blob = _join_blob(msg.message_id or "" for msg in ordered)
+            np.save(staging / ID_OFFSETS_FILE, id_offsets)
+            (staging / ID_BLOB_FILE).write_bytes(id_blob)
+            meta = {
+                "version": ARCHIVE_VERSION,
+                "video_id": video_id,
+                "count": len(ordered),
+                "stream_status": stream_status,
+                "created_at": time.time(),
+            }
+            (staging / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._publish(target, staging)
+        return target
+
+    def _publish(self, target: Path, staging: Path) -> None:
+        """Point ``target`` at ``staging`` with one rename, then drop the old archive.
+
+        ``target`` is a symlink to the directory holding the current version, so
+        readers see either the old archive or the new one, never a missing or a
+        partial one, even if the process dies halfway.
+        """
+        previous = target.resolve() if target.is_symlink() else None
+        moved_aside = False
+        link = staging.with_name(f"{staging.name}.link")
+        try:
+            os.symlink(staging.name, link)
+            if target.is_dir() and not target.is_symlink():
+                # Archives written before the symlink layout are plain directories,
+                # which a symlink cannot replace; move them aside first.
+                previous = staging.with_name(f"{staging.name}.old")
+                os.rename(target, previous)
+                moved_aside = True
+            os.replace(link, target)
+        except BaseException:
+            if moved_aside and not os.path.lexists(target):
+                os.rename(previous, target)
+            if os.path.lexists(link):
+                os.unlink(link)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+
+def _join_blob(values) -> Tuple[np.ndarray, bytes]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _split_blob(blob: bytes, offsets: np.ndarray) -> List[str]:
+    bounds = offsets.tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
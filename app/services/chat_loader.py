@@ -1,9 +1,40 @@
 from __future__ import annotations
 
+import itertools
+import threading
 from dataclasses import dataclass
-from typing import Iterable, Iterator, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
 
 from chat_downloader import ChatDownloader, errors
+from chat_downloader.sites import YouTubeChatDownloader
+from chat_downloader.sites import common as _site_common
+from chat_downloader.sites import youtube as _site_youtube
+
+from .stage_timer import StageTimer, timed
+
+# hook(method, url, request_kwargs, send) -> response. Hooks wrap the HTTP calls
+# chat_downloader makes through its site session and must call ``send`` (or
+# return an equivalent response) themselves.
+RequestHook = Callable[[str, str, Dict[str, Any], Callable[[], Any]], Any]
+# Channel tabs get_user_videos can list.
+CHANNEL_VIDEO_TYPES = ("videos", "live", "shorts")
+
+# chat_downloader sleeps between polls and before retries with
+# ``interruptible_sleep``; the loader pulling messages on the current thread
+# charges that time to its timer as ``sleep``.
+_sleep_timer = threading.local()
+
+
+def _timed_sleep(sleep: Callable[..., Any]) -> Callable[..., Any]:
+    def wrapped(*args: Any, **kwargs: Any) -> Any:
+        with timed(getattr(_sleep_timer, "timer", None), "sleep"):
+            return sleep(*args, **kwargs)
+
+    return wrapped
+
+
+for _module in (_site_common, _site_youtube):
+    _module.interruptible_sleep = _timed_sleep(_module.interruptible_sleep)
 
 
 @dataclass(frozen=True)
@@ -11,13 +42,22 @@ class ChatMessage:
     timestamp_seconds: float
     message: str
     is_member: bool
+    message_id: Optional[str] = None
 
 
 class ChatLoader:
     """Wrapper around ChatDownloader to keep the rest of the app decoupled."""
 
-    def __init__(self, request_timeout: int = 10) -> None:
+    def __init__(
+        self,
+        request_timeout: int = 10,
+        request_hooks: Sequence[RequestHook] = (),
+        timer: Optional[StageTimer] = None,
+    ) -> None:
         self._timeout = request_timeout  # reserved for future use
+        self._request_hooks = list(request_hooks)
+        self._timer = timer
+        self.stream_status: Optional[str] = None
 
     def fetch_messages(
         self,
@@ -26,22 +66,34 @@ class ChatLoader:
         end_time: Optional[str] = None,
         message_limit: Optional[int] = None,
     ) -> Iterable[ChatMessage]:
-        downloader = ChatDownloader()
+        downloader = (
+            _HookedChatDownloader(self._request_hooks) if self._request_hooks else ChatDownloader()
+        )
         options = {
             "start_time": start_time,
             "end_time": end_time,
             "message_limit": message_limit,
         }
         try:
-            chat = downloader.get_chat(url, **{k: v for k, v in options.items() if v})
-            return self._serialize(chat)
+            # Workers have no terminal, so retries must not wait on stdin.
+            with timed(self._timer, "bootstrap"):
+                _sleep_timer.timer = self._timer
+                try:
+                    chat = downloader.get_chat(
+                        url, interruptible_retry=False, **{k: v for k, v in options.items() if v}
+                    )
+                finally:
+                    _sleep_timer.timer = None
+            self.stream_status = getattr(chat, "status", None)
+            messages = self._serialize(chat)
+            return self._timer.timed_iter(messages, "continuation") if self._timer else messages
         except errors.ParsingError as exc:
             raise ValueError("チャット情報を解析できませんでした。URLを確認してください。") from exc
         except errors.ChatDownloaderError as exc:
             raise ValueError("チャットの取得に失敗しました。") from exc
 
     def _serialize(self, chat_iter: Iterator[dict]) -> Iterator[ChatMessage]:
-        for message in chat_iter:
+        for message in _charge_sleeps(chat_iter, self._timer):
             timestamp = message.get("time_in_seconds")
             if timestamp is None:
                 continue
@@ -52,4 +104,79 @@ class ChatLoader:
                 timestamp_seconds=float(timestamp),
                 message=text,
                 is_member=is_member,
+                message_id=message.get("message_id"),
             )
+
+
+def _charge_sleeps(items: Iterable[dict], timer: Optional[StageTimer]) -> Iterator[dict]:
+    """Yield from ``items`` with this thread's sleeps charged to ``timer`` while pulling."""
+    iterator = iter(items)
+    while True:
+        _sleep_timer.timer = timer
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _sleep_timer.timer = None
+        yield item
+
+
+def list_channel_videos(
+    channel: Dict[str, str],
+    video_type: str = "live",
+    limit: Optional[int] = None,
+    request_hooks: Sequence[RequestHook] = (),
+) -> List[Dict[str, Any]]:
+    """Videos of a channel tab, newest first.
+
+    ``channel`` holds one of the ``get_user_videos`` keyword arguments
+    (``channel_id``, ``user_id``, ``custom_username`` or ``handle``).
+    """
+    downloader = _HookedChatDownloader(request_hooks) if request_hooks else ChatDownloader()
+    site = downloader.create_session(YouTubeChatDownloader)
+    try:
+        videos = site.get_user_videos(video_type=video_type, **channel)
+        return list(itertools.islice(videos, limit) if limit else videos)
+    except errors.NoVideos:
+        return []
+    except errors.UserNotFound as exc:
+        raise ValueError("チャンネルが見つかりませんでした。URLを確認してください。") from exc
+    except errors.ChatDownloaderError as exc:
+        raise ValueError("チャンネルの動画一覧を取得できませんでした。") from exc
+
+
+class _HookedChatDownloader(ChatDownloader):
+    """ChatDownloader whose site sessions route ``_session_get``/``_session_post`` through hooks."""
+
+    def __init__(self, request_hooks: Sequence[RequestHook], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._request_hooks = list(request_hooks)
+
+    def create_session(self, *args: Any, **kwargs: Any):
+        site = super().create_session(*args, **kwargs)
+        if not getattr(site, "_request_hooks_installed", False):
+            for method in ("get", "post"):
+                attr = f"_session_{method}"
+                wrapped = _wrap_request(method.upper(), getattr(site, attr), self._request_hooks)
+                setattr(site, attr, wrapped)
+            site._request_hooks_installed = True
+        return site
+
+
+def _wrap_request(method: str, send: Callable[..., Any], hooks: Sequence[RequestHook]):
+    def wrapped(url: str, **kwargs: Any):
+        def call() -> Any:
+            return send(url, **kwargs)
+
+        for hook in reversed(hooks):
+            call = _bind_hook(hook, method, url, kwargs, call)
+        return call()
+
+    return wrapped
+
+
+def _bind_hook(
+    hook: RequestHook, method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]
+) -> Callable[[], Any]:
+    return lambda: hook(method, url, kwargs, send)
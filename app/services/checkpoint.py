@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from redis import Redis
+from redis.exceptions import WatchError
+
+from .chat_loader import ChatMessage
+from .message_store import decode_messages, encode_messages
+
+CHECKPOINT_KEY_PREFIX = "analysis:checkpoint:"
+# How long a checkpoint stays claimed by a job that stopped writing to it.
+_MIN_LEASE_SECONDS = 300
+
+
+class SegmentCheckpoint:
+    """Incremental record of how far a segment fetch got and what it fetched.
+
+    Messages are appended to a Redis list in compressed chunks and the replay
+    offset reached is kept next to them, so a retried or resubmitted fetch can
+    restart the segment from that offset instead of from its beginning.
+
+    Checkpoints are per video, so a job claims one under ``owner`` (its job
+    id, which a retry keeps) before using it. While another job's claim is
+    live the checkpoint is left alone and the fetch runs without one; a claim
+    lapses when its owner has not written for the lease, so a resubmission
+    can take over from a job that died.
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        key: str,
+        ttl_seconds: int,
+        interval_seconds: float,
+        owner: str,
+    ) -> None:
+        self._connection = connection
+        self._chunks_key = f"{key}:chunks"
+        self._offset_key = f"{key}:offset"
+        self._owner_key = f"{key}:owner"
+        self._owner = owner
+        self._ttl = max(1, int(ttl_seconds))
+        self._interval = max(0.0, interval_seconds)
+        self._lease = max(_MIN_LEASE_SECONDS, int(self._interval * 10))
+        self._owned = False
+        self._pending: List[ChatMessage] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[List[ChatMessage], Optional[float]]:
+        self._owned = self._claim()
+        if not self._owned:
+            return [], None
+        pipe = self._connection.pipeline()
+        pipe.lrange(self._chunks_key, 0, -1)
+        pipe.get(self._offset_key)
+        chunks, offset = pipe.execute()
+        messages: List[ChatMessage] = []
+        for chunk in chunks:
+            messages.extend(decode_messages(chunk))
+        return messages, float(offset) if offset is not None else None
+
+    def add(self, messages: Sequence[ChatMessage]) -> None:
+        with self._lock:
+            self._pending.extend(messages)
+            due = time.monotonic() - self._last_flush >= self._interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending or not self._owned:
+            return
+
+        def write(pipe) -> None:
+            pipe.rpush(self._chunks_key, encode_messages(pending))
+            pipe.set(self._offset_key, max(msg.timestamp_seconds for msg in pending))
+            pipe.expire(self._chunks_key, self._ttl)
+            pipe.expire(self._offset_key, self._ttl)
+            pipe.set(self._owner_key, self._owner, ex=self._lease)
+
+        self._owned = self._if_owner(write)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending = []
+        if self._owned:
+            self._if_owner(
+                lambda pipe: pipe.delete(self._chunks_key, self._offset_key, self._owner_key)
+            )
+            self._owned = False
+
+    def _claim(self) -> bool:
+        if self._connection.set(self._owner_key, self._owner, nx=True, ex=self._lease):
+            return True
+        # A retry of the owning job keeps its claim.
+        return self._if_owner(lambda pipe: pipe.expire(self._owner_key, self._lease))
+
+    def _if_owner(self, write) -> bool:
+        """Run ``write`` in a transaction unless another job holds the claim."""
+        with self._connection.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self._owner_key)
+                    current = pipe.get(self._owner_key)
+                    if current is not None and current.decode() != self._owner:
+                        return False
+                    pipe.multi()
+                    write(pipe)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+
+class CheckpointStore:
+    """Hands out segment checkpoints for one video and remembers which were opened."""
+
+    def __init__(
+        self,
+        connection: Redis,
+        video_key: str,
+        ttl_seconds: int,
+        interval_seconds: float,
+        owner: str,
+    ) -> None:
+        self._connection = connection
+        self._video_key = video_key
+        self._owner = owner
+        self._ttl = ttl_seconds
+        self._interval = interval_seconds
+        self._opened: List[SegmentCheckpoint] = []
+        self._lock = threading.Lock()
+
+    def for_segment(self, segment: Tuple[int, Optional[int]]) -> SegmentCheckpoint:
+        start, end = segment
+        end_label = "end" if end is None else str(int(end))
+        key = f"{CHECKPOINT_KEY_PREFIX}{self._video_key}:{int(start)}-{end_label}"
+        checkpoint = SegmentCheckpoint(
+            self._connection, key, self._ttl, self._interval, self._owner
+        )
+        with self._lock:
+            self._opened.append(checkpoint)
+        return checkpoint
+
+    def clear_opened(self) -> None:
+        """Drop the checkpoints of a fetch whose result has been stored elsewhere."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for checkpoint in opened:
+            checkpoint.clear()
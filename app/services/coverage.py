@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+from redis import Redis
+
+from .chat_loader import ChatMessage
+from .message_store import decode_messages, encode_messages
+
+COVERAGE_KEY_PREFIX = "analysis:coverage:"
+
+Interval = Tuple[float, Optional[float]]
+
+
+class CoverageStore:
+    """Time ranges of one video whose chat has been fetched, with the messages.
+
+    Each completed range is a field of a Redis hash named ``<start>-<end>``
+    (``end`` for an open-ended range), so later pipelines can skip it and
+    merge the stored messages instead of fetching them again.
+    """
+
+    def __init__(self, connection: Redis, video_key: str, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._key = f"{COVERAGE_KEY_PREFIX}{video_key}"
+        self._ttl = max(1, int(ttl_seconds))
+
+    def add(self, interval: Interval, messages: Sequence[ChatMessage]) -> None:
+        pipe = self._connection.pipeline()
+        pipe.hset(self._key, _field(interval), encode_messages(messages))
+        pipe.expire(self._key, self._ttl)
+        pipe.execute()
+
+    def intervals(self) -> List[Interval]:
+        return sorted(_parse_field(field.decode()) for field in self._connection.hkeys(self._key))
+
+    def load_batches(self) -> List[List[ChatMessage]]:
+        raw = self._connection.hgetall(self._key)
+        return [decode_messages(value) for value in raw.values()]
+
+    def clear(self) -> None:
+        self._connection.delete(self._key)
+
+
+def uncovered_segments(
+    segments: Sequence[Interval], covered: Sequence[Interval]
+) -> List[Tuple[int, Optional[int]]]:
+    """Cut the covered ranges out of ``segments`` and return what is left to fetch."""
+    merged = _merge_intervals(covered)
+    gaps: List[Tuple[int, Optional[int]]] = []
+    for start, end in segments:
+        cursor = float(start)
+        stop = math.inf if end is None else float(end)
+        for covered_start, covered_end in merged:
+            if covered_end <= cursor or covered_start >= stop:
+                continue
+            if covered_start > cursor:
+                gaps.append((int(cursor), int(math.ceil(covered_start))))
+            cursor = max(cursor, covered_end)
+            if cursor >= stop:
+                break
+        if cursor < stop:
+            gaps.append((int(cursor), None if end is None else int(end)))
+    return gaps
+
+
+def _merge_intervals(intervals: Sequence[Interval]) -> List[Tuple[float, float]]:
+    merged: List[Tuple[float, float]] = []
+    bounded = ((float(start), math.inf if end is None else float(end)) for start, end in intervals)
+    for start, end in sorted(bounded):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _field(interval: Interval) -> str:
+    start, end = interval
+    return f"{int(start)}-{'end' if end is None else int(end)}"
+
+
+def _parse_field(field: str) -> Interval:
+    start, end = field.split("-", 1)
+    return float(start), None if end == "end" else float(end)
@@ -1,12 +1,85 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from .chat_loader import ChatMessage
 
+# Keyword hit masks kept per chat; older ones are dropped first.
+KEYWORD_INDEX_LIMIT = 8
+
+
+@dataclass(frozen=True)
+class ChatColumns:
+    """A chat held as parallel arrays, e.g. memory-mapped from the chat archive.
+
+    Texts sit behind ``load_texts`` so that analyses without a keyword never
+    decode them. Texts, bucket indexes and keyword hit masks are computed once
+    per instance, so a chat kept in a worker's cache answers repeated keyword
+    queries without touching its texts again. Cached chats are shared by the
+    job threads of a worker, so the indexes are built under a per-instance
+    lock. ``text_bytes`` is the size of the texts when known before loading
+    them.
+    """
+
+    timestamps: np.ndarray
+    members: np.ndarray
+    load_texts: Callable[[], Sequence[str]]
+    text_bytes: Optional[int] = None
+    _indexes: Dict[Any, Any] = field(default_factory=dict, compare=False, repr=False)
+    # Reentrant because keyword_hits loads the texts while holding it.
+    _lock: threading.RLock = field(default_factory=threading.RLock, compare=False, repr=False)
+
+    @classmethod
+    def from_messages(cls, messages: Sequence[ChatMessage]) -> "ChatColumns":
+        # The texts are taken now so that the messages themselves can be freed.
+        texts = [msg.message for msg in messages]
+        return cls(
+            timestamps=np.fromiter(
+                (msg.timestamp_seconds for msg in messages), dtype=np.float64, count=len(messages)
+            ),
+            members=np.fromiter((msg.is_member for msg in messages), dtype=bool, count=len(messages)),
+            load_texts=lambda: texts,
+            text_bytes=sum(len(text) for text in texts if isinstance(text, str)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def texts(self) -> Sequence[str]:
+        with self._lock:
+            if ("texts",) not in self._indexes:
+                self._indexes[("texts",)] = self.load_texts()
+            return self._indexes[("texts",)]
+
+    def bucket_index(self, bucket_size: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted non-empty bucket numbers and the bucket of every message."""
+        key = ("buckets", bucket_size)
+        with self._lock:
+            if key not in self._indexes:
+                buckets = np.floor(np.asarray(self.timestamps) / bucket_size).astype(np.int64)
+                self._indexes[key] = np.unique(buckets, return_inverse=True)
+            return self._indexes[key]
+
+    def keyword_hits(self, keyword: str) -> np.ndarray:
+        needle = keyword.lower()
+        with self._lock:
+            hits = self._indexes.get(("keyword", needle))
+            if hits is None:
+                hits = np.fromiter(
+                    (isinstance(text, str) and needle in text.lower() for text in self.texts()),
+                    dtype=bool,
+                    count=len(self),
+                )
+                cached = [key for key in self._indexes if key[0] == "keyword"]
+                for stale in cached[: max(0, len(cached) - KEYWORD_INDEX_LIMIT + 1)]:
+                    del self._indexes[stale]
+                self._indexes[("keyword", needle)] = hits
+            return hits
+
 
 @dataclass(frozen=True)
 class CPSResult:
@@ -37,8 +110,29 @@ class CPSAnalyzer:
 
         buckets = self._accumulate_counts(series, keyword=keyword)
         time_axis, total, member, keyword_counts = self._build_arrays(buckets)
-        smoothed_total = self._smooth_series(total)
-        smoothed_keyword = self._smooth_series(keyword_counts)
+        smoothed_total = self.smooth_series(total)
+        smoothed_keyword = self.smooth_series(keyword_counts)
+        return CPSResult(time_axis, total, member, keyword_counts, smoothed_total, smoothed_keyword)
+
+    def analyze_columns(self, chat: ChatColumns, keyword: str | None = None) -> CPSResult:
+        """``analyze`` over arrays; same buckets and values, without a per-message loop."""
+        if not len(chat):
+            empty = np.array([])
+            return CPSResult(empty, empty, empty, empty, empty, empty)
+
+        bucket_indices, inverse = chat.bucket_index(self.bucket_size)
+        size = len(bucket_indices)
+        time_axis = bucket_indices.astype(float) * self.bucket_size
+        total = np.bincount(inverse, minlength=size).astype(float)
+        member = np.bincount(inverse[np.asarray(chat.members, dtype=bool)], minlength=size).astype(float)
+        if keyword:
+            keyword_counts = np.bincount(
+                inverse[chat.keyword_hits(keyword)], minlength=size
+            ).astype(float)
+        else:
+            keyword_counts = np.zeros(size)
+        smoothed_total = self.smooth_series(total)
+        smoothed_keyword = self.smooth_series(keyword_counts)
         return CPSResult(time_axis, total, member, keyword_counts, smoothed_total, smoothed_keyword)
 
     def _accumulate_counts(
@@ -68,7 +162,7 @@ class CPSAnalyzer:
         keyword = np.array([buckets[idx]["keyword"] for idx in bucket_indices], dtype=float)
         return time_axis, total, member, keyword
 
-    def _smooth_series(self, series: np.ndarray) -> np.ndarray:
+    def smooth_series(self, series: np.ndarray) -> np.ndarray:
         if series.size == 0:
             return series
         window = np.ones(self.smoothing_window, dtype=float) / self.smoothing_window
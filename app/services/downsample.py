@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+TIME_AXIS = "time_axis"
+
+
+def lttb_buckets(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: pick ``points`` indices that keep the shape of ``y``.
+
+    Returns the selected indices and the ``points + 1`` bucket edges they were
+    picked from; the first and last points are always kept as buckets of their own.
+    """
+    size = len(y)
+    if points >= size or points < 3:
+        indices = np.arange(size)
+        return indices, np.arange(size + 1)
+
+    every = (size - 2) / (points - 2)
+    edges = np.empty(points + 1, dtype=np.int64)
+    edges[0] = 0
+    edges[1:-1] = (np.arange(points - 1) * every).astype(np.int64) + 1
+    edges[-1] = size
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = np.empty(points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = size - 1
+    selected = 0
+    for bucket in range(1, points - 1):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[bucket] = selected
+    return indices, edges
+
+
+@dataclass(frozen=True)
+class DownsamplePlan:
+    """LTTB indices and buckets picked once and applied to every series of that length."""
+
+    size: int
+    indices: np.ndarray
+    edges: np.ndarray
+
+
+def plan_downsample(
+    result: Optional[Dict], points: Optional[int], primary: str = "smoothed_total"
+) -> Optional[DownsamplePlan]:
+    """Pick LTTB indices on ``primary``, or ``None`` when there is nothing to reduce."""
+    if not result or not points:
+        return None
+    series = result.get("series") or {}
+    time_axis = _first_present(series, (TIME_AXIS,))
+    size = len(time_axis)
+    if size <= points:
+        return None
+    target = _first_present(series, (primary, "smoothed_total"))
+    if len(target) != size:
+        target = np.zeros(size)
+    return _lttb_plan(time_axis, target, points)
+
+
+def plan_shared_downsample(
+    results: Sequence[Tuple[Optional[Dict], str]], points: Optional[int]
+) -> Optional[DownsamplePlan]:
+    """One plan for results on the same time axis, each given with its primary series.
+
+    LTTB runs on the pointwise maximum of the primaries, each scaled to its own
+    peak, so a keyword series far below the total still keeps its peaks.
+    """
+    present = [(result, primary) for result, primary in results if result]
+    if not present or not points:
+        return None
+    time_axis = _first_present(present[0][0].get("series") or {}, (TIME_AXIS,))
+    size = len(time_axis)
+    if size <= points:
+        return None
+    target = np.zeros(size)
+    for result, primary in present:
+        values = _first_present(result.get("series") or {}, (primary, "smoothed_total"))
+        if len(values) != size:
+            continue
+        values = np.asarray(values, dtype=np.float64)
+        peak = np.abs(values).max()
+        if peak > 0:
+            np.maximum(target, values / peak, out=target)
+    return _lttb_plan(time_axis, target, points)
+
+
+def _lttb_plan(time_axis: Any, target: Any, points: int) -> DownsamplePlan:
+    indices, edges = lttb_buckets(
+        np.asarray(time_axis, dtype=np.float64), np.asarray(target, dtype=np.float64), points
+    )
+    return DownsamplePlan(size=len(time_axis), indices=indices, edges=edges)
+
+
+def apply_downsample(result: Optional[Dict], plan: Optional[DownsamplePlan]) -> Optional[Dict]:
+    """Sample every series at the plan's indices and add the min/max of each bucket.
+
+    Spikes are left untouched; they were detected on the full-resolution series.
+    """
+    if not result:
+        return result
+    series = result.get("series") or {}
+    size = len(_first_present(series, (TIME_AXIS, *series)))
+    if plan is None or plan.size != size:
+        return {**result, "resolution": {"points": size, "source_points": size}}
+
+    starts = plan.edges[:-1]
+    sampled: Dict[str, Any] = {}
+    envelope: Dict[str, Dict[str, np.ndarray]] = {}
+    for name, values in series.items():
+        if len(values) != size:
+            sampled[name] = values
+            continue
+        array = np.asarray(values, dtype=np.float64)
+        sampled[name] = array[plan.indices]
+        if name != TIME_AXIS:
+            envelope[name] = {
+                "min": np.minimum.reduceat(array, starts),
+                "max": np.maximum.reduceat(array, starts),
+            }
+    return {
+        **result,
+        "series": sampled,
+        "envelope": envelope,
+        "resolution": {"points": len(plan.indices), "source_points": size},
+    }
+
+
+def downsample_result(
+    result: Optional[Dict], points: Optional[int], primary: str = "smoothed_total"
+) -> Optional[Dict]:
+    """Reduce the series of a formatted result to ``points`` samples on a shared time axis.
+
+    Indices come from LTTB on ``primary`` (falling back to the smoothed total
+    when it is empty), and every series also gets the min/max of the bucket each
+    sample stands for so short bursts stay visible.
+    """
+    if not points:
+        return result
+    return apply_downsample(result, plan_downsample(result, points, primary))
+
+
+def _first_present(series: Dict[str, Any], names: Sequence[str]) -> Any:
+    # Series may be lists or arrays, so emptiness is checked by length.
+    for name in names:
+        values = series.get(name)
+        if values is not None and len(values):
+            return values
+    return []
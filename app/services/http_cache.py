@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from chat_downloader.errors import ChatDownloaderError
+
+from .chat_loader import RequestHook
+
+MODES = ("off", "record", "replay", "cache")
+
+
+class ReplayMissError(ChatDownloaderError):
+    """Raised in replay mode when a request was never recorded.
+
+    Not a ``RequestException``, so chat_downloader does not retry it.
+    """
+
+
+class RecordedResponse:
+    """The part of ``requests.Response`` that chat_downloader reads."""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], body: str) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = body
+        self.ok = status_code < 400
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class HttpCache:
+    """Stores raw chat_downloader responses as gzip files keyed by request.
+
+    ``record`` always goes to the network and saves the response, ``replay``
+    only serves saved responses, and ``cache`` serves saved responses and
+    records the ones that are missing.
+    """
+
+    def __init__(self, directory: Path | str, mode: str = "cache") -> None:
+        if mode not in MODES:
+            raise ValueError(f"unknown http cache mode: {mode!r}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def load(self, key: str) -> Optional[RecordedResponse]:
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            entry = json.load(fh)
+        return RecordedResponse(
+            entry["url"], entry["status_code"], entry.get("headers", {}), entry["body"]
+        )
+
+    def save(self, key: str, method: str, url: str, response: Any) -> None:
+        entry = {
+            "method": method,
+            "url": url,
+            "status_code": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            "body": response.text,
+        }
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.count("recorded")
+
+
+def request_key(method: str, url: str, kwargs: Dict[str, Any]) -> str:
+    """Identify a request by what selects the response rather than by the whole body.
+
+    Continuation posts carry client context and auth headers that change
+    between runs; the continuation token and replay offset are what decide
+    which chat page YouTube answers with.
+    """
+    body = kwargs.get("json")
+    selector: Any = None
+    if isinstance(body, dict):
+        selector = {
+            "continuation": body.get("continuation"),
+            "player_state": body.get("currentPlayerState"),
+        }
+    elif body is not None:
+        selector = body
+    payload = json.dumps(
+        [method.upper(), url, kwargs.get("params"), selector], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def http_cache_hook(cache: HttpCache) -> RequestHook:
+    def hook(method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        key = request_key(method, url, kwargs)
+        if cache.mode in ("replay", "cache"):
+            recorded = cache.load(key)
+            if recorded is not None:
+                cache.count("hits")
+                return recorded
+            cache.count("misses")
+            if cache.mode == "replay":
+                raise ReplayMissError(f"no recorded response for {method} {url}")
+        response = send()
+        # 429 and 5xx are transient; replaying them would only repeat the failure.
+        status = getattr(response, "status_code", 0)
+        if status != 429 and status < 500:
+            cache.save(key, method, url, response)
+        return response
+
+    return hook
+
+
+def build_http_cache(http_cache_config: Optional[Dict]) -> Optional[HttpCache]:
+    if not http_cache_config:
+        return None
+    mode = http_cache_config.get("mode", "off")
+    if mode == "off":
+        return None
+    return HttpCache(http_cache_config["directory"], mode)
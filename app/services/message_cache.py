@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from .cps_analyzer import KEYWORD_INDEX_LIMIT, ChatColumns
+
+# Rough per-message cost of a cached chat: the timestamp, member and bucket
+# index arrays, the keyword hit masks, and one CPython str in the text list.
+_ROW_OVERHEAD_BYTES = 8 + 1 + 8 + KEYWORD_INDEX_LIMIT + 8 + 49
+
+
+def estimate_size(chat: ChatColumns) -> int:
+    return len(chat) * _ROW_OVERHEAD_BYTES + (chat.text_bytes or 0) * 2
+
+
+class MessageCache:
+    """In-process LRU of decoded chats per pipeline, bounded by a memory budget.
+
+    Decoding a large message store takes longer than analyzing it, so a worker
+    that keeps recent pipelines decoded, with their bucket and keyword indexes,
+    can answer keyword recomputes without touching Redis. Entries larger than
+    the whole budget are not kept.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[ChatColumns, int]]" = OrderedDict()
+        self._size = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, pipeline_id: str) -> Optional[ChatColumns]:
+        with self._lock:
+            entry = self._entries.get(pipeline_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(pipeline_id)
+            return entry[0]
+
+    def put(
+        self,
+        pipeline_id: str,
+        chat: ChatColumns,
+        on_evict: Optional[Callable[[List[str]], None]] = None,
+    ) -> bool:
+        """Keep ``chat``; returns whether it fits in the budget.
+
+        ``on_evict`` is called, outside the lock, with the pipelines pushed out
+        to make room.
+        """
+        size = estimate_size(chat)
+        if size > self._max_bytes:
+            return False
+        evicted: List[str] = []
+        with self._lock:
+            previous = self._entries.pop(pipeline_id, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[pipeline_id] = (chat, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                evicted_id, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                evicted.append(evicted_id)
+        if evicted and on_evict:
+            on_evict(evicted)
+        return True
+
+    def discard(self, pipeline_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(pipeline_id, None)
+            if entry is not None:
+                self._size -= entry[1]
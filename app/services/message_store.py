@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import zlib
+from typing import List, Optional, Sequence
+
+from redis import Redis
+
+from .chat_loader import ChatMessage
+
+MESSAGE_KEY_PREFIX = "analysis:messages:"
+
+
+class MessageStore:
+    """Keeps fetched chat messages in Redis so later pipeline stages can reuse them."""
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def key(job_id: str) -> str:
+        return f"{MESSAGE_KEY_PREFIX}{job_id}"
+
+    def save(self, job_id: str, messages: Sequence[ChatMessage]) -> None:
+        self._connection.set(self.key(job_id), encode_messages(messages), ex=self._ttl)
+
+    def load(self, job_id: str) -> Optional[List[ChatMessage]]:
+        raw = self._connection.get(self.key(job_id))
+        if raw is None:
+            return None
+        return decode_messages(raw)
+
+    def exists(self, job_id: str) -> bool:
+        return bool(self._connection.exists(self.key(job_id)))
+
+    def delete(self, job_id: str) -> None:
+        self._connection.delete(self.key(job_id))
+
+
+def encode_messages(messages: Sequence[ChatMessage]) -> bytes:
+    columns = {
+        "t": [msg.timestamp_seconds for msg in messages],
+        "m": [msg.message for msg in messages],
+        "b": [1 if msg.is_member else 0 for msg in messages],
+        "i": [msg.message_id for msg in messages],
+    }
+    body = json.dumps(columns, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(body.encode("utf-8"))
+
+
+def decode_messages(raw: bytes) -> List[ChatMessage]:
+    columns = json.loads(zlib.decompress(raw).decode("utf-8"))
+    message_ids = columns.get("i") or [None] * len(columns["t"])
+    return [
+        ChatMessage(
+            timestamp_seconds=float(ts),
+            message=text,
+            is_member=bool(member),
+            message_id=message_id,
+        )
+        for ts, text, member, message_id in zip(
+            columns["t"], columns["m"], columns["b"], message_ids
+        )
+    ]
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from redis import Redis
+
+from .chat_loader import RequestHook
+
+METRICS_KEY = "analysis:metrics"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    kind: str
+    help: str
+    buckets: Tuple[float, ...] = ()
+
+
+SPECS: Dict[str, MetricSpec] = {
+    "chat_pipelines_started_total": MetricSpec("counter", "Analyses requested through the API."),
+    "chat_jobs_started_total": MetricSpec("counter", "Stage jobs started by workers."),
+    "chat_jobs_finished_total": MetricSpec("counter", "Stage jobs finished, by outcome."),
+    "chat_job_duration_seconds": MetricSpec(
+        "histogram", "Wall time of stage jobs.", _JOB_BUCKETS
+    ),
+    "chat_job_startup_seconds": MetricSpec(
+        "histogram",
+        "Time from a worker dispatching a job to its body running (fork, imports, RQ setup).",
+        _LATENCY_BUCKETS,
+    ),
+    "chat_batch_videos_total": MetricSpec(
+        "counter", "Videos finished by channel batches, by outcome."
+    ),
+    "chat_fetched_messages_total": MetricSpec("counter", "Chat messages fetched from YouTube."),
+    "chat_fetch_seconds_total": MetricSpec(
+        "counter", "Wall time of fetch jobs; messages/sec is the rate of the message counter."
+    ),
+    "youtube_requests_total": MetricSpec("counter", "Requests sent to YouTube, by status."),
+    "youtube_request_seconds": MetricSpec(
+        "histogram", "Latency of requests sent to YouTube.", _LATENCY_BUCKETS
+    ),
+    "youtube_throttled_total": MetricSpec("counter", "Responses from YouTube with status 429."),
+    "http_request_duration_seconds": MetricSpec(
+        "histogram", "Latency of the web endpoints.", _LATENCY_BUCKETS
+    ),
+    "rq_queue_depth": MetricSpec("gauge", "Jobs waiting in each RQ queue."),
+    "rq_jobs_running": MetricSpec("gauge", "Jobs currently running for each RQ queue."),
+}
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms keyed by their exposition series."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, float] = {}
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        series = _series(name, labels)
+        with self._lock:
+            self._values[series] = self._values.get(series, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_series(name, labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        spec = SPECS[name]
+        updates = [
+            _series(f"{name}_bucket", {**labels, "le": _format_bound(bound)})
+            for bound in (*spec.buckets, math.inf)
+            if value <= bound
+        ]
+        with self._lock:
+            for series in updates:
+                self._values[series] = self._values.get(series, 0.0) + 1
+            for suffix, amount in (("_sum", value), ("_count", 1.0)):
+                series = _series(f"{name}{suffix}", labels)
+                self._values[series] = self._values.get(series, 0.0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def drain(self) -> Dict[str, float]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Mapping[str, float]) -> None:
+        with self._lock:
+            for series, value in values.items():
+                self._values[series] = self._values.get(series, 0.0) + value
+
+
+def push_metrics(connection: Redis, registry: MetricsRegistry) -> None:
+    """Add what ``registry`` collected since the last push to the shared Redis hash.
+
+    Forking RQ workers lose their memory after every job, so workers publish
+    through Redis and the web process serves the totals.
+    """
+    values = registry.drain()
+    if not values:
+        return
+    try:
+        pipe = connection.pipeline(transaction=False)
+        for series, value in values.items():
+            pipe.hincrbyfloat(METRICS_KEY, series, value)
+        pipe.execute()
+    except Exception:
+        registry.merge(values)
+        raise
+
+
+def read_metrics(connection: Redis) -> Dict[str, float]:
+    raw = connection.hgetall(METRICS_KEY)
+    return {key.decode(): float(value) for key, value in raw.items()}
+
+
+def render_metrics(*sources: Mapping[str, float]) -> str:
+    """Render series in the Prometheus text exposition format, adding up duplicates."""
+    combined: Dict[str, float] = {}
+    for source in sources:
+        for series, value in source.items():
+            combined[series] = combined.get(series, 0.0) + value
+
+    grouped: Dict[str, List[str]] = {}
+    for series in sorted(combined, key=_sort_key):
+        grouped.setdefault(_metric_name(series), []).append(series)
+
+    lines = []
+    for name, series_list in grouped.items():
+        spec = SPECS.get(name)
+        if spec:
+            lines.append(f"# HELP {name} {spec.help}")
+            lines.append(f"# TYPE {name} {spec.kind}")
+        for series in series_list:
+            lines.append(f"{series} {_format_value(combined[series])}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_hook(registry: MetricsRegistry) -> RequestHook:
+    def hook(method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            response = send()
+        except Exception:
+            registry.inc("youtube_requests_total", status="error")
+            raise
+        registry.observe("youtube_request_seconds", time.perf_counter() - started)
+        status = getattr(response, "status_code", 0)
+        registry.inc("youtube_requests_total", status=str(status))
+        if status == 429:
+            registry.inc("youtube_throttled_total")
+        return response
+
+    return hook
+
+
+def _series(name: str, labels: Mapping[str, str]) -> str:
+    if not labels:
+        return name
+    body = ",".join(f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{body}}}"
+
+
+def _metric_name(series: str) -> str:
+    name = series.split("{", 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        base = name[: -len(suffix)]
+        if name.endswith(suffix) and SPECS.get(base, MetricSpec("", "")).kind == "histogram":
+            return base
+    return name
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _sort_key(series: str) -> Tuple[str, float]:
+    # Keeps histogram buckets in ascending ``le`` order rather than string order.
+    head, marker, tail = series.partition('le="')
+    if not marker:
+        return series, 0.0
+    bound, _, rest = tail.partition('"')
+    return head + rest, math.inf if bound == "+Inf" else float(bound)
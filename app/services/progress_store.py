@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from redis import Redis
+
+PROGRESS_KEY_PREFIX = "analysis:progress:"
+
+
+class ProgressStore:
+    """Small per-pipeline hash with the live progress of its stage jobs.
+
+    Fields are named ``<stage>:<field>`` and hold JSON values, so one HGETALL
+    returns the progress of every stage without loading any job meta.
+    """
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def key(pipeline_id: str) -> str:
+        return f"{PROGRESS_KEY_PREFIX}{pipeline_id}"
+
+    def write(
+        self, pipeline_id: str, stage: str, fields: Mapping[str, Any], pipe: Optional[Any] = None
+    ) -> None:
+        """Queue the writes on ``pipe`` when given, otherwise send them right away."""
+        if not fields:
+            return
+        key = self.key(pipeline_id)
+        target = pipe if pipe is not None else self._connection.pipeline(transaction=False)
+        mapping = {f"{stage}:{name}": json.dumps(value) for name, value in fields.items()}
+        target.hset(key, mapping=mapping)
+        target.expire(key, self._ttl)
+        if pipe is None:
+            target.execute()
+
+    def read(self, pipeline_id: str) -> Dict[str, Dict[str, Any]]:
+        progress: Dict[str, Dict[str, Any]] = {}
+        for field, value in self._connection.hgetall(self.key(pipeline_id)).items():
+            stage, _, name = field.decode().partition(":")
+            progress.setdefault(stage, {})[name] = json.loads(value)
+        return progress
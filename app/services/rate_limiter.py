@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from redis import Redis
+
+from .chat_loader import RequestHook
+
+RATE_LIMIT_KEY_PREFIX = "analysis:ratelimit:"
+STATS_KEY = f"{RATE_LIMIT_KEY_PREFIX}stats"
+
+# Refills every bucket in KEYS by elapsed time and takes one token from each only
+# if all of them have one, so the global and per-video limits are consumed
+# atomically. Returns 0 on success, otherwise the milliseconds until the
+# slowest bucket refills. Time comes from the Redis server so that workers with
+# skewed clocks share one timeline.
+_TOKEN_BUCKET_LUA = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local count = #KEYS
+local tokens = {}
+local wait = 0
+for i = 1, count do
+    local rate = tonumber(ARGV[(i - 1) * 2 + 1])
+    local capacity = tonumber(ARGV[(i - 1) * 2 + 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local current = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    current = math.min(capacity, current + math.max(0, now - updated) * rate / 1000)
+    tokens[i] = current
+    if current < 1 then
+        wait = math.max(wait, math.ceil((1 - current) * 1000 / rate))
+    end
+end
+for i = 1, count do
+    local rate = tonumber(ARGV[(i - 1) * 2 + 1])
+    local capacity = tonumber(ARGV[(i - 1) * 2 + 2])
+    local remaining = tokens[i]
+    if wait == 0 then
+        remaining = remaining - 1
+    end
+    redis.call('HSET', KEYS[i], 'tokens', remaining, 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(capacity * 1000 / rate) + 60000)
+end
+return wait
+"""
+
+# Puts a bucket into debt so every worker backs off after YouTube answered 429.
+_PENALTY_LUA = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local debt = tonumber(ARGV[1])
+redis.call('HSET', KEYS[1], 'tokens', -debt, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class Bucket:
+    key: str
+    rate_per_second: float
+    burst: float
+
+
+class RedisRateLimiter:
+    """Cluster-wide token bucket shared by every worker that talks to YouTube."""
+
+    def __init__(
+        self,
+        connection: Redis,
+        buckets: Sequence[Bucket],
+        penalty_seconds: float = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._connection = connection
+        self._buckets = [bucket for bucket in buckets if bucket.rate_per_second > 0]
+        self._penalty_seconds = max(0.0, penalty_seconds)
+        self._sleep = sleep
+        self._acquire_script = connection.register_script(_TOKEN_BUCKET_LUA)
+        self._penalty_script = connection.register_script(_PENALTY_LUA)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "rejected_429": 0,
+        }
+
+    def acquire(self) -> float:
+        """Block until every bucket grants a token and return the seconds waited."""
+        if not self._buckets:
+            return 0.0
+        keys = [bucket.key for bucket in self._buckets]
+        args: List[float] = []
+        for bucket in self._buckets:
+            args.extend([bucket.rate_per_second, max(1.0, bucket.burst)])
+
+        waited = 0.0
+        while True:
+            wait_ms = int(self._acquire_script(keys=keys, args=args))
+            if wait_ms <= 0:
+                break
+            pause = wait_ms / 1000
+            self._sleep(pause)
+            waited += pause
+        self._record(waited)
+        return waited
+
+    def penalize(self) -> None:
+        with self._lock:
+            self.stats["rejected_429"] += 1
+        self._connection.hincrby(STATS_KEY, "rejected_429", 1)
+        if not self._penalty_seconds:
+            return
+        for bucket in self._buckets:
+            self._penalty_script(
+                keys=[bucket.key], args=[bucket.rate_per_second * self._penalty_seconds]
+            )
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _record(self, waited: float) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            if waited > 0:
+                self.stats["throttled"] += 1
+                self.stats["wait_seconds"] += waited
+                self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+        pipe = self._connection.pipeline()
+        pipe.hincrby(STATS_KEY, "requests", 1)
+        if waited > 0:
+            pipe.hincrby(STATS_KEY, "throttled", 1)
+            pipe.hincrbyfloat(STATS_KEY, "wait_seconds", waited)
+        pipe.execute()
+
+
+def build_rate_limiter(
+    connection: Redis, rate_limit_config: Dict, video_id: Optional[str]
+) -> Optional[RedisRateLimiter]:
+    if not rate_limit_config.get("enabled"):
+        return None
+    buckets = [
+        Bucket(
+            key=f"{RATE_LIMIT_KEY_PREFIX}global",
+            rate_per_second=float(rate_limit_config.get("global_rate_per_second", 0)),
+            burst=float(rate_limit_config.get("global_burst", 1)),
+        )
+    ]
+    if video_id:
+        buckets.append(
+            Bucket(
+                key=f"{RATE_LIMIT_KEY_PREFIX}video:{video_id}",
+                rate_per_second=float(rate_limit_config.get("per_video_rate_per_second", 0)),
+                burst=float(rate_limit_config.get("per_video_burst", 1)),
+            )
+        )
+    return RedisRateLimiter(
+        connection,
+        buckets,
+        penalty_seconds=float(rate_limit_config.get("throttle_penalty_seconds", 0)),
+    )
+
+
+def rate_limit_hook(limiter: RedisRateLimiter) -> RequestHook:
+    def hook(method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        limiter.acquire()
+        response = send()
+        if getattr(response, "status_code", None) == 429:
+            limiter.penalize()
+        return response
+
+    return hook
+
+
+def read_cluster_stats(connection: Redis) -> Dict[str, float]:
+    raw = connection.hgetall(STATS_KEY)
+    return {key.decode(): float(value) for key, value in raw.items()}
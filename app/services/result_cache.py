@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from redis import Redis
+
+RESULT_CACHE_PREFIX = "analysis:result-cache:"
+RECOMPUTED_PREFIX = "analysis:recomputed:"
+# Bump when the stored result layout changes so old entries are not served.
+_FORMAT_VERSION = 1
+
+
+def result_cache_key(
+    video_id: Optional[str], keyword: Optional[str], message_count: Any, *configs: Dict
+) -> str:
+    """Key for one analysis of a video's chat: keyword, chat size and analysis config.
+
+    The message count separates fetches of the same video that saw different
+    amounts of chat, e.g. a live stream fetched before it ended.
+    """
+    fingerprint = json.dumps(
+        [_FORMAT_VERSION, (keyword or "").lower(), message_count, configs],
+        sort_keys=True,
+        default=str,
+    )
+    return f"{video_id or 'unknown'}:{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:24]}"
+
+
+class ResultCache:
+    """Packed analysis results shared by every pipeline of the same video."""
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def key(cache_key: str) -> str:
+        return f"{RESULT_CACHE_PREFIX}{cache_key}"
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        raw = self._connection.get(self.key(cache_key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, cache_key: str, packed: Dict) -> None:
+        """``packed`` must be JSON-safe, i.e. ``pack_result(..., as_text=True)``."""
+        self._connection.set(self.key(cache_key), json.dumps(packed), ex=self._ttl)
+
+
+def save_recomputed(
+    connection: Redis, pipeline_id: str, keyword: Optional[str], packed: Dict, ttl_seconds: int
+) -> None:
+    """Record the latest keyword recompute of a pipeline, replacing its keyword result.
+
+    It is one key written in one command, apart from the fetch job's meta, so
+    concurrent meta writes can neither drop it nor be overwritten by it.
+    """
+    connection.set(
+        f"{RECOMPUTED_PREFIX}{pipeline_id}",
+        json.dumps({"keyword": keyword, "result": packed}),
+        ex=max(1, int(ttl_seconds)),
+    )
+
+
+def load_recomputed(connection: Redis, pipeline_id: str) -> Optional[Dict]:
+    """``{"keyword", "result"}`` of the latest recompute, or ``None``."""
+    raw = connection.get(f"{RECOMPUTED_PREFIX}{pipeline_id}")
+    return json.loads(raw) if raw is not None else None
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+from redis import Redis
+
+from .chat_loader import ChatMessage
+from .message_store import decode_messages, encode_messages
+
+SEGMENT_KEY_PREFIX = "analysis:segments:"
+
+
+class SegmentStore:
+    """Per-pipeline Redis hash that fan-out segment jobs write their messages into."""
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def key(pipeline_id: str) -> str:
+        return f"{SEGMENT_KEY_PREFIX}{pipeline_id}"
+
+    @staticmethod
+    def progress_key(pipeline_id: str) -> str:
+        return f"{SEGMENT_KEY_PREFIX}{pipeline_id}:progress"
+
+    def start(self, pipeline_id: str, total_segments: int) -> None:
+        progress_key = self.progress_key(pipeline_id)
+        pipe = self._connection.pipeline()
+        pipe.delete(self.key(pipeline_id))
+        pipe.delete(progress_key)
+        pipe.hset(progress_key, "total", total_segments)
+        pipe.expire(progress_key, self._ttl)
+        pipe.execute()
+
+    def save_segment(
+        self, pipeline_id: str, index: int, messages: Sequence[ChatMessage]
+    ) -> None:
+        key = self.key(pipeline_id)
+        pipe = self._connection.pipeline()
+        pipe.hset(key, str(index), encode_messages(messages))
+        pipe.expire(key, self._ttl)
+        pipe.execute()
+
+    def load_segments(self, pipeline_id: str) -> List[List[ChatMessage]]:
+        raw = self._connection.hgetall(self.key(pipeline_id))
+        ordered = sorted(raw.items(), key=lambda item: int(item[0]))
+        return [decode_messages(value) for _, value in ordered]
+
+    def progress(self, pipeline_id: str) -> Dict[str, int]:
+        pipe = self._connection.pipeline()
+        pipe.hgetall(self.progress_key(pipeline_id))
+        pipe.hlen(self.key(pipeline_id))
+        raw, completed = pipe.execute()
+        progress = {"total": 0, "completed": int(completed)}
+        for key, value in raw.items():
+            progress[key.decode()] = int(value)
+        return progress
+
+    def delete(self, pipeline_id: str) -> None:
+        self._connection.delete(self.key(pipeline_id), self.progress_key(pipeline_id))
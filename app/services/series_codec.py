@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"SER1"
+DELTA_SERIES = ("time_axis",)
+_FLOAT = np.dtype("<f4")
+_HEADER = struct.Struct("<4sI")
+
+
+def encode_arrays(
+    arrays: Mapping[str, Any],
+    compress: bool = True,
+    meta: Optional[Mapping[str, Any]] = None,
+    delta: Sequence[str] = DELTA_SERIES,
+) -> bytes:
+    """Pack named series as little-endian float32 buffers behind a small JSON header.
+
+    Layout: ``SER1``, the header length as uint32, the header padded to four
+    bytes, then the buffers back to back (zlib-compressed when ``compress``).
+    Series named in ``delta`` hold the differences between consecutive values,
+    which keeps bucket times exact in float32.
+    """
+    entries = []
+    chunks = []
+    for name, values in arrays.items():
+        array = np.asarray(values, dtype=np.float64)
+        encoding = "raw"
+        if name in delta and array.size:
+            array = np.diff(array, prepend=0.0)
+            encoding = "delta"
+        entries.append({"name": name, "length": int(array.size), "encoding": encoding})
+        chunks.append(array.astype(_FLOAT).tobytes())
+    body = b"".join(chunks)
+    if compress:
+        # Level 1 is about 4x faster than the default for ~10% more bytes.
+        body = zlib.compress(body, 1)
+    header = json.dumps(
+        {"arrays": entries, "compressed": compress, "meta": dict(meta or {})},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    # Padding keeps the buffers 4-byte aligned for Float32Array views in the browser.
+    header += b" " * (-len(header) % 4)
+    return _HEADER.pack(MAGIC, len(header)) + header + body
+
+
+def decode_arrays(blob: bytes) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    magic, header_length = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("not an encoded series blob")
+    start = _HEADER.size
+    header = json.loads(blob[start : start + header_length])
+    body = blob[start + header_length :]
+    if header["compressed"]:
+        body = zlib.decompress(body)
+
+    arrays: Dict[str, np.ndarray] = {}
+    offset = 0
+    for entry in header["arrays"]:
+        length = entry["length"]
+        values = np.frombuffer(body, dtype=_FLOAT, count=length, offset=offset)
+        offset += length * _FLOAT.itemsize
+        arrays[entry["name"]] = (
+            np.cumsum(values, dtype=np.float64) if entry["encoding"] == "delta" else values
+        )
+    return arrays, header.get("meta") or {}
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from redis import Redis
+
+from .cps_analyzer import ChatColumns, CPSAnalyzer
+
+PYRAMID_KEY_PREFIX = "analysis:pyramid:"
+SERIES_NAMES = ("total", "member", "smoothed_total", "keyword", "smoothed_keyword")
+KEYWORD_SERIES = ("keyword", "smoothed_keyword")
+_DTYPE = np.dtype("<f4")
+
+
+@dataclass(frozen=True)
+class Tile:
+    series: str
+    level: int
+    bin_seconds: float
+    start: float
+    minimum: np.ndarray
+    maximum: np.ndarray
+    mean: np.ndarray
+    keyword: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "series": self.series,
+            "keyword": self.keyword,
+            "level": self.level,
+            "bin_seconds": self.bin_seconds,
+            "start": self.start,
+            "min": self.minimum.tolist(),
+            "max": self.maximum.tolist(),
+            "mean": self.mean.tolist(),
+        }
+
+
+class TileRangeError(ValueError):
+    pass
+
+
+def dense_counts(chat: ChatColumns, base_seconds: float, keyword: Optional[str] = None) -> Dict:
+    """Per-bin counts on a gap-free axis, unlike ``CPSAnalyzer`` which skips empty buckets."""
+    timestamps = np.asarray(chat.timestamps, dtype=np.float64)
+    first = int(math.floor(timestamps.min() / base_seconds))
+    bins = (np.floor(timestamps / base_seconds) - first).astype(np.int64)
+    size = int(bins.max()) + 1
+    counts = {"total": np.bincount(bins, minlength=size).astype(np.float64)}
+    if keyword:
+        counts["keyword"] = np.bincount(
+            bins[chat.keyword_hits(keyword)], minlength=size
+        ).astype(np.float64)
+    else:
+        members = np.asarray(chat.members, dtype=bool)
+        counts["member"] = np.bincount(bins[members], minlength=size).astype(np.float64)
+    return {"start": first * base_seconds, "counts": counts}
+
+
+def build_levels(values: np.ndarray) -> List[np.ndarray]:
+    """Level 0 is ``values``; level ``k`` holds min/max/mean rows over ``2**k`` base bins."""
+    levels: List[np.ndarray] = [values.astype(_DTYPE)]
+    minimum = maximum = sums = values.astype(np.float64)
+    sizes = np.ones(len(values))
+    while len(sums) > 1:
+        starts = np.arange(0, len(sums), 2)
+        minimum = np.minimum.reduceat(minimum, starts)
+        maximum = np.maximum.reduceat(maximum, starts)
+        sums = np.add.reduceat(sums, starts)
+        sizes = np.add.reduceat(sizes, starts)
+        levels.append(np.stack([minimum, maximum, sums / sizes]).astype(_DTYPE))
+    return levels
+
+
+class SeriesPyramid:
+    """Multi-resolution copies of a pipeline's series for zooming.
+
+    Each (series, level) is one Redis string of little-endian float32 values,
+    interleaved as min/max/mean per bin above level 0, so a tile is a single
+    GETRANGE over the visible bins. Keyword series are stored under keys of
+    their keyword, and the meta hash points at the latest keyword analysed.
+    """
+
+    def __init__(self, connection: Redis, ttl_seconds: int) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+
+    @staticmethod
+    def meta_key(pipeline_id: str) -> str:
+        return f"{PYRAMID_KEY_PREFIX}{pipeline_id}"
+
+    @staticmethod
+    def level_key(pipeline_id: str, series: str, level: int, keyword: Optional[str] = None) -> str:
+        if keyword:
+            series = f"{series}:{_keyword_token(keyword)}"
+        return f"{PYRAMID_KEY_PREFIX}{pipeline_id}:{series}:{level}"
+
+    def build(
+        self,
+        pipeline_id: str,
+        chat: ChatColumns,
+        keyword: Optional[str],
+        cps_config: Dict,
+        pyramid_config: Dict,
+    ) -> None:
+        """Store the keyword series when ``keyword`` is set, the total and member series otherwise."""
+        if not len(chat):
+            return
+        base_seconds = float(pyramid_config.get("base_bucket_seconds", 1.0))
+        dense = dense_counts(chat, base_seconds, keyword)
+        smoother = CPSAnalyzer(
+            bucket_size_seconds=base_seconds,
+            smoothing_window_seconds=cps_config["smoothing_window_seconds"],
+            smoothing_average_window=cps_config.get("smoothing_average_window", 6),
+        )
+        series = dict(dense["counts"])
+        count_name = "keyword" if keyword else "total"
+        series[f"smoothed_{count_name}"] = smoother.smooth_series(series[count_name])
+        self._store(pipeline_id, series, dense["start"], base_seconds, keyword)
+
+    def version(
+        self, pipeline_id: str, series: str, keyword: Optional[str] = None
+    ) -> Optional[str]:
+        raw = self._connection.hget(self.meta_key(pipeline_id), series)
+        if raw is None:
+            return None
+        meta = json.loads(raw)
+        if not _holds_keyword(meta, keyword):
+            return None
+        return meta.get("digest")
+
+    def describe(self, pipeline_id: str) -> Dict[str, Dict]:
+        raw = self._connection.hgetall(self.meta_key(pipeline_id))
+        return {name.decode(): json.loads(value) for name, value in raw.items()}
+
+    def tile(
+        self,
+        pipeline_id: str,
+        series: str,
+        level: int,
+        t0: float,
+        t1: float,
+        max_bins: int,
+        keyword: Optional[str] = None,
+    ) -> Optional[Tile]:
+        """``None`` when the series is missing, or holds another keyword than ``keyword``."""
+        raw = self._connection.hget(self.meta_key(pipeline_id), series)
+        if raw is None:
+            return None
+        meta = json.loads(raw)
+        if not _holds_keyword(meta, keyword):
+            return None
+        stored_keyword = meta.get("keyword")
+        lengths = meta["lengths"]
+        if not 0 <= level < len(lengths):
+            raise TileRangeError(f"level must be between 0 and {len(lengths) - 1}")
+        bin_seconds = meta["base_seconds"] * 2**level
+        first = max(0, int(math.floor((t0 - meta["start"]) / bin_seconds)))
+        last = min(lengths[level], int(math.ceil((t1 - meta["start"]) / bin_seconds)))
+        if last - first > max_bins:
+            raise TileRangeError(f"range spans more than {max_bins} bins; use a coarser level")
+
+        rows = 1 if level == 0 else 3
+        if last <= first:
+            values = np.zeros((rows, 0), dtype=_DTYPE)
+        else:
+            stride = rows * _DTYPE.itemsize
+            chunk = self._connection.getrange(
+                self.level_key(pipeline_id, series, level, stored_keyword),
+                first * stride,
+                last * stride - 1,
+            )
+            if len(chunk) != (last - first) * stride:
+                # Expired, or replaced by a recompute for another keyword meanwhile.
+                return None
+            values = np.frombuffer(chunk, dtype=_DTYPE).reshape(-1, rows).T
+        minimum, maximum, mean = (values[0], values[0], values[0]) if rows == 1 else values
+        return Tile(
+            series=series,
+            level=level,
+            bin_seconds=bin_seconds,
+            start=meta["start"] + first * bin_seconds,
+            minimum=minimum,
+            maximum=maximum,
+            mean=mean,
+            keyword=stored_keyword,
+        )
+
+    def _store(
+        self,
+        pipeline_id: str,
+        series: Dict[str, np.ndarray],
+        start: float,
+        base_seconds: float,
+        keyword: Optional[str],
+    ) -> None:
+        meta_key = self.meta_key(pipeline_id)
+        replaced = self._replaced_levels(pipeline_id, keyword) if keyword else []
+        pipe = self._connection.pipeline(transaction=False)
+        for name, values in series.items():
+            series_keyword = keyword if name in KEYWORD_SERIES else None
+            levels = build_levels(values)
+            for level, array in enumerate(levels):
+                # Bins are laid out one after another so GETRANGE can slice them.
+                payload = np.ascontiguousarray(array.T).tobytes()
+                pipe.set(
+                    self.level_key(pipeline_id, name, level, series_keyword),
+                    payload,
+                    ex=self._ttl,
+                )
+            digest = hashlib.sha1(levels[0].tobytes())
+            if series_keyword:
+                # Two keywords can count the same messages; their tiles still differ.
+                digest.update(series_keyword.lower().encode("utf-8"))
+            meta = {
+                "start": start,
+                "base_seconds": base_seconds,
+                "lengths": [array.shape[-1] for array in levels],
+                "keyword": series_keyword,
+                # Changes when a keyword recompute replaces the keyword series.
+                "digest": digest.hexdigest()[:16],
+            }
+            pipe.hset(meta_key, name, json.dumps(meta))
+        pipe.expire(meta_key, self._ttl)
+        # Levels of the previous keyword go once the meta points at the new ones.
+        if replaced:
+            pipe.delete(*replaced)
+        pipe.execute()
+
+    def _replaced_levels(self, pipeline_id: str, keyword: str) -> List[str]:
+        keys: List[str] = []
+        for name in KEYWORD_SERIES:
+            raw = self._connection.hget(self.meta_key(pipeline_id), name)
+            if raw is None:
+                continue
+            meta = json.loads(raw)
+            if _holds_keyword(meta, keyword):
+                continue
+            previous = meta.get("keyword")
+            keys.extend(
+                self.level_key(pipeline_id, name, level, previous)
+                for level in range(len(meta["lengths"]))
+            )
+        return keys
+
+
+def _holds_keyword(meta: Dict, keyword: Optional[str]) -> bool:
+    return not keyword or (meta.get("keyword") or "").lower() == keyword.lower()
+
+
+def _keyword_token(keyword: str) -> str:
+    return hashlib.sha1(keyword.lower().encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional
+
+# How many items ``timed_iter`` times locally before taking the lock.
+_FLUSH_EVERY = 1000
+
+
+class StageTimer:
+    """Accumulates wall time and call counts per stage of one job, plus counters.
+
+    Parallel segment fetches share one timer, so every update takes a lock;
+    hot loops should go through ``timed_iter`` which batches its updates.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._started = clock()
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._counters: Dict[str, int] = {"requests": 0, "bytes": 0, "messages": 0}
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+            self._calls[stage] = self._calls.get(stage, 0) + calls
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add(name, self._clock() - started)
+
+    def timed_iter(self, items: Iterable[Any], stage: str) -> Iterator[Any]:
+        """Yield from ``items``, charging the time spent producing them to ``stage``.
+
+        Every item also counts as a message.
+        """
+        iterator = iter(items)
+        clock = self._clock
+        seconds = 0.0
+        count = 0
+        try:
+            while True:
+                started = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    seconds += clock() - started
+                    return
+                seconds += clock() - started
+                count += 1
+                if count >= _FLUSH_EVERY:
+                    self._flush_iter(stage, seconds, count)
+                    seconds, count = 0.0, 0
+                yield item
+        finally:
+            self._flush_iter(stage, seconds, count)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            seconds = dict(self._seconds)
+            calls = dict(self._calls)
+            counters = dict(self._counters)
+        wall = self._clock() - self._started
+        stages = {
+            name: {"seconds": round(value, 6), "calls": calls.get(name, 0)}
+            for name, value in seconds.items()
+        }
+        if "continuation" in seconds:
+            # What is left of the chat_downloader loop once waiting on the
+            # network, decoding JSON, rate limit waits and its own poll and
+            # retry sleeps are taken out.
+            pulled = seconds.get("bootstrap", 0.0) + seconds["continuation"]
+            waited = sum(
+                seconds.get(name, 0.0)
+                for name in ("http", "json_decode", "rate_limit_wait", "sleep")
+            )
+            stages["parse"] = {"seconds": round(max(0.0, pulled - waited), 6), "calls": 0}
+        return {
+            "wall_seconds": round(wall, 6),
+            "stages": stages,
+            **counters,
+            "messages_per_second": round(counters["messages"] / wall, 2) if wall > 0 else None,
+        }
+
+    def _flush_iter(self, stage: str, seconds: float, count: int) -> None:
+        if not count and not seconds:
+            return
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+            self._calls[stage] = self._calls.get(stage, 0) + count
+            self._counters["messages"] += count
+
+
+def timed(timer: Optional[StageTimer], stage: str) -> ContextManager[None]:
+    return timer.stage(stage) if timer else nullcontext()
+
+
+def timing_hook(timer: StageTimer) -> Callable[[str, str, Dict[str, Any], Callable[[], Any]], Any]:
+    """Request hook that records HTTP time, request count, body size and JSON decoding.
+
+    Meant to be the innermost hook so that cache hits and rate limit waits
+    are not counted as network time.
+    """
+
+    def hook(method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        with timer.stage("http"):
+            response = send()
+        timer.incr("requests")
+        timer.incr("bytes", len(getattr(response, "content", b"") or b""))
+        _time_json(response, timer)
+        return response
+
+    return hook
+
+
+def _time_json(response: Any, timer: StageTimer) -> None:
+    decode = getattr(response, "json", None)
+    if decode is None:
+        return
+
+    def json(*args: Any, **kwargs: Any) -> Any:
+        with timer.stage("json_decode"):
+            return decode(*args, **kwargs)
+
+    try:
+        response.json = json
+    except AttributeError:
+        pass
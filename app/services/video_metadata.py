@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from redis import Redis
+
+from .youtube_api import VideoMetadata, fetch_videos_metadata
+
+METADATA_KEY_PREFIX = "analysis:video-meta:"
+
+# fetch(video_ids, api_key, max_concurrency, on_chunk) -> {video_id: metadata or None}
+MetadataFetcher = Callable[..., Dict[str, Optional[VideoMetadata]]]
+
+
+class VideoMetadataCache:
+    """Data API lookups shared through Redis by the web process and every worker.
+
+    Videos that do not exist are remembered for ``missing_ttl_seconds`` so
+    repeated submissions of a bad URL do not spend quota. Live and upcoming
+    videos expire after ``live_ttl_seconds`` since their duration and status
+    are still changing. API errors are not cached: ids of a failed Data API
+    call are left out of ``lookup_many``, which callers treat as unknown.
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        ttl_seconds: int,
+        missing_ttl_seconds: int,
+        live_ttl_seconds: int,
+        max_concurrency: int = 4,
+        fetch: MetadataFetcher = fetch_videos_metadata,
+    ) -> None:
+        self._connection = connection
+        self._ttl = max(1, int(ttl_seconds))
+        self._missing_ttl = max(1, int(missing_ttl_seconds))
+        self._live_ttl = max(1, int(live_ttl_seconds))
+        self._max_concurrency = max(1, int(max_concurrency))
+        self._fetch = fetch
+
+    @classmethod
+    def from_config(cls, connection: Redis, youtube_config: Dict) -> "VideoMetadataCache":
+        return cls(
+            connection,
+            ttl_seconds=youtube_config.get("metadata_ttl_seconds", 86400),
+            missing_ttl_seconds=youtube_config.get("metadata_missing_ttl_seconds", 600),
+            live_ttl_seconds=youtube_config.get("metadata_live_ttl_seconds", 60),
+            max_concurrency=youtube_config.get("metadata_concurrency", 4),
+        )
+
+    @staticmethod
+    def key(video_id: str) -> str:
+        return f"{METADATA_KEY_PREFIX}{video_id}"
+
+    def get(self, video_id: str) -> Tuple[bool, Optional[VideoMetadata]]:
+        """``(cached, metadata)``; a cached ``None`` means the video does not exist."""
+        return _decode(self._connection.get(self.key(video_id)))
+
+    def set(self, video_id: str, metadata: Optional[VideoMetadata]) -> None:
+        self.set_many({video_id: metadata})
+
+    def set_many(self, found: Dict[str, Optional[VideoMetadata]]) -> None:
+        pipe = self._connection.pipeline(transaction=False)
+        for video_id, metadata in found.items():
+            if metadata is None:
+                body, ttl = {"missing": True}, self._missing_ttl
+            else:
+                body = metadata.to_dict()
+                ttl = self._ttl if metadata.live_status == "none" else self._live_ttl
+            pipe.set(self.key(video_id), json.dumps(body, ensure_ascii=False), ex=ttl)
+        pipe.execute()
+
+    def lookup(self, video_id: str, api_key: Optional[str]) -> Optional[VideoMetadata]:
+        if not video_id or not api_key:
+            return None
+        return self.lookup_many([video_id], api_key).get(video_id)
+
+    def lookup_many(
+        self, video_ids: Iterable[str], api_key: Optional[str]
+    ) -> Dict[str, Optional[VideoMetadata]]:
+        """Metadata of every id, reading Redis with one MGET and batching the misses.
+
+        Each Data API call is cached as soon as it succeeds, so a failed call
+        leaves only its own ids missing from the result. The error is raised
+        only when no call succeeded.
+        """
+        unique_ids = list(dict.fromkeys(video_id for video_id in video_ids if video_id))
+        if not unique_ids or not api_key:
+            return {}
+        raw_values = self._connection.mget([self.key(video_id) for video_id in unique_ids])
+        found: Dict[str, Optional[VideoMetadata]] = {}
+        missing = []
+        for video_id, raw in zip(unique_ids, raw_values):
+            cached, metadata = _decode(raw)
+            if cached:
+                found[video_id] = metadata
+            else:
+                missing.append(video_id)
+        if missing:
+            found.update(
+                self._fetch(missing, api_key, self._max_concurrency, on_chunk=self.set_many)
+            )
+        return found
+
+    def duration_lookup(self, api_key: Optional[str]) -> Callable[[str], Optional[int]]:
+        def lookup(video_id: str) -> Optional[int]:
+            metadata = self.lookup(video_id, api_key)
+            return metadata.duration_seconds if metadata else None
+
+        return lookup
+
+
+def _decode(raw: Optional[bytes]) -> Tuple[bool, Optional[VideoMetadata]]:
+    if raw is None:
+        return False, None
+    data = json.loads(raw)
+    if data.get("missing"):
+        return True, None
+    return True, VideoMetadata.from_dict(data)
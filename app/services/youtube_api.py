@@ -1,15 +1,81 @@
 from __future__ import annotations
 
+import logging
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from functools import lru_cache
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
 from urllib.parse import parse_qs, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 _VIDEO_ID_RE = re.compile(r"[0-9A-Za-z_-]{6,}")
+# Channel URL forms, mapped to the get_user_videos argument each one names.
+_CHANNEL_PATH_RES = (
+    (re.compile(r"^/channel/(UC[0-9A-Za-z_-]{22})(?:/|$)"), "channel_id"),
+    (re.compile(r"^/@([^/?#]+)"), "handle"),
+    (re.compile(r"^/c/([^/?#]+)"), "custom_username"),
+    (re.compile(r"^/user/([^/?#]+)"), "user_id"),
+)
+_DURATION_RE = re.compile(
+    r"^PT"
+    r"(?:(?P<hours>\d+)H)?"
+    r"(?:(?P<minutes>\d+)M)?"
+    r"(?:(?P<seconds>\d+)S)?$"
+)
+DEFAULT_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# The most ids the videos endpoint accepts per call.
+VIDEOS_PER_REQUEST = 50
+_POOL_SIZE = 16
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+logger = logging.getLogger(__name__)
+
+
+def http_session() -> requests.Session:
+    """Process-wide session so Data API calls reuse pooled keep-alive connections."""
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            # Enough pooled connections per host for concurrent batch lookups.
+            adapter = HTTPAdapter(pool_maxsize=_POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _reset_session_after_fork() -> None:
+    # Sockets inherited from the parent must not be shared with a forked child.
+    global _session, _session_lock  # pylint: disable=global-statement
+    _session_lock = threading.Lock()
+    _session = None
+
+
+os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+
+@dataclass(frozen=True)
+class VideoMetadata:
+    video_id: str
+    duration_seconds: Optional[int]
+    # liveBroadcastContent: "none" for uploads and ended streams, "live" or "upcoming".
+    live_status: str
+    title: Optional[str]
+    channel_id: Optional[str]
+    channel_title: Optional[str]
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "VideoMetadata":
+        return cls(**data)
 
 
 def extract_video_id(url: str) -> Optional[str]:
@@ -36,36 +102,130 @@ def extract_video_id(url: str) -> Optional[str]:
     return None
 
 
+def extract_channel(url: str) -> Optional[Dict[str, str]]:
+    """``{argument: value}`` for ``get_user_videos`` from a channel URL, or ``None``."""
+    if not url:
+        return None
+    url = url.strip()
+    if url.startswith("@"):
+        return {"handle": url[1:]} if len(url) > 1 else None
+    parsed = urlparse(url)
+    if "youtube.com" not in parsed.netloc:
+        return None
+    for pattern, argument in _CHANNEL_PATH_RES:
+        match = pattern.match(parsed.path)
+        if match:
+            return {argument: match.group(1)}
+    return None
+
+
 @lru_cache(maxsize=128)
 def fetch_video_duration_seconds(video_id: str, api_key: str | None) -> Optional[int]:
+    metadata = fetch_video_metadata(video_id, api_key)
+    return metadata.duration_seconds if metadata else None
+
+
+def fetch_video_metadata(video_id: str, api_key: str | None) -> Optional[VideoMetadata]:
+    """Look up one video with the Data API; ``None`` when the video does not exist."""
     if not api_key or not video_id:
         return None
-    url = "https://www.googleapis.com/youtube/v3/videos"
+    return fetch_videos_metadata([video_id], api_key).get(video_id)
+
+
+def fetch_videos_metadata(
+    video_ids: Iterable[str],
+    api_key: str | None,
+    max_concurrency: int = 4,
+    on_chunk: Optional[Callable[[Dict[str, Optional[VideoMetadata]]], None]] = None,
+) -> Dict[str, Optional[VideoMetadata]]:
+    """Look up many videos, ``VIDEOS_PER_REQUEST`` ids per Data API call.
+
+    Each call costs one quota unit whatever the number of ids, so batching cuts
+    quota and round trips by up to 50x. Up to ``max_concurrency`` calls run at
+    once on the shared session. Ids of a successful call are in the result,
+    ``None`` for videos that do not exist, and are passed to ``on_chunk`` as
+    soon as the call returns. Ids of a failed call are left out, and the error
+    is raised only when every call failed.
+    """
+    unique_ids = list(dict.fromkeys(video_id for video_id in video_ids if video_id))
+    if not api_key or not unique_ids:
+        return {}
+    chunks = [
+        unique_ids[start : start + VIDEOS_PER_REQUEST]
+        for start in range(0, len(unique_ids), VIDEOS_PER_REQUEST)
+    ]
+    found: Dict[str, Optional[VideoMetadata]] = {}
+    errors: List[Exception] = []
+
+    def collect(chunk: Sequence[str], fetch: Callable[[], List[VideoMetadata]]) -> None:
+        try:
+            batch = fetch()
+        except (requests.RequestException, ValueError) as exc:
+            # The message of a requests error holds the URL, API key included.
+            status = getattr(getattr(exc, "response", None), "status_code", None)
+            logger.warning(
+                "Data API lookup of %d videos failed: %s (HTTP %s)",
+                len(chunk),
+                type(exc).__name__,
+                status,
+            )
+            errors.append(exc)
+            return
+        chunk_found: Dict[str, Optional[VideoMetadata]] = dict.fromkeys(chunk)
+        chunk_found.update((metadata.video_id, metadata) for metadata in batch)
+        found.update(chunk_found)
+        if on_chunk:
+            on_chunk(chunk_found)
+
+    workers = max(1, min(int(max_concurrency), len(chunks)))
+    if workers == 1:
+        for chunk in chunks:
+            collect(chunk, lambda chunk=chunk: _fetch_video_batch(chunk, api_key))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data-api") as executor:
+            futures = {
+                executor.submit(_fetch_video_batch, chunk, api_key): chunk for chunk in chunks
+            }
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+    if errors and not found:
+        raise errors[0]
+    return found
+
+
+def _fetch_video_batch(video_ids: Sequence[str], api_key: str) -> List[VideoMetadata]:
+    url = f"{os.getenv('YOUTUBE_API_BASE_URL', DEFAULT_API_BASE_URL)}/videos"
     params = {
         "key": api_key,
-        "part": "contentDetails",
-        "id": video_id,
+        "part": "contentDetails,snippet",
+        "id": ",".join(video_ids),
     }
-    resp = requests.get(url, params=params, timeout=float(os.getenv("YOUTUBE_API_TIMEOUT", 10)))
+    resp = http_session().get(
+        url, params=params, timeout=float(os.getenv("YOUTUBE_API_TIMEOUT", 10))
+    )
     resp.raise_for_status()
-    data = resp.json()
-    items = data.get("items") or []
-    if not items:
-        return None
-    duration_iso = items[0].get("contentDetails", {}).get("duration")
-    return _parse_iso8601_duration(duration_iso)
+    items = resp.json().get("items") or []
+    return [_parse_video_item(item) for item in items if item.get("id") in video_ids]
+
+
+def _parse_video_item(item: Dict) -> VideoMetadata:
+    snippet = item.get("snippet") or {}
+    return VideoMetadata(
+        video_id=item.get("id", ""),
+        duration_seconds=_parse_iso8601_duration(
+            (item.get("contentDetails") or {}).get("duration")
+        ),
+        live_status=snippet.get("liveBroadcastContent") or "none",
+        title=snippet.get("title"),
+        channel_id=snippet.get("channelId"),
+        channel_title=snippet.get("channelTitle"),
+    )
 
 
 def _parse_iso8601_duration(value: Optional[str]) -> Optional[int]:
     if not value:
         return None
-    pattern = re.compile(
-        r"^PT"
-        r"(?:(?P<hours>\d+)H)?"
-        r"(?:(?P<minutes>\d+)M)?"
-        r"(?:(?P<seconds>\d+)S)?$"
-    )
-    match = pattern.match(value)
+    match = _DURATION_RE.match(value)
     if not match:
         return None
     hours = int(match.group("hours") or 0)
@@ -11,11 +11,20 @@ const totalCanvas = document.getElementById("total-chart");
 const keywordCanvas = document.getElementById("keyword-chart");
 const DEFAULT_Y_MAX = 10; // CPSの最低縦軸上限
 const Y_PADDING_RATIO = 0.2;
+const MAX_SERIES_POINTS = 2000; // サーバー側で間引く点数の上限
+const RECOMPUTE_POLL_MS = 1000;
+const RECOMPUTE_TIMEOUT_MS = 120000; // 再計算を待つ上限 (ワーカー不在時に待ち続けない)
+const RESULT_FIELDS = "time_axis,smoothed_total,smoothed_keyword,spikes,envelope"; // グラフに必要な項目のみ取得
+// 系列は float32 のバイナリ (base64) で受け取る。DecompressionStream がない環境では JSON のまま
+const SERIES_ENCODING = window.DecompressionStream ? "base64" : "json";
 
 let totalChart;
 let keywordChart;
 let pollHandle = null;
+let eventSource = null;
 let currentJobId = null;
+let currentVideo = null;
+let keywordRendered = false;
 
 async function analyze() {
   if (!urlInput.value) {
@@ -38,7 +47,8 @@ async function analyze() {
       throw new Error(err.error || "ジョブの開始に失敗しました");
     }
     const data = await response.json();
-    startPolling(data.job_id);
+    currentVideo = data.video;
+    watchJob(data.job_id);
   } catch (error) {
     setStatus(error.message);
     analyzeBtn.disabled = false;
@@ -48,6 +58,7 @@ async function analyze() {
 
 function resetResults() {
   currentJobId = null;
+  currentVideo = null;
   destroyChart(totalChart);
   destroyChart(keywordChart);
   totalChart = undefined;
@@ -55,6 +66,33 @@ function resetResults() {
   totalSpikeList.innerHTML = "";
   keywordSpikeList.innerHTML = "";
   keywordStatus.textContent = "キーワード未解析";
+  keywordRendered = false;
+}
+
+function watchJob(jobId) {
+  stopWatching();
+  if (window.EventSource) {
+    subscribe(jobId);
+  } else {
+    startPolling(jobId);
+  }
+}
+
+function subscribe(jobId) {
+  eventSource = new EventSource(`/analyze/events/${jobId}?${resultQuery()}`);
+  eventSource.addEventListener("status", (event) => handleStatus(JSON.parse(event.data)));
+  eventSource.addEventListener("progress", (event) => {
+    const progress = JSON.parse(event.data);
+    showProgress(progress.processed_messages, progress.last_timestamp);
+  });
+  eventSource.addEventListener("result", (event) => handleResult(JSON.parse(event.data)));
+  eventSource.onerror = () => {
+    // EventSource reconnects by itself unless the server refused the stream.
+    if (eventSource && eventSource.readyState === EventSource.CLOSED) {
+      stopWatching();
+      startPolling(jobId);
+    }
+  };
 }
 
 function startPolling(jobId) {
@@ -67,54 +105,141 @@ function startPolling(jobId) {
 
 async function fetchStatus(jobId) {
   try {
-    const response = await fetch(`/analyze/status/${jobId}`);
+    const response = await fetch(`/analyze/status/${jobId}?${resultQuery()}`);
     if (!response.ok) {
       throw new Error("進捗の取得に失敗しました");
     }
     const data = await response.json();
-    handleStatus(data);
+    await handleStatus(data);
   } catch (error) {
     setStatus(error.message);
-    stopPolling();
+    stopWatching();
     analyzeBtn.disabled = false;
     setProgressActive(false);
   }
 }
 
-function handleStatus(job) {
+async function handleStatus(job) {
+  currentVideo = job.video || currentVideo;
   if (job.status === "running" || job.status === "queued") {
-    const processed = job.processed_messages || 0;
-    const timestamp = job.last_timestamp ? `${job.last_timestamp.toFixed(1)}s` : "-";
-    setStatus(`解析中: ${processed}件処理済み (最新タイムスタンプ ${timestamp})`);
-    setProgressActive(true);
+    showProgress(job.processed_messages, job.last_timestamp);
   } else if (job.status === "completed") {
-    stopPolling();
+    stopWatching();
     currentJobId = job.job_id;
     setStatus("全コメントの解析が完了しました");
+    const timeAxis = job.time_axis_b64
+      ? (await decodeSeries(job.time_axis_b64)).time_axis
+      : job.time_axis;
     if (job.result_total) {
-      renderTotalSection(job.result_total);
+      renderTotalSection(withTimeAxis(await decodeResult(job.result_total), timeAxis));
     }
     if (job.result_keyword && job.keyword) {
-      renderKeywordSection(job.result_keyword, job.keyword);
-    } else {
+      renderKeywordSection(
+        withTimeAxis(await decodeResult(job.result_keyword), timeAxis),
+        job.keyword
+      );
+    } else if (!keywordRendered) {
       keywordStatus.textContent = "キーワード未解析";
     }
     analyzeBtn.disabled = false;
     keywordBtn.disabled = false;
     setProgressActive(false);
-  } else if (job.status === "error") {
-    stopPolling();
+  } else if (job.status === "error" || job.status === "cancelled") {
+    stopWatching();
     setStatus(job.error || "解析に失敗しました");
     analyzeBtn.disabled = false;
     setProgressActive(false);
   }
 }
 
+function withTimeAxis(result, timeAxis) {
+  // 両方の結果で共通の時間軸はステータスの最上位に 1 度だけ含まれる
+  if (!timeAxis || result.series.time_axis) {
+    return result;
+  }
+  return { ...result, series: { ...result.series, time_axis: timeAxis } };
+}
+
+async function handleResult(event) {
+  // Results arrive per stage, so the total chart shows up while the keyword
+  // analysis is still running.
+  if (event.stage === "total") {
+    renderTotalSection(await decodeResult(event.result));
+  } else if (event.stage === "keyword" && event.keyword) {
+    renderKeywordSection(await decodeResult(event.result), event.keyword);
+  }
+}
+
+async function decodeResult(result) {
+  if (!result || !result.series_b64) {
+    return result;
+  }
+  const arrays = await decodeSeries(result.series_b64);
+  const series = {};
+  const envelope = {};
+  Object.entries(arrays).forEach(([name, values]) => {
+    const [base, bound] = name.split(":");
+    if (bound) {
+      envelope[base] = envelope[base] || {};
+      envelope[base][bound] = values;
+    } else {
+      series[name] = values;
+    }
+  });
+  const { series_b64: _encoded, ...rest } = result;
+  return { ...rest, series, envelope };
+}
+
+async function decodeSeries(encoded) {
+  // レイアウトは app/services/series_codec.py を参照
+  const bytes = Uint8Array.from(atob(encoded), (char) => char.charCodeAt(0));
+  const headerLength = new DataView(bytes.buffer).getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(bytes.subarray(8, 8 + headerLength)));
+  let body = bytes.slice(8 + headerLength).buffer;
+  if (header.compressed) {
+    const stream = new Blob([body]).stream().pipeThrough(new DecompressionStream("deflate"));
+    body = await new Response(stream).arrayBuffer();
+  }
+  const arrays = {};
+  let offset = 0;
+  header.arrays.forEach(({ name, length, encoding }) => {
+    const values = new Float32Array(body, offset, length);
+    offset += length * 4;
+    if (encoding === "delta") {
+      const restored = new Float32Array(length);
+      let sum = 0;
+      values.forEach((delta, index) => {
+        sum += delta;
+        restored[index] = sum;
+      });
+      arrays[name] = restored;
+    } else {
+      arrays[name] = values;
+    }
+  });
+  return arrays;
+}
+
+function showProgress(processedMessages, lastTimestamp) {
+  const processed = processedMessages || 0;
+  const timestamp = lastTimestamp ? `${lastTimestamp.toFixed(1)}s` : "-";
+  const duration = currentVideo && currentVideo.duration_seconds;
+  // 動画の長さが分かれば最新タイムスタンプから進捗率を出せる
+  const ratio = duration && lastTimestamp ? Math.min(1, lastTimestamp / duration) : null;
+  const percent = ratio === null ? "" : ` / ${(ratio * 100).toFixed(0)}%`;
+  setStatus(`解析中: ${processed}件処理済み (最新タイムスタンプ ${timestamp}${percent})`);
+  setProgressActive(true);
+}
+
 function setStatus(message) {
   statusText.textContent = message;
 }
 
-function stopPolling() {
+function stopWatching() {
+  if (eventSource) {
+    eventSource.close();
+    eventSource = null;
+  }
   if (pollHandle) {
     clearInterval(pollHandle);
     pollHandle = null;
@@ -134,47 +259,65 @@ function renderTotalSection(result) {
     series.time_axis,
     series.smoothed_total,
     "#111",
-    "total"
+    "total",
+    result.envelope && result.envelope.smoothed_total
   );
   renderSpikes(totalSpikeList, result.spikes);
 }
 
 function renderKeywordSection(result, keyword) {
+  keywordRendered = true;
   keywordStatus.textContent = `「${keyword}」の結果`;
   const series = result.series;
   renderLineChart(
     keywordCanvas,
     `キーワード (${keyword})`,
     series.time_axis,
-    series.smoothed_keyword && series.smoothed_keyword.length
-      ? series.smoothed_keyword
-      : series.keyword,
+    series.smoothed_keyword,
     "#00c48c",
-    "keyword"
+    "keyword",
+    result.envelope && result.envelope.smoothed_keyword
   );
   renderSpikes(keywordSpikeList, result.spikes);
 }
 
-function renderLineChart(canvas, label, labels, data, color, type) {
+function renderLineChart(canvas, label, labels, data, color, type, envelope) {
   destroyChart(type === "total" ? totalChart : keywordChart);
-  const yMax = computeYMax(data);
+  const yMax = computeYMax(envelope ? envelope.max : data);
+  const datasets = [
+    {
+      label,
+      data,
+      borderColor: color,
+      borderWidth: 2,
+      pointRadius: 0,
+      fill: false,
+    },
+  ];
+  if (envelope) {
+    // 間引かれた区間の最小値〜最大値を帯で表示する
+    datasets.push(
+      { label: "最大", data: envelope.max, borderWidth: 0, pointRadius: 0, fill: false },
+      {
+        label: "最小",
+        data: envelope.min,
+        borderWidth: 0,
+        pointRadius: 0,
+        fill: "-1",
+        backgroundColor: `${color}33`,
+      }
+    );
+  }
   const chartInstance = new Chart(canvas, {
     type: "line",
-    data: {
-      labels,
-      datasets: [
-        {
-          label,
-          data,
-          borderColor: color,
-          borderWidth: 2,
-          fill: false,
-        },
-      ],
-    },
+    data: { labels, datasets },
     options: {
       responsive: true,
       maintainAspectRatio: false,
+      animation: false,
+      plugins: {
+        legend: { labels: { filter: (item) => item.datasetIndex === 0 } },
+      },
       scales: {
         x: { title: { display: true, text: "秒" } },
         y: {
@@ -194,6 +337,16 @@ function renderLineChart(canvas, label, labels, data, color, type) {
   }
 }
 
+function resultQuery() {
+  return `points=${seriesPoints()}&fields=${RESULT_FIELDS}&encoding=${SERIES_ENCODING}`;
+}
+
+function seriesPoints() {
+  const width = totalCanvas.clientWidth || totalCanvas.width || 1000;
+  const ratio = window.devicePixelRatio || 1;
+  return Math.min(MAX_SERIES_POINTS, Math.max(100, Math.round(width * ratio)));
+}
+
 function destroyChart(chartInstance) {
   if (chartInstance) {
     chartInstance.destroy();
@@ -243,7 +396,7 @@ async function analyzeKeyword() {
   keywordBtn.disabled = true;
   keywordStatus.textContent = "キーワード解析中...";
   try {
-    const response = await fetch(`/analyze/recompute/${currentJobId}`, {
+    const response = await fetch(`/analyze/recompute/${currentJobId}?${resultQuery()}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ keyword }),
@@ -252,8 +405,25 @@ async function analyzeKeyword() {
       const err = await response.json();
       throw new Error(err.error || "キーワード解析に失敗しました");
     }
-    const data = await response.json();
-    renderKeywordSection(data.result, keyword);
+    let data = await response.json();
+    const taskId = data.task_id;
+    const deadline = Date.now() + RECOMPUTE_TIMEOUT_MS;
+    while (data.status !== "completed") {
+      if (["error", "failed", "cancelled"].includes(data.status)) {
+        throw new Error(data.error || "キーワード解析に失敗しました");
+      }
+      if (Date.now() >= deadline) {
+        throw new Error("キーワード解析がタイムアウトしました。時間をおいて再度お試しください");
+      }
+      // 再計算はワーカーの interactive キューで実行されるので完了を待つ
+      await new Promise((resolve) => setTimeout(resolve, RECOMPUTE_POLL_MS));
+      const poll = await fetch(`/analyze/recompute/status/${taskId}?${resultQuery()}`);
+      if (!poll.ok) {
+        throw new Error("キーワード解析に失敗しました");
+      }
+      data = await poll.json();
+    }
+    renderKeywordSection(await decodeResult(data.result), keyword);
   } catch (error) {
     keywordStatus.textContent = error.message;
   } finally {
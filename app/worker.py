@@ -1,37 +1,193 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+import functools
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
+import requests
 from rq import get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
 
-from .job_utils import format_result
-from .services.analysis_pipeline import analyze_messages, fetch_chat_messages
+from .job_affinity import forget_affinity, record_affinity
+from .job_control import CancelWatcher, is_cancel_requested
+from .job_events import ProgressPublisher, publish_event
+from .job_graph import (
+    KEYWORD_STAGE,
+    batch_pipeline_id,
+    cancel_pipeline,
+    cancel_waiting_stages,
+    enqueue_analysis_stages,
+    enqueue_pipeline,
+    enqueue_segment_fan_out,
+    load_pipeline_payload,
+    split_stage_job_id,
+)
+from .job_utils import KEYWORD_RESULT_SERIES, TOTAL_RESULT_SERIES, format_result, pack_result
+from .services.analysis_pipeline import (
+    FetchCancelled,
+    Segment,
+    analyze_columns,
+    fetch_chat_messages,
+    fetch_segment_messages,
+    merge_segment_messages,
+    plan_fetch_segments,
+)
+from .services.batch_store import BatchStore
+from .services.chat_archive import ArchivedChat, ChatArchive
+from .services.chat_loader import ChatMessage, RequestHook, list_channel_videos
+from .services.checkpoint import CheckpointStore
+from .services.coverage import CoverageStore, uncovered_segments
+from .services.cps_analyzer import ChatColumns
+from .services.http_cache import build_http_cache, http_cache_hook
+from .services.message_cache import MessageCache
+from .services.message_store import MessageStore
+from .services.metrics import MetricsRegistry, metrics_hook, push_metrics
+from .services.rate_limiter import RedisRateLimiter, build_rate_limiter, rate_limit_hook
+from .services.result_cache import ResultCache, save_recomputed
+from .services.segment_store import SegmentStore
+from .services.series_pyramid import SeriesPyramid
+from .services.stage_timer import StageTimer, timed
+from .services.video_metadata import VideoMetadataCache
+from .services.youtube_api import extract_video_id
 
+logger = logging.getLogger(__name__)
 
-def run_analysis_job(
+_analysis_slots = threading.BoundedSemaphore(1)
+# Recomputes someone is waiting on never queue behind pipeline analyses.
+_interactive_slots = threading.BoundedSemaphore(1)
+# Timers of the jobs running in this process, by job id, so that every meta
+# write can carry the latest stats and be timed itself.
+_stage_timers: Dict[str, StageTimer] = {}
+_dispatched_at: Dict[str, float] = {}
+_message_cache = MessageCache(0)
+_affinity: Optional[Tuple[str, str]] = None
+_metrics = MetricsRegistry()
+_FETCH_STAGES = ("fetch", "segment_fetch")
+_EVENT_FIELDS = ("status", "processed_messages", "last_timestamp")
+_FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+def configure_analysis_slots(limit: int, interactive_limit: int = 1) -> None:
+    """Set how many jobs in this process may run the CPU-bound analysis at once.
+
+    Keyword recomputes have their own ``interactive_limit`` slots, so they do
+    not wait for pipeline analyses running in the same process.
+    """
+    global _analysis_slots, _interactive_slots  # pylint: disable=global-statement
+    _analysis_slots = threading.BoundedSemaphore(max(1, int(limit)))
+    _interactive_slots = threading.BoundedSemaphore(max(1, int(interactive_limit)))
+
+
+def configure_message_cache(
+    max_bytes: int, worker_name: Optional[str] = None, queue_name: Optional[str] = None
+) -> None:
+    """Keep decoded messages in this process and, given ``queue_name``, route recomputes here.
+
+    Only useful in workers that run jobs in-process; a forking worker loses the
+    cache with every work horse.
+    """
+    global _message_cache, _affinity  # pylint: disable=global-statement
+    _message_cache = MessageCache(max_bytes)
+    _affinity = (worker_name, queue_name) if worker_name and queue_name else None
+
+
+def mark_job_dispatched(job_id: str) -> None:
+    """Called by the worker when it hands ``job_id`` to a work horse or thread.
+
+    ``perf_counter`` is a system-wide monotonic clock, so a forked work horse
+    can measure its start-up against the time its parent recorded.
+    """
+    _dispatched_at[job_id] = time.perf_counter()
+
+
+def forget_job_dispatched(job_id: str) -> None:
+    _dispatched_at.pop(job_id, None)
+
+
+def _instrumented_stage(func: Callable[..., Dict]) -> Callable[..., Dict]:
+    stage = func.__name__[len("run_"):-len("_stage")]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> Dict:
+        job = get_current_job()
+        timer = StageTimer()
+        if job:
+            _stage_timers[job.id] = timer
+            dispatched = _dispatched_at.pop(job.id, None)
+            if dispatched is not None:
+                # Forking, importing and RQ's own bookkeeping before the job body runs.
+                startup = time.perf_counter() - dispatched
+                timer.add("worker_startup", startup)
+                _metrics.observe("chat_job_startup_seconds", startup, stage=stage)
+        _metrics.inc("chat_jobs_started_total", stage=stage)
+        outcome = "error"
+        try:
+            result = func(*args, **kwargs)
+            outcome = "completed"
+            return result
+        except FetchCancelled:
+            outcome = "cancelled"
+            raise
+        finally:
+            if job:
+                _stage_timers.pop(job.id, None)
+            _record_stage_metrics(stage, outcome, timer)
+            if job:
+                _push_metrics(job)
+
+    return wrapper
+
+
+@_instrumented_stage
+def run_fetch_stage(
     url: str,
-    keyword: Optional[str],
     chat_config: Dict,
     youtube_config: Dict,
-    cps_config: Dict,
-    spike_config: Dict,
+    store_ttl_seconds: int,
+    worker_config: Optional[Dict] = None,
+    rate_limit_config: Optional[Dict] = None,
+    checkpoint_config: Optional[Dict] = None,
+    archive_config: Optional[Dict] = None,
+    http_cache_config: Optional[Dict] = None,
 ) -> Dict:
     job = get_current_job()
+    timer = _job_timer(job)
+    worker_config = worker_config or {}
+    archive = _chat_archive(archive_config)
+    with timed(timer, "archive_load"):
+        archived = _open_archived(archive, url)
+    if archived is not None:
+        # The analysis stages read the archive in place; nothing is copied to Redis.
+        _update_meta(
+            job,
+            status="completed",
+            processed_messages=archived.count,
+            last_timestamp=_last_archived_timestamp(archived),
+            source="archive",
+        )
+        return {"url": url, "message_count": archived.count}
+
+    limiter = _rate_limiter(job, url, rate_limit_config)
+    checkpoints = _checkpoint_store(job, url, checkpoint_config)
+    coverage = _coverage_store(job, url, checkpoint_config)
+    fetch_info: Dict = {}
     _update_meta(
         job,
         status="running",
         processed_messages=0,
         last_timestamp=None,
-        keyword=keyword,
     )
+    progress = _progress_publisher(job, job.id if job else None, store_ttl_seconds, worker_config)
 
     def progress_callback(processed: int, last_timestamp: float | None) -> None:
-        _update_meta(
-            job,
-            status="running",
-            processed_messages=processed,
-            last_timestamp=last_timestamp,
-        )
+        if progress:
+            progress.update(processed_messages=processed, last_timestamp=last_timestamp)
+
+    should_cancel = _cancel_watcher(job, job.id if job else None, worker_config)
 
     try:
         messages = fetch_chat_messages(
@@ -39,40 +195,851 @@ def run_analysis_job(
             chat_config=chat_config,
             youtube_config=youtube_config,
             progress_callback=progress_callback,
+            should_cancel=should_cancel,
+            request_hooks=_request_hooks(limiter, http_cache_config),
+            checkpoint_factory=checkpoints.for_segment if checkpoints else None,
+            fetch_info=fetch_info,
+            timer=timer,
+            duration_lookup=_duration_lookup(job, youtube_config),
+            coverage=coverage,
+        )
+        if job:
+            with timed(timer, "redis_store"):
+                MessageStore(job.connection, store_ttl_seconds).save(job.id, messages)
+        if not chat_config.get("message_limit"):
+            with timed(timer, "archive"):
+                archived = _archive_messages(
+                    archive, url, messages, fetch_info.get("stream_status")
+                )
+            if archived and coverage:
+                coverage.clear()
+        if checkpoints:
+            checkpoints.clear_opened()
+        _record_rate_limit_wait(timer, limiter)
+        _flush_progress(progress)
+        _update_meta(
+            job,
+            status="completed",
+            processed_messages=len(messages),
+            last_timestamp=messages[-1].timestamp_seconds if messages else None,
+            rate_limit=limiter.snapshot() if limiter else None,
+        )
+        return {"url": url, "message_count": len(messages)}
+    except FetchCancelled:
+        _flush_progress(progress)
+        _update_meta(job, status="cancelled", error="解析はキャンセルされました。")
+        _disable_retries(job)
+        if job:
+            cancel_waiting_stages(job.connection, job.id)
+        raise
+    except ValueError as exc:
+        _flush_progress(progress)
+        _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        raise
+    except Exception:  # pylint: disable=broad-except
+        _flush_progress(progress)
+        _mark_failure(job, "チャットの取得中にエラーが発生しました。")
+        raise
+    finally:
+        _flush_progress(progress)
+
+
+@_instrumented_stage
+def run_segment_planner_stage(url: str, keyword: Optional[str], pipeline_config: Dict) -> Dict:
+    job = get_current_job()
+    timer = _job_timer(job)
+    store_ttl = pipeline_config["REDIS"]["result_ttl"]
+    archived = _open_archived(_chat_archive(pipeline_config.get("ARCHIVE")), url)
+    if archived is not None:
+        if not job:
+            return {"url": url, "segments": 0}
+        _update_meta(
+            job,
+            status="completed",
+            fan_out=False,
+            processed_messages=archived.count,
+            last_timestamp=_last_archived_timestamp(archived),
+            source="archive",
+        )
+        enqueue_analysis_stages(job.connection, job.id, url, keyword, pipeline_config)
+        return {"url": url, "segments": 0}
+
+    # One segment covering the whole stream when the duration is unknown keeps
+    # the reducer path identical for short videos and missing API keys.
+    with timed(timer, "plan"):
+        youtube_config = pipeline_config["YOUTUBE"]
+        segments = (
+            plan_fetch_segments(url, youtube_config, _duration_lookup(job, youtube_config))
+            or [(0, None)]
+        )
+    coverage = _coverage_store(job, url, pipeline_config.get("CHECKPOINT"))
+    if coverage:
+        segments = uncovered_segments(segments, coverage.intervals())
+    if coverage and not segments:
+        messages = merge_segment_messages(
+            coverage.load_batches(), pipeline_config["CHATDOWNLOADER"].get("message_limit")
+        )
+        MessageStore(job.connection, store_ttl).save(job.id, messages)
+        _update_meta(
+            job,
+            status="completed",
+            fan_out=False,
+            processed_messages=len(messages),
+            last_timestamp=messages[-1].timestamp_seconds if messages else None,
+            source="coverage",
+        )
+        enqueue_analysis_stages(job.connection, job.id, url, keyword, pipeline_config)
+        return {"url": url, "segments": 0}
+
+    _update_meta(job, status="running", segments_total=len(segments))
+    if not job:
+        return {"url": url, "segments": len(segments)}
+
+    SegmentStore(job.connection, store_ttl).start(job.id, len(segments))
+    reducer = enqueue_segment_fan_out(job.connection, job.id, url, segments, pipeline_config)
+    enqueue_analysis_stages(
+        job.connection, job.id, url, keyword, pipeline_config, depends_on=reducer
+    )
+    return {"url": url, "segments": len(segments)}
+
+
+@_instrumented_stage
+def run_segment_fetch_stage(
+    pipeline_id: str,
+    index: int,
+    url: str,
+    segment: Segment,
+    chat_config: Dict,
+    store_ttl_seconds: int,
+    worker_config: Optional[Dict] = None,
+    rate_limit_config: Optional[Dict] = None,
+    checkpoint_config: Optional[Dict] = None,
+    http_cache_config: Optional[Dict] = None,
+) -> Dict:
+    job = get_current_job()
+    timer = _job_timer(job)
+    _update_meta(job, status="running")
+    store = SegmentStore(job.connection, store_ttl_seconds) if job else None
+    limiter = _rate_limiter(job, url, rate_limit_config)
+    checkpoints = _checkpoint_store(job, url, checkpoint_config)
+    coverage = _coverage_store(job, url, checkpoint_config)
+    fetch_info: Dict = {}
+    progress = _progress_publisher(job, pipeline_id, store_ttl_seconds, worker_config or {})
+
+    def progress_callback(processed: int, last_timestamp: float | None) -> None:
+        if progress:
+            progress.update(processed_messages=processed)
+
+    try:
+        messages = fetch_segment_messages(
+            url,
+            chat_config,
+            tuple(segment),
+            progress_callback=progress_callback,
+            should_cancel=_cancel_watcher(job, pipeline_id, worker_config or {}),
+            request_hooks=_request_hooks(limiter, http_cache_config),
+            checkpoint_factory=checkpoints.for_segment if checkpoints else None,
+            fetch_info=fetch_info,
+            timer=timer,
         )
-        total_data = analyze_messages(messages, None, cps_config, spike_config)
-        result_total = format_result(url, total_data)
-
-        result_keyword = None
-        if keyword:
-            keyword_data = analyze_messages(messages, keyword, cps_config, spike_config)
-            result_keyword = format_result(url, keyword_data)
-
-        payload = {
-            "result_total": result_total,
-            "result_keyword": result_keyword,
-            "messages": messages,
-            "url": url,
-        }
+        with timed(timer, "redis_store"):
+            if store:
+                store.save_segment(pipeline_id, index, messages)
+            # Live chat keeps growing, so only replays count as covered.
+            if coverage and fetch_info.get("stream_status") not in ("live", "upcoming"):
+                coverage.add(tuple(segment), messages)
+        if checkpoints:
+            checkpoints.clear_opened()
+        _record_rate_limit_wait(timer, limiter)
+        _flush_progress(progress)
         _update_meta(
             job,
             status="completed",
-            result_total=result_total,
-            result_keyword=result_keyword,
+            stream_status=fetch_info.get("stream_status"),
+            processed_messages=len(messages),
+            rate_limit=limiter.snapshot() if limiter else None,
+        )
+        return {"index": index, "message_count": len(messages)}
+    except FetchCancelled:
+        _flush_progress(progress)
+        _update_meta(job, status="cancelled")
+        _disable_retries(job)
+        _update_pipeline_meta(job, pipeline_id, status="cancelled", error="解析はキャンセルされました。")
+        if job:
+            cancel_waiting_stages(job.connection, pipeline_id)
+        raise
+    except ValueError as exc:
+        _flush_progress(progress)
+        _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        _update_pipeline_meta(job, pipeline_id, status="error", error=str(exc))
+        raise
+    except Exception:  # pylint: disable=broad-except
+        _flush_progress(progress)
+        message = "チャットの取得中にエラーが発生しました。"
+        _mark_failure(job, message)
+        if not (job and job.retries_left):
+            _update_pipeline_meta(job, pipeline_id, status="error", error=message)
+        raise
+    finally:
+        _flush_progress(progress)
+
+
+@_instrumented_stage
+def run_segment_reduce_stage(
+    pipeline_id: str,
+    chat_config: Dict,
+    store_ttl_seconds: int,
+    url: Optional[str] = None,
+    archive_config: Optional[Dict] = None,
+    checkpoint_config: Optional[Dict] = None,
+) -> Dict:
+    job = get_current_job()
+    timer = _job_timer(job)
+    _update_meta(job, status="running")
+    if not job:
+        return {"message_count": 0}
+    try:
+        segment_store = SegmentStore(job.connection, store_ttl_seconds)
+        coverage = _coverage_store(job, url, checkpoint_config) if url else None
+        with timed(timer, "redis_load"):
+            batches = segment_store.load_segments(pipeline_id)
+            if coverage:
+                # Ranges skipped by the planner are merged back from earlier runs.
+                batches = coverage.load_batches() + batches
+        with timed(timer, "merge"):
+            messages = merge_segment_messages(batches, chat_config.get("message_limit"))
+        with timed(timer, "redis_store"):
+            MessageStore(job.connection, store_ttl_seconds).save(pipeline_id, messages)
+        if url and not chat_config.get("message_limit"):
+            with timed(timer, "archive"):
+                archived = _archive_messages(
+                    _chat_archive(archive_config), url, messages, _segments_stream_status(job)
+                )
+            if archived and coverage:
+                coverage.clear()
+        # The store goes away with its counts, so the status keeps the final ones.
+        segments_completed = segment_store.progress(pipeline_id)["completed"]
+        segment_store.delete(pipeline_id)
+        last_timestamp = messages[-1].timestamp_seconds if messages else None
+        _update_pipeline_meta(
+            job,
+            pipeline_id,
+            status="completed",
+            processed_messages=len(messages),
+            last_timestamp=last_timestamp,
+            segments_completed=segments_completed,
         )
-        return payload
+        _update_meta(job, status="completed")
     except ValueError as exc:
         _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        _update_pipeline_meta(job, pipeline_id, status="error", error=str(exc))
         raise
     except Exception:  # pylint: disable=broad-except
-        _update_meta(job, status="error", error="解析中にエラーが発生しました。")
+        message = "チャットの統合中にエラーが発生しました。"
+        _mark_failure(job, message)
+        if not job.retries_left:
+            _update_pipeline_meta(job, pipeline_id, status="error", error=message)
         raise
+    return {"message_count": len(messages)}
+
+
+@_instrumented_stage
+def run_analysis_stage(
+    pipeline_id: str,
+    url: str,
+    keyword: Optional[str],
+    cps_config: Dict,
+    spike_config: Dict,
+    store_ttl_seconds: int,
+    pyramid_config: Optional[Dict] = None,
+    archive_config: Optional[Dict] = None,
+) -> Dict:
+    job = get_current_job()
+    timer = _job_timer(job)
+    _update_meta(job, status="running", keyword=keyword)
+    try:
+        _raise_if_cancelled(job, pipeline_id)
+        chat = _load_chat(job, pipeline_id, url, store_ttl_seconds, timer, archive_config)
+        if chat is None:
+            raise ValueError("取得済みのチャットが見つかりませんでした。再度解析してください。")
+        result = _analyze_and_format(
+            job, timer, pipeline_id, url, chat, keyword, cps_config, spike_config,
+            store_ttl_seconds, pyramid_config,
+        )
+        _raise_if_cancelled(job, pipeline_id)
+        if job:
+            # RQ stores the return value only after this function returns, so
+            # event subscribers get the result with the event instead.
+            publish_event(
+                job.connection,
+                pipeline_id,
+                split_stage_job_id(job.id)[1],
+                result=pack_result(result, as_text=True),
+                keyword=keyword,
+            )
+        _update_meta(job, status="completed")
+        with timed(timer, "pack"):
+            packed = pack_result(result)
+        return {"result": packed, "keyword": keyword}
+    except FetchCancelled:
+        _update_meta(job, status="cancelled", error="解析はキャンセルされました。")
+        _disable_retries(job)
+        raise
+    except ValueError as exc:
+        _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        raise
+    except Exception:  # pylint: disable=broad-except
+        _mark_failure(job, "解析中にエラーが発生しました。")
+        raise
+
+
+@_instrumented_stage
+def run_recompute_stage(
+    pipeline_id: str,
+    url: str,
+    keyword: Optional[str],
+    cps_config: Dict,
+    spike_config: Dict,
+    store_ttl_seconds: int,
+    cache_key: str,
+    archive_config: Optional[Dict] = None,
+    pyramid_config: Optional[Dict] = None,
+) -> Dict:
+    """Keyword analysis requested from the UI after a pipeline finished.
+
+    The result replaces the pipeline's keyword result and is cached under
+    ``cache_key`` so the same question about the same chat is answered from Redis.
+    """
+    job = get_current_job()
+    timer = _job_timer(job)
+    _update_meta(job, status="running", keyword=keyword)
+    try:
+        chat = _load_chat(job, pipeline_id, url, store_ttl_seconds, timer, archive_config)
+        if not chat:
+            raise ValueError("取得済みのチャットが見つかりませんでした。再度解析してください。")
+        # Without a keyword the pyramid already holds these series from the pipeline.
+        result = _analyze_and_format(
+            job, timer, pipeline_id, url, chat, keyword, cps_config, spike_config,
+            store_ttl_seconds, pyramid_config if keyword else None, interactive=True,
+        )
+        with timed(timer, "pack"):
+            packed = pack_result(result, as_text=True)
+        if job:
+            ResultCache(job.connection, store_ttl_seconds).set(cache_key, packed)
+            save_recomputed(job.connection, pipeline_id, keyword, packed, store_ttl_seconds)
+            publish_event(job.connection, pipeline_id, KEYWORD_STAGE, result=packed, keyword=keyword)
+        _update_meta(job, status="completed")
+        return {"result": packed, "keyword": keyword}
+    except ValueError as exc:
+        _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        raise
+    except Exception:  # pylint: disable=broad-except
+        _mark_failure(job, "解析中にエラーが発生しました。")
+        raise
+
+
+@_instrumented_stage
+def run_channel_batch_stage(
+    batch_id: str,
+    url: str,
+    channel: Dict[str, str],
+    keyword: Optional[str],
+    video_type: str,
+    batch_config: Dict,
+    pipeline_config: Dict,
+) -> Dict:
+    """Analyze every listed video of a channel, one regular pipeline per video.
+
+    Keeps up to ``max_concurrent_videos`` pipelines in flight and starts at
+    most ``videos_per_minute`` of them, polling the ones it started. All state
+    is in ``BatchStore``: a driver queued again for the same batch skips the
+    listing, picks up the pipelines already started and never starts a video
+    twice, since pipeline ids are derived from the batch and video ids.
+    """
+    job = get_current_job()
+    if not job:
+        return {"batch_id": batch_id, "videos": 0}
+    timer = _job_timer(job)
+    store = BatchStore(job.connection, batch_config["ttl_seconds"])
+    try:
+        if not (store.info(batch_id) or {}).get("listed"):
+            _update_meta(job, status="running")
+            store.update(batch_id, status="listing", error=None)
+            with timed(timer, "list"):
+                _list_batch_videos(
+                    job, store, batch_id, channel, video_type, batch_config, pipeline_config
+                )
+        store.update(batch_id, status="running", error=None)
+        cancelled = _drive_batch(job, store, batch_id, keyword, batch_config, pipeline_config)
+    except ValueError as exc:
+        store.update(batch_id, status="error", error=str(exc))
+        _update_meta(job, status="error", error=str(exc))
+        _disable_retries(job)
+        raise
+    except Exception:  # pylint: disable=broad-except
+        message = "チャンネルの一括解析中にエラーが発生しました。"
+        store.update(batch_id, status="error", error=message)
+        _mark_failure(job, message)
+        raise
+
+    counts = store.counts(batch_id)
+    if cancelled:
+        store.update(batch_id, status="cancelled", finished_at=time.time())
+        _update_meta(job, status="cancelled", error="解析はキャンセルされました。", **counts)
+    else:
+        store.update(batch_id, status="completed", finished_at=time.time())
+        _update_meta(job, status="completed", **counts)
+    return {"batch_id": batch_id, "videos": counts["done"]}
+
+
+def _list_batch_videos(
+    job,
+    store: BatchStore,
+    batch_id: str,
+    channel: Dict[str, str],
+    video_type: str,
+    batch_config: Dict,
+    pipeline_config: Dict,
+) -> None:
+    listed = list_channel_videos(channel, video_type, limit=batch_config["max_videos"])
+    youtube_config = pipeline_config["YOUTUBE"]
+    api_key = youtube_config.get("api_key")
+    metadata: Dict = {}
+    if api_key:
+        try:
+            metadata = VideoMetadataCache.from_config(job.connection, youtube_config).lookup_many(
+                (item.get("video_id") for item in listed), api_key
+            )
+        except (requests.RequestException, ValueError):
+            # Metadata only refines the skip list; the fetches do not need it.
+            logger.warning("Video metadata lookup failed for batch %s", batch_id)
+
+    archive = _chat_archive(pipeline_config.get("ARCHIVE"))
+    videos: List[Dict] = []
+    skipped: List[Dict] = []
+    for item in listed:
+        video_id = item.get("video_id")
+        if not video_id:
+            continue
+        video = metadata.get(video_id)
+        if archive and archive.exists(video_id):
+            reason = "archived"
+        elif item.get("video_type") in ("LIVE", "UPCOMING") or (
+            video and video.live_status != "none"
+        ):
+            # Chat of a stream that has not ended is neither final nor archivable.
+            reason = "not_finished"
+        elif video_id in metadata and video is None:
+            reason = "not_found"
+        else:
+            videos.append(
+                {
+                    "index": len(videos),
+                    "video_id": video_id,
+                    "title": item.get("title"),
+                    "video": video.to_dict() if video else None,
+                }
+            )
+            continue
+        skipped.append({"video_id": video_id, "title": item.get("title"), "reason": reason})
+    store.fill(batch_id, videos, listed=True, total=len(videos), skipped=skipped)
+
+
+def _drive_batch(
+    job,
+    store: BatchStore,
+    batch_id: str,
+    keyword: Optional[str],
+    batch_config: Dict,
+    pipeline_config: Dict,
+) -> bool:
+    """Run the batch to the end; returns whether it was cancelled."""
+    connection = job.connection
+    redis_cfg = pipeline_config["REDIS"]
+    max_running = max(1, int(batch_config["max_concurrent_videos"]))
+    per_second = float(batch_config["videos_per_minute"]) / 60
+    # Token bucket that starts full, so the first wave fills the fleet at once.
+    allowance = float(max_running)
+    last_refill = time.monotonic()
+    while True:
+        running = store.running(batch_id)
+        if is_cancel_requested(connection, batch_id):
+            for entry in running.values():
+                cancel_pipeline(connection, entry["pipeline_id"], redis_cfg["job_timeout"])
+            return True
+
+        for video_id, entry in running.items():
+            payload = load_pipeline_payload(
+                connection, entry["pipeline_id"], redis_cfg["result_ttl"]
+            )
+            if payload is None:
+                # Marked as started but never queued: the last driver stopped in between.
+                _start_batch_video(connection, entry, keyword, pipeline_config)
+                continue
+            if payload["status"] not in _FINISHED_STATUSES:
+                continue
+            record = _batch_video_record(entry, payload, keyword, batch_config["spikes_per_video"])
+            store.finish(batch_id, video_id, record)
+            _metrics.inc("chat_batch_videos_total", outcome=record["status"])
+        counts = store.counts(batch_id)
+        if not counts["pending"] and not counts["running"]:
+            return False
+
+        now = time.monotonic()
+        if per_second > 0:
+            allowance = min(max_running, allowance + (now - last_refill) * per_second)
+        else:
+            allowance = max_running
+        last_refill = now
+        starting = [
+            {**entry, "pipeline_id": batch_pipeline_id(batch_id, entry["video_id"])}
+            for entry in store.next_pending(
+                batch_id, min(max_running - counts["running"], int(allowance))
+            )
+        ]
+        if starting:
+            store.mark_started(batch_id, starting)
+            for entry in starting:
+                _start_batch_video(connection, entry, keyword, pipeline_config)
+            allowance -= len(starting)
+            counts = store.counts(batch_id)
+        _update_meta(job, status="running", **counts)
+        time.sleep(max(0.1, float(batch_config["poll_seconds"])))
+
+
+def _start_batch_video(connection, entry: Dict, keyword: Optional[str], config: Dict) -> None:
+    enqueue_pipeline(
+        connection,
+        pipeline_id=entry["pipeline_id"],
+        url=f"https://www.youtube.com/watch?v={entry['video_id']}",
+        keyword=keyword,
+        app_config=config,
+        video=entry.get("video"),
+    )
+
+
+def _batch_video_record(
+    entry: Dict, payload: Dict, keyword: Optional[str], spikes_per_video: int
+) -> Dict:
+    result = payload.get("result_keyword" if keyword else "result_total") or {}
+    return {
+        "index": entry.get("index"),
+        "video_id": entry["video_id"],
+        "title": entry.get("title"),
+        "pipeline_id": entry["pipeline_id"],
+        "status": payload["status"],
+        "error": payload.get("error"),
+        "message_count": payload.get("processed_messages"),
+        "spikes": (result.get("spikes") or [])[: max(0, int(spikes_per_video))],
+    }
+
+
+def _load_chat(
+    job,
+    pipeline_id: str,
+    url: str,
+    store_ttl_seconds: int,
+    timer: Optional[StageTimer],
+    archive_config: Optional[Dict],
+) -> Optional[ChatColumns]:
+    """The pipeline's chat from this process's cache, the message store or the archive.
+
+    A chat loaded here is cached with the indexes later analyses build on it,
+    and recomputes for the pipeline are routed to this worker while it stays.
+    """
+    chat = _message_cache.get(pipeline_id) if job else None
+    if chat is not None:
+        if timer:
+            timer.incr("message_cache_hits")
+    else:
+        chat = _load_stored_chat(job, pipeline_id, url, store_ttl_seconds, timer, archive_config)
+        if chat is None or not job:
+            return chat
+        evicted = functools.partial(_forget_affinities, job.connection)
+        if not _message_cache.put(pipeline_id, chat, on_evict=evicted):
+            return chat
+    if _affinity:
+        record_affinity(job.connection, pipeline_id, *_affinity, store_ttl_seconds)
+    return chat
+
+
+def _load_stored_chat(
+    job,
+    pipeline_id: str,
+    url: str,
+    store_ttl_seconds: int,
+    timer: Optional[StageTimer],
+    archive_config: Optional[Dict],
+) -> Optional[ChatColumns]:
+    if job:
+        with timed(timer, "redis_load"):
+            messages = MessageStore(job.connection, store_ttl_seconds).load(pipeline_id)
+        if messages is not None:
+            return ChatColumns.from_messages(messages)
+    with timed(timer, "archive_load"):
+        archived = _open_archived(_chat_archive(archive_config), url)
+    return archived.columns() if archived else None
+
+
+def _forget_affinities(connection, pipeline_ids: List[str]) -> None:
+    # Evicted chats would be loaded from Redis again, so recomputes for them
+    # may as well go to any worker.
+    if not _affinity:
+        return
+    for pipeline_id in pipeline_ids:
+        forget_affinity(connection, pipeline_id, _affinity[0])
+
+
+def _analyze_and_format(
+    job,
+    timer: Optional[StageTimer],
+    pipeline_id: str,
+    url: str,
+    chat: ChatColumns,
+    keyword: Optional[str],
+    cps_config: Dict,
+    spike_config: Dict,
+    store_ttl_seconds: int,
+    pyramid_config: Optional[Dict],
+    interactive: bool = False,
+) -> Dict:
+    if timer:
+        timer.incr("messages", len(chat))
+    with _interactive_slots if interactive else _analysis_slots:
+        data = analyze_columns(chat, keyword, cps_config, spike_config, timer=timer)
+        with timed(timer, "format"):
+            result = format_result(
+                url, data, KEYWORD_RESULT_SERIES if keyword else TOTAL_RESULT_SERIES
+            )
+        if job and pyramid_config and pyramid_config.get("enabled"):
+            with timed(timer, "pyramid"):
+                SeriesPyramid(job.connection, store_ttl_seconds).build(
+                    pipeline_id, chat, keyword, cps_config, pyramid_config
+                )
+    return result
+
+
+def _raise_if_cancelled(job, pipeline_id: str) -> None:
+    # Analysis cannot be interrupted midway, so it checks before starting and
+    # before publishing its result.
+    if job and is_cancel_requested(job.connection, pipeline_id):
+        raise FetchCancelled()
+
+
+def _cancel_watcher(job, pipeline_id: Optional[str], worker_config: Dict) -> Optional[CancelWatcher]:
+    if not job or not pipeline_id:
+        return None
+    return CancelWatcher(
+        job.connection,
+        pipeline_id,
+        poll_interval_seconds=float(worker_config.get("cancel_poll_seconds", 2)),
+    )
+
+
+def _progress_publisher(
+    job, pipeline_id: Optional[str], store_ttl_seconds: int, worker_config: Dict
+) -> Optional[ProgressPublisher]:
+    if not job or not pipeline_id:
+        return None
+    return ProgressPublisher(
+        job.connection,
+        pipeline_id,
+        split_stage_job_id(job.id)[1],
+        ttl_seconds=store_ttl_seconds,
+        interval_seconds=float(worker_config.get("progress_interval_ms", 500)) / 1000,
+    )
+
+
+def _flush_progress(progress: Optional[ProgressPublisher]) -> None:
+    # Called before a stage writes its terminal status, so the last count is not
+    # published after it, and again on the way out. Progress is best effort: a
+    # failed write must not replace the outcome or the exception of the stage.
+    if not progress:
+        return
+    try:
+        progress.flush()
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Failed to flush progress", exc_info=True)
+
+
+def _rate_limiter(job, url: str, rate_limit_config: Optional[Dict]) -> Optional[RedisRateLimiter]:
+    if not job or not rate_limit_config:
+        return None
+    return build_rate_limiter(job.connection, rate_limit_config, extract_video_id(url))
+
+
+def _checkpoint_store(job, url: str, checkpoint_config: Optional[Dict]) -> Optional[CheckpointStore]:
+    if not job or not checkpoint_config or not checkpoint_config.get("enabled"):
+        return None
+    return CheckpointStore(
+        job.connection,
+        _video_key(url),
+        ttl_seconds=int(checkpoint_config.get("ttl_seconds", 86400)),
+        interval_seconds=float(checkpoint_config.get("interval_seconds", 30)),
+        owner=job.id,
+    )
+
+
+def _coverage_store(job, url: str, checkpoint_config: Optional[Dict]) -> Optional[CoverageStore]:
+    if not job or not checkpoint_config or not checkpoint_config.get("enabled"):
+        return None
+    return CoverageStore(
+        job.connection,
+        _video_key(url),
+        ttl_seconds=int(checkpoint_config.get("ttl_seconds", 86400)),
+    )
+
+
+def _duration_lookup(job, youtube_config: Dict) -> Optional[Callable[[str], Optional[int]]]:
+    # Shared through Redis, since a per-process cache does not outlive a forked job.
+    if not job:
+        return None
+    return VideoMetadataCache.from_config(job.connection, youtube_config).duration_lookup(
+        youtube_config.get("api_key")
+    )
+
+
+def _video_key(url: str) -> str:
+    # Keyed by video rather than job so that a resubmitted analysis resumes too.
+    return extract_video_id(url) or hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _chat_archive(archive_config: Optional[Dict]) -> Optional[ChatArchive]:
+    if not archive_config or not archive_config.get("enabled"):
+        return None
+    return ChatArchive(archive_config["directory"])
+
+
+def _open_archived(archive: Optional[ChatArchive], url: str) -> Optional[ArchivedChat]:
+    if not archive:
+        return None
+    return archive.open(extract_video_id(url))
+
+
+def _last_archived_timestamp(archived: ArchivedChat) -> Optional[float]:
+    return float(archived.timestamps[-1]) if archived.count else None
+
+
+def _archive_messages(
+    archive: Optional[ChatArchive],
+    url: str,
+    messages: List[ChatMessage],
+    stream_status: Optional[str],
+) -> bool:
+    # Only finished replays are immutable; live and upcoming chats keep growing.
+    video_id = extract_video_id(url)
+    if not archive or not video_id or stream_status != "past":
+        return False
+    try:
+        archive.write(video_id, messages, stream_status=stream_status)
+    except OSError:
+        # The messages are already in Redis, so a full or read-only disk only
+        # costs a re-fetch next time.
+        logger.exception("Failed to archive chat for %s", video_id)
+        return False
+    return True
+
+
+def _segments_stream_status(job) -> Optional[str]:
+    statuses = {
+        (child.meta or {}).get("stream_status")
+        for child in Job.fetch_many(job.dependency_ids, connection=job.connection)
+        if child is not None
+    }
+    return statuses.pop() if len(statuses) == 1 else None
+
+
+def _request_hooks(
+    limiter: Optional[RedisRateLimiter], http_cache_config: Optional[Dict] = None
+) -> List[RequestHook]:
+    hooks: List[RequestHook] = []
+    cache = build_http_cache(http_cache_config)
+    # Outermost so that cached responses do not take rate limit tokens.
+    if cache:
+        hooks.append(http_cache_hook(cache))
+    if limiter:
+        hooks.append(rate_limit_hook(limiter))
+    hooks.append(metrics_hook(_metrics))
+    return hooks
+
+
+def _record_stage_metrics(stage: str, outcome: str, timer: StageTimer) -> None:
+    stats = timer.snapshot()
+    _metrics.inc("chat_jobs_finished_total", stage=stage, outcome=outcome)
+    _metrics.observe("chat_job_duration_seconds", stats["wall_seconds"], stage=stage)
+    if stage in _FETCH_STAGES:
+        _metrics.inc("chat_fetched_messages_total", stats["messages"])
+        _metrics.inc("chat_fetch_seconds_total", stats["wall_seconds"])
+
+
+def _push_metrics(job) -> None:
+    try:
+        push_metrics(job.connection, _metrics)
+    except Exception:  # pylint: disable=broad-except
+        # Kept in memory and pushed with the next job of this process.
+        logger.warning("Failed to push worker metrics", exc_info=True)
+
+
+def _job_timer(job) -> Optional[StageTimer]:
+    return _stage_timers.get(job.id) if job else None
+
+
+def _record_rate_limit_wait(
+    timer: Optional[StageTimer], limiter: Optional[RedisRateLimiter]
+) -> None:
+    if timer and limiter:
+        stats = limiter.snapshot()
+        timer.add("rate_limit_wait", stats["wait_seconds"], calls=int(stats["throttled"]))
+
+
+def _update_pipeline_meta(job, pipeline_id: str, **fields) -> None:
+    if not job:
+        return
+    try:
+        root = Job.fetch(pipeline_id, connection=job.connection)
+    except NoSuchJobError:
+        return
+    _update_meta(root, **fields)
+
+
+def _mark_failure(job, message: str) -> None:
+    if job and job.retries_left:
+        _update_meta(job, status="retrying", error=None)
+    else:
+        _update_meta(job, status="error", error=message)
+
+
+def _disable_retries(job) -> None:
+    # User errors and cancellations are not transient; RQ reads this attribute
+    # from the same job instance when deciding whether to requeue.
+    if job:
+        job.retries_left = 0
 
 
 def _update_meta(job, **fields) -> None:
     if not job:
         return
+    timer = _stage_timers.get(job.id)
+    started = time.perf_counter()
     meta = job.meta or {}
     meta.update(fields)
+    if timer:
+        meta["stats"] = timer.snapshot()
     job.meta = meta
     job.save_meta()
+    _publish_meta_event(job, fields)
+    if timer:
+        timer.add("redis_meta", time.perf_counter() - started)
+
+
+def _publish_meta_event(job, fields: Dict) -> None:
+    event = {key: fields[key] for key in _EVENT_FIELDS if key in fields}
+    if not event:
+        return
+    pipeline_id, stage = split_stage_job_id(job.id)
+    publish_event(job.connection, pipeline_id, stage, **event)
@@ -0,0 +1,196 @@
+"""Micro-benchmarks for the analysis stage on synthetic chat.
+
+Example::
+
+    python -m benchmarks.analysis_benchmark --sizes 10000 100000 1000000 \\
+        --output bench-analysis.json
+
+Every case reports wall time, the peak RSS growth while it ran and, from a
+separate tracemalloc pass, the peak and retained Python allocations. The
+analyzer takes a list of ``ChatMessage`` objects, so sizes towards 50M need
+tens of GB of RAM just for the input.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import load_app_config
+from app.job_utils import (
+    TOTAL_RESULT_SERIES,
+    encode_result,
+    format_result,
+    jsonable_result,
+    pack_result,
+    project_result,
+)
+from app.services.analysis_pipeline import analyze_messages
+from app.services.cps_analyzer import CPSAnalyzer
+from app.services.downsample import downsample_result
+from app.services.spike_detector import SpikeDetector
+
+from .common import write_report
+from .synthetic_chat import ChatProfile, generate_messages
+
+VIDEO_URL = "https://www.youtube.com/watch?v=benchanalyze"
+
+
+class RssSampler:
+    """Polls the resident set size in a background thread and keeps the peak."""
+
+    def __init__(self, interval_seconds: float = 0.005) -> None:
+        self._interval = interval_seconds
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.baseline = 0
+        self.peak = 0
+
+    def current(self) -> int:
+        try:
+            with open("/proc/self/statm", encoding="ascii") as fh:
+                return int(fh.read().split()[1]) * self._page_size
+        except OSError:
+            # ru_maxrss is the lifetime peak in KiB on Linux, so only an upper bound.
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def __enter__(self) -> "RssSampler":
+        self.baseline = self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, self.current())
+
+
+def measure(func: Callable[[], Any], repeat: int, allocations: bool) -> Dict:
+    walls: List[float] = []
+    rss_growth = 0
+    for _ in range(repeat):
+        gc.collect()
+        with RssSampler() as sampler:
+            start = time.perf_counter()
+            result = func()
+            walls.append(time.perf_counter() - start)
+        rss_growth = max(rss_growth, sampler.peak - sampler.baseline)
+        del result
+
+    measurement = {
+        "runs": walls,
+        "median_wall_seconds": statistics.median(walls),
+        "min_wall_seconds": min(walls),
+        "peak_rss_bytes": rss_growth,
+    }
+    if allocations:
+        gc.collect()
+        tracemalloc.start()
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        measurement["alloc_peak_bytes"] = peak
+        measurement["alloc_retained_bytes"] = retained
+    return measurement
+
+
+def bench_size(size: int, args: argparse.Namespace, config: Dict) -> List[Dict]:
+    cps_config = config["CPS"]
+    spike_config = config["SPIKE_DETECTION"]
+    profile = ChatProfile(duration_seconds=args.duration)
+    messages = generate_messages(size, profile, seed=args.seed)
+
+    analyzer = CPSAnalyzer(
+        bucket_size_seconds=cps_config["bucket_size_seconds"],
+        smoothing_window_seconds=cps_config["smoothing_window_seconds"],
+        smoothing_average_window=cps_config.get("smoothing_average_window", 6),
+    )
+    detector = SpikeDetector(
+        min_prominence=spike_config["min_prominence"],
+        min_gap_seconds=spike_config["min_gap_seconds"],
+        pre_start_buffer_seconds=spike_config.get("pre_start_buffer_seconds", 0.0),
+    )
+    cps_result = analyzer.analyze(messages, keyword=args.keyword)
+    analyzed = analyze_messages(messages, args.keyword, cps_config, spike_config)
+    formatted = format_result(VIDEO_URL, analyzed)
+    chart_fields = frozenset(("time_axis", "smoothed_total", "spikes"))
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "cps_analyze": lambda: analyzer.analyze(messages),
+        "cps_analyze_keyword": lambda: analyzer.analyze(messages, keyword=args.keyword),
+        "spike_detect": lambda: detector.detect(cps_result.time_axis, cps_result.smoothed_total),
+        "analyze_messages": lambda: analyze_messages(
+            messages, args.keyword, cps_config, spike_config
+        ),
+        "format_result": lambda: format_result(VIDEO_URL, analyzed),
+        "json_serialize": lambda: json.dumps(jsonable_result(formatted), ensure_ascii=False),
+        "json_serialize_stored_total": lambda: json.dumps(
+            jsonable_result(format_result(VIDEO_URL, analyzed, TOTAL_RESULT_SERIES)),
+            ensure_ascii=False,
+        ),
+        "json_serialize_projected": lambda: json.dumps(
+            jsonable_result(project_result(formatted, chart_fields)), ensure_ascii=False
+        ),
+        "binary_encode": lambda: encode_result(formatted),
+        "pack_base64": lambda: json.dumps(pack_result(formatted, as_text=True)),
+        "downsample": lambda: downsample_result(formatted, config["SERIES"]["default_points"]),
+    }
+    results = []
+    for name, func in cases.items():
+        if args.cases and name not in args.cases:
+            continue
+        measurement = measure(func, args.repeat, allocations=not args.no_allocations)
+        results.append({"case": name, "messages": size, **measurement})
+        print(
+            f"{name} n={size}: {measurement['median_wall_seconds'] * 1e3:.2f} ms, "
+            f"+{measurement['peak_rss_bytes'] / 2**20:.1f} MiB RSS",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="解析処理のマイクロベンチマーク")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+        help="メッセージ数 (50M 付近は数十 GB のメモリが必要)",
+    )
+    parser.add_argument("--duration", type=int, default=3 * 3600, help="配信の長さ (秒)")
+    parser.add_argument("--keyword", default="草")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", nargs="+", default=None, help="実行するケースを絞り込む")
+    parser.add_argument(
+        "--no-allocations", action="store_true", help="tracemalloc による計測を省略する"
+    )
+    parser.add_argument("--output", default=None, help="結果 JSON の出力先 (省略時は標準出力)")
+    args = parser.parse_args()
+
+    config = load_app_config()
+    results: List[Dict] = []
+    for size in args.sizes:
+        results.extend(bench_size(size, args, config))
+        gc.collect()
+    write_report("analysis", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
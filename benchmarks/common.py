@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(name: str, options: Dict, results: List[Dict], output: Optional[str]) -> None:
+    report = {
+        "benchmark": name,
+        "git_commit": git_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": results,
+    }
+    body = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            fh.write(body)
+    else:
+        print(body)
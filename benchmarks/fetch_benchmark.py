@@ -0,0 +1,141 @@
+"""Fetch throughput benchmark against the local YouTube stub.
+
+Example::
+
+    python -m benchmarks.fetch_benchmark --messages 200000 --latency-ms 30 \\
+        --parallel 1 2 4 8 --output bench-fetch.json
+
+The stub runs in a child process so the CPU figures only cover the fetch side.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import requests
+
+from app.services.analysis_pipeline import fetch_chat_messages
+from app.services.youtube_api import fetch_video_duration_seconds
+
+from .common import write_report
+from .stub_youtube import redirect_hook
+
+VIDEO_ID = "benchfetch01"
+
+
+def start_stub(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    command = [
+        sys.executable, "-m", "benchmarks.stub_youtube",
+        "--messages", str(args.messages),
+        "--duration", str(args.duration),
+        "--page-size", str(args.page_size),
+        "--latency-ms", str(args.latency_ms),
+        "--timeout-ms", str(args.timeout_ms),
+        "--rate-429", str(args.rate_429),
+        "--seed", str(args.seed),
+    ]
+    if args.recorded:
+        command += ["--recorded", args.recorded]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip() if process.stdout else ""
+    if not line.startswith("listening on "):
+        process.kill()
+        raise RuntimeError(f"stub did not start: {line!r}")
+    return process, line[len("listening on "):]
+
+
+def run_once(base_url: str, video_url: str, parallel: int, args: argparse.Namespace) -> Dict:
+    requests.post(f"{base_url}/__reset", json={}, timeout=5)
+    youtube_config = {
+        "api_key": "stub" if parallel > 1 else None,
+        "segment_duration_seconds": args.segment_seconds,
+        "parallel_segments": parallel,
+    }
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    messages = fetch_chat_messages(
+        url=video_url,
+        chat_config={"request_timeout": 10, "message_limit": None},
+        youtube_config=youtube_config,
+        request_hooks=[redirect_hook(base_url)],
+    )
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    stats = requests.get(f"{base_url}/__stats", timeout=5).json()
+    count = len(messages)
+    chat_requests = stats.get("requests", 0) - stats.get("data_api", 0)
+    return {
+        "messages": count,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "messages_per_second": count / wall if wall else None,
+        "requests": chat_requests,
+        "requests_per_second": chat_requests / wall if wall else None,
+        "cpu_us_per_message": cpu / count * 1e6 if count else None,
+        "throttled": stats.get("throttled", 0),
+    }
+
+
+def summarize(parallel: int, runs: List[Dict]) -> Dict:
+    best = min(runs, key=lambda run: run["wall_seconds"])
+    return {
+        "parallel_segments": parallel,
+        "runs": runs,
+        "median_wall_seconds": statistics.median(run["wall_seconds"] for run in runs),
+        "median_messages_per_second": statistics.median(
+            run["messages_per_second"] or 0 for run in runs
+        ),
+        "best": best,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="チャット取得のスループットベンチマーク")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--duration", type=int, default=7200, help="動画の長さ (秒)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout-ms", type=int, default=0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recorded", default=None, help="記録済みレスポンスのディレクトリ")
+    parser.add_argument("--video-id", default=VIDEO_ID)
+    parser.add_argument("--segment-seconds", type=int, default=900)
+    parser.add_argument("--parallel", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="結果 JSON の出力先 (省略時は標準出力)")
+    args = parser.parse_args()
+
+    process, base_url = start_stub(args)
+    # The Data API lookup used to plan segments goes to the stub as well.
+    os.environ["YOUTUBE_API_BASE_URL"] = f"{base_url}/youtube/v3"
+    fetch_video_duration_seconds.cache_clear()
+    video_url = f"https://www.youtube.com/watch?v={args.video_id}"
+    try:
+        results = []
+        for parallel in args.parallel:
+            runs = [run_once(base_url, video_url, parallel, args) for _ in range(args.repeat)]
+            summary = summarize(parallel, runs)
+            results.append(summary)
+            print(
+                f"parallel_segments={parallel}: "
+                f"{summary['median_messages_per_second']:.0f} msg/s, "
+                f"{summary['best']['requests_per_second']:.1f} req/s, "
+                f"{summary['best']['cpu_us_per_message']:.1f} us CPU/msg",
+                file=sys.stderr,
+            )
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    write_report("fetch", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Data API metadata lookups: one call per video versus batched calls.
+
+Example::
+
+    python -m benchmarks.metadata_benchmark --videos 500 --latency-ms 80 \\
+        --output bench-metadata.json
+
+Runs the YouTube stub in-process and reports, per mode, the number of
+``videos`` calls (each costs one quota unit) and the wall time:
+
+* ``single``: ``fetch_video_metadata`` per video, as segment planning does.
+* ``batched``: ``fetch_videos_metadata`` with 50 ids per call.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from typing import Dict, List
+
+from app.services.youtube_api import fetch_video_metadata, fetch_videos_metadata
+
+from .common import write_report
+from .stub_youtube import StubOptions, serve
+
+
+def bench_mode(mode: str, video_ids: List[str], stub, concurrency: int) -> Dict:
+    stub.reset()
+    started = time.perf_counter()
+    if mode == "single":
+        found = {video_id: fetch_video_metadata(video_id, "bench") for video_id in video_ids}
+    else:
+        found = fetch_videos_metadata(video_ids, "bench", max_concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    calls = stub.stats.get("data_api", 0)
+    return {
+        "mode": mode,
+        "videos": len(video_ids),
+        "found": sum(1 for metadata in found.values() if metadata is not None),
+        "api_calls": calls,
+        "quota_units": calls,
+        "seconds": elapsed,
+        "ms_per_video": elapsed * 1000 / max(1, len(video_ids)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Data API のメタデータ取得 (1 件ずつとまとめて取得の比較)"
+    )
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="まとめて取得するときの同時リクエスト数"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=("single", "batched"), default=["single", "batched"]
+    )
+    parser.add_argument("--output", default=None, help="結果 JSON の出力先 (省略時は標準出力)")
+    args = parser.parse_args()
+
+    server = serve(StubOptions(messages=0, latency_ms=args.latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["YOUTUBE_API_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/youtube/v3"
+    video_ids = [f"bench{index:06d}" for index in range(args.videos)]
+    try:
+        results = [
+            bench_mode(mode, video_ids, server.stub, args.concurrency)  # type: ignore[attr-defined]
+            for mode in args.modes
+        ]
+    finally:
+        server.shutdown()
+    write_report("metadata", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Local stand-in for the YouTube endpoints chat_downloader talks to.
+
+Serves a watch page, the ``live_chat_replay`` page and ``get_live_chat_replay``
+continuations for any video id, either from a synthetic chat or from responses
+recorded with ``HTTP_CACHE_MODE=record``. Run it on its own with
+``python -m benchmarks.stub_youtube`` and point fetches at it with
+``redirect_hook``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from app.services.http_cache import HttpCache, request_key
+
+YOUTUBE_HOME = "https://www.youtube.com"
+API_KEY = "stub-innertube-key"
+# Continuation tokens are "<video>.<top|live>.<index of the first message>".
+_TOKEN_RE = re.compile(r"^(?P<video>[0-9A-Za-z_-]+)\.(?P<kind>top|live)\.(?P<cursor>\d+)$")
+
+
+@dataclass
+class StubOptions:
+    messages: int = 100_000
+    duration_seconds: int = 7200
+    page_size: int = 100
+    member_ratio: float = 0.1
+    latency_ms: float = 0.0
+    timeout_ms: int = 0
+    rate_429: float = 0.0
+    seed: int = 0
+    recorded_dir: Optional[str] = None
+
+
+class StubYouTube:
+    """Synthetic chats, paging and fault injection shared by every handler thread."""
+
+    def __init__(self, options: StubOptions) -> None:
+        self.options = options
+        self.recorded = HttpCache(options.recorded_dir, "replay") if options.recorded_dir else None
+        self._random = random.Random(options.seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._page_cache = lru_cache(maxsize=4096)(self._render_page)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def should_throttle(self) -> bool:
+        if self.options.rate_429 <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.options.rate_429
+
+    def chat(self, video_id: str) -> Tuple[List[float], List[str]]:
+        return _synthetic_chat(
+            video_id, self.options.messages, self.options.duration_seconds, self.options.seed
+        )
+
+    def watch_page(self, video_id: str) -> str:
+        initial_data = {
+            "contents": {
+                "twoColumnWatchNextResults": {
+                    "conversationBar": {
+                        "liveChatRenderer": {
+                            "header": {
+                                "liveChatHeaderRenderer": {
+                                    "viewSelector": {
+                                        "sortFilterSubMenuRenderer": {
+                                            "subMenuItems": [
+                                                _sub_menu_item("Top chat replay", f"{video_id}.top.0"),
+                                                _sub_menu_item("Live chat replay", f"{video_id}.live.0"),
+                                            ]
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        player_response = {
+            "videoDetails": {
+                "videoId": video_id,
+                "title": f"stub {video_id}",
+                "author": "stub",
+                "channelId": "UCstub",
+                "isLiveContent": True,
+                "lengthSeconds": str(self.options.duration_seconds),
+            },
+            "microformat": {
+                "playerMicroformatRenderer": {"liveBroadcastDetails": {"isLiveNow": False}}
+            },
+        }
+        ytcfg = {
+            "INNERTUBE_API_KEY": API_KEY,
+            "INNERTUBE_CONTEXT": {"client": {"clientName": "WEB", "clientVersion": "2.0"}},
+            "INNERTUBE_CONTEXT_CLIENT_NAME": 1,
+            "INNERTUBE_CLIENT_VERSION": "2.0",
+            "DATASYNC_ID": "||",
+        }
+        return (
+            "<html><head><script>"
+            f"var ytInitialPlayerResponse = {json.dumps(player_response)};</script>"
+            f"<script>ytcfg.set({json.dumps(ytcfg)});</script>"
+            f"<script>var ytInitialData = {json.dumps(initial_data)};</script>"
+            "</head><body></body></html>"
+        )
+
+    def page(self, token: str, offset_ms: Optional[float]) -> Optional[bytes]:
+        match = _TOKEN_RE.match(token or "")
+        if not match:
+            return None
+        video_id = match.group("video")
+        cursor = int(match.group("cursor"))
+        if offset_ms:
+            # chat_downloader resends the start offset with every continuation
+            # and stops at the first message before it, so only jump forward.
+            timestamps, _ = self.chat(video_id)
+            cursor = max(cursor, bisect_left(timestamps, offset_ms / 1000))
+        return self._page_cache(video_id, match.group("kind"), cursor)
+
+    def _render_page(self, video_id: str, kind: str, cursor: int) -> bytes:
+        timestamps, texts = self.chat(video_id)
+        end = min(len(timestamps), cursor + self.options.page_size)
+        actions = [
+            _replay_action(
+                video_id, index, timestamps[index], texts[index],
+                random.Random(f"{video_id}:{index}").random() < self.options.member_ratio,
+            )
+            for index in range(cursor, end)
+        ]
+        contents: Dict[str, Any] = {"actions": actions}
+        if end < len(timestamps):
+            data: Dict[str, Any] = {"continuation": f"{video_id}.{kind}.{end}"}
+            if self.options.timeout_ms:
+                data["timeoutMs"] = self.options.timeout_ms
+            contents["continuations"] = [{"liveChatReplayContinuationData": data}]
+        body = {"continuationContents": {"liveChatContinuation": contents}}
+        return json.dumps(body).encode("utf-8")
+
+
+@lru_cache(maxsize=16)
+def _synthetic_chat(
+    video_id: str, count: int, duration_seconds: int, seed: int
+) -> Tuple[List[float], List[str]]:
+    rng = random.Random(f"{seed}:{video_id}")
+    timestamps = sorted(round(rng.uniform(0, duration_seconds), 3) for _ in range(count))
+    words = ["草", "www", "かわいい", "888", "きたー", "lol", "nice", "すごい"]
+    texts = [" ".join(rng.choices(words, k=rng.randint(1, 4))) for _ in range(count)]
+    return timestamps, texts
+
+
+def _sub_menu_item(title: str, continuation: str) -> Dict:
+    return {
+        "title": title,
+        "continuation": {"reloadContinuationData": {"continuation": continuation}},
+    }
+
+
+def _replay_action(video_id: str, index: int, timestamp: float, text: str, member: bool) -> Dict:
+    renderer: Dict[str, Any] = {
+        "id": f"{video_id}-{index}",
+        "message": {"runs": [{"text": text}]},
+        "authorName": {"simpleText": f"user{index % 997}"},
+        "authorExternalChannelId": f"UC{index % 997:022d}",
+        "timestampUsec": str(int(timestamp * 1e6)),
+    }
+    if member:
+        renderer["authorBadges"] = [
+            {"liveChatAuthorBadgeRenderer": {"tooltip": "Member (1 month)"}}
+        ]
+    return {
+        "replayChatItemAction": {
+            "actions": [{"addChatItemAction": {"item": {"liveChatTextMessageRenderer": renderer}}}],
+            "videoOffsetTimeMsec": str(int(timestamp * 1000)),
+        }
+    }
+
+
+def _iso_duration(seconds: int) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"PT{hours}H{minutes}M{secs}S"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "StubYouTube/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def stub(self) -> StubYouTube:
+        return self.server.stub  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path == "/__stats":
+            self._send_json(200, self.stub.stats)
+            return
+        self._delay()
+        if self.stub.recorded:
+            self._send_recorded("GET", None)
+            return
+        if parsed.path == "/watch":
+            self.stub.count("watch")
+            self._send(200, self.stub.watch_page(query.get("v", [""])[0]).encode("utf-8"), "text/html")
+        elif parsed.path in ("/live_chat_replay", "/live_chat"):
+            self.stub.count("live_chat_replay")
+            body = self.stub.page(query.get("continuation", [""])[0], None)
+            if body is None:
+                self._send(404, b"unknown continuation", "text/plain")
+                return
+            html = f"<html><script>var ytInitialData = {body.decode('utf-8')};</script></html>"
+            self._send(200, html.encode("utf-8"), "text/html")
+        elif parsed.path == "/youtube/v3/videos":
+            self.stub.count("data_api")
+            items = [
+                {
+                    "id": video_id,
+                    "contentDetails": {"duration": _iso_duration(self.stub.options.duration_seconds)},
+                    "snippet": {
+                        "title": f"stub {video_id}",
+                        "channelId": "UCstub",
+                        "channelTitle": "stub channel",
+                        "liveBroadcastContent": "none",
+                    },
+                }
+                for video_id in ",".join(query.get("id", [])).split(",")
+                if video_id
+            ]
+            self._send_json(200, {"items": items})
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def do_POST(self) -> None:  # noqa: N802
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if parsed.path == "/__reset":
+            self.stub.reset()
+            self._send_json(200, {})
+            return
+        self._delay()
+        if self.stub.should_throttle():
+            self.stub.count("throttled")
+            self._send(429, b"Too Many Requests", "text/plain")
+            return
+        if self.stub.recorded:
+            self._send_recorded("POST", payload)
+            return
+        if parsed.path.startswith("/youtubei/v1/live_chat/get_live_chat"):
+            self.stub.count("continuation")
+            offset = (payload.get("currentPlayerState") or {}).get("playerOffsetMs")
+            body = self.stub.page(payload.get("continuation"), offset)
+            if body is None:
+                self._send_json(404, {"error": {"code": 404, "message": "unknown continuation"}})
+                return
+            self._send(200, body, "application/json")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _send_recorded(self, method: str, payload: Optional[Dict]) -> None:
+        kwargs = {"json": payload} if payload is not None else {}
+        recorded = self.stub.recorded.load(request_key(method, YOUTUBE_HOME + self.path, kwargs))
+        if recorded is None:
+            self.stub.count("recorded_miss")
+            self._send(404, b"not recorded", "text/plain")
+            return
+        self.stub.count("recorded_hit")
+        content_type = recorded.headers.get("Content-Type") or "text/html"
+        self._send(recorded.status_code, recorded.content, content_type)
+
+    def _delay(self) -> None:
+        if self.stub.options.latency_ms > 0:
+            time.sleep(self.stub.options.latency_ms / 1000)
+
+    def _send_json(self, status: int, data: Any) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.stub.count("requests")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(options: StubOptions, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.stub = StubYouTube(options)  # type: ignore[attr-defined]
+    return server
+
+
+def redirect_hook(base_url: str) -> Callable:
+    """Request hook that sends chat_downloader's YouTube requests to ``base_url``."""
+    local = threading.local()
+
+    def hook(method: str, url: str, kwargs: Dict[str, Any], send: Callable[[], Any]) -> Any:
+        if not url.startswith(YOUTUBE_HOME):
+            return send()
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.request(method, base_url + url[len(YOUTUBE_HOME):], **kwargs)
+
+    return hook
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="YouTube チャット API のローカルスタブ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--messages", type=int, default=StubOptions.messages)
+    parser.add_argument("--duration", type=int, default=StubOptions.duration_seconds)
+    parser.add_argument("--page-size", type=int, default=StubOptions.page_size)
+    parser.add_argument("--member-ratio", type=float, default=StubOptions.member_ratio)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--timeout-ms", type=int, default=0, help="continuation の timeoutMs")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="continuation を 429 にする割合")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recorded", default=None, help="HTTP_CACHE_DIR の記録済みレスポンスを返す")
+    args = parser.parse_args()
+
+    server = serve(
+        StubOptions(
+            messages=args.messages,
+            duration_seconds=args.duration,
+            page_size=args.page_size,
+            member_ratio=args.member_ratio,
+            latency_ms=args.latency_ms,
+            timeout_ms=args.timeout_ms,
+            rate_429=args.rate_429,
+            seed=args.seed,
+            recorded_dir=args.recorded,
+        ),
+        host=args.host,
+        port=args.port,
+    )
+    host, port = server.server_address[:2]
+    print(f"listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
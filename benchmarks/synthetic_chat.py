@@ -0,0 +1,127 @@
+"""Synthetic chat replays for benchmarks.
+
+Messages follow a Poisson background rate with Gaussian shaped bursts on top,
+which is what the spike detector is looking for. Text is drawn from Japanese,
+emoji and English pools and the burst keyword is over-represented inside
+bursts, so keyword analyses find something too.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from app.services.chat_loader import ChatMessage
+
+JAPANESE_PHRASES = [
+    "草", "かわいい", "きたー", "すごい", "おつかれ", "ナイス", "えぐい", "神回",
+    "それな", "ありがとう", "初見です", "うますぎ", "やばい", "おはよう", "こんばんは",
+]
+EMOJI_PHRASES = ["😂", "🔥", "👏", "💯", "😭", "✨", "🎉", "❤️", "🙏", "🤣"]
+ENGLISH_PHRASES = ["lol", "nice", "gg", "lets go", "wow", "hi from brazil", "clip it", "888"]
+
+
+@dataclass(frozen=True)
+class Burst:
+    center_seconds: float
+    width_seconds: float
+    multiplier: float
+
+
+@dataclass
+class ChatProfile:
+    duration_seconds: int = 3 * 3600
+    burst_count: int = 20
+    burst_width_seconds: float = 20.0
+    burst_multiplier: float = 8.0
+    member_ratio: float = 0.15
+    # Weights for the Japanese, emoji and English pools.
+    text_mix: Tuple[float, float, float] = (0.6, 0.25, 0.15)
+    burst_keyword: str = "草"
+    burst_keyword_ratio: float = 0.5
+    bursts: List[Burst] = field(default_factory=list)
+
+
+def plan_bursts(profile: ChatProfile, rng: np.random.Generator) -> List[Burst]:
+    if profile.bursts:
+        return list(profile.bursts)
+    centers = np.sort(rng.uniform(0, profile.duration_seconds, profile.burst_count))
+    return [
+        Burst(float(center), profile.burst_width_seconds, profile.burst_multiplier)
+        for center in centers
+    ]
+
+
+def rate_profile(profile: ChatProfile, bursts: Sequence[Burst]) -> np.ndarray:
+    """Relative message rate for every second of the stream (background = 1)."""
+    seconds = np.arange(profile.duration_seconds, dtype=float)
+    rate = np.ones_like(seconds)
+    for burst in bursts:
+        rate += (burst.multiplier - 1) * np.exp(
+            -0.5 * ((seconds - burst.center_seconds) / max(burst.width_seconds, 1e-6)) ** 2
+        )
+    return rate
+
+
+def text_vocabulary(profile: ChatProfile, rng: np.random.Generator, size: int = 2048) -> List[str]:
+    """A fixed set of message texts; messages share these strings to keep memory flat."""
+    pools = (JAPANESE_PHRASES, EMOJI_PHRASES, ENGLISH_PHRASES)
+    weights = np.asarray(profile.text_mix, dtype=float)
+    weights = weights / weights.sum()
+    texts = []
+    for _ in range(size):
+        words = []
+        for _ in range(int(rng.integers(1, 5))):
+            pool = pools[int(rng.choice(len(pools), p=weights))]
+            words.append(pool[int(rng.integers(len(pool)))])
+        texts.append(" ".join(words))
+    return texts
+
+
+def generate_columns(
+    count: int, profile: ChatProfile | None = None, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Return sorted timestamps, a member mask and texts for ``count`` messages."""
+    profile = profile or ChatProfile()
+    rng = np.random.default_rng(seed)
+    bursts = plan_bursts(profile, rng)
+    rate = rate_profile(profile, bursts)
+    # A Poisson process conditioned on its total is multinomial over the
+    # seconds, which keeps the requested size exact.
+    per_second = rng.multinomial(count, rate / rate.sum())
+    seconds = np.repeat(np.arange(len(rate), dtype=float), per_second)
+    timestamps = np.sort(seconds + rng.random(seconds.size))
+    members = rng.random(timestamps.size) < profile.member_ratio
+
+    vocabulary = text_vocabulary(profile, rng)
+    text_ids = rng.integers(len(vocabulary), size=timestamps.size)
+    texts = [vocabulary[index] for index in text_ids.tolist()]
+    in_burst = _in_burst_mask(timestamps, bursts)
+    keyword_hits = in_burst & (rng.random(timestamps.size) < profile.burst_keyword_ratio)
+    keyword_text = f"{profile.burst_keyword}{profile.burst_keyword}"
+    for index in np.flatnonzero(keyword_hits).tolist():
+        texts[index] = keyword_text
+    return timestamps, members, texts
+
+
+def generate_messages(
+    count: int, profile: ChatProfile | None = None, seed: int = 0
+) -> List[ChatMessage]:
+    timestamps, members, texts = generate_columns(count, profile, seed)
+    return [
+        ChatMessage(timestamp_seconds=ts, message=text, is_member=member, message_id=f"m{index}")
+        for index, (ts, member, text) in enumerate(
+            zip(timestamps.tolist(), members.tolist(), texts)
+        )
+    ]
+
+
+def _in_burst_mask(timestamps: np.ndarray, bursts: Sequence[Burst]) -> np.ndarray:
+    mask = np.zeros(timestamps.size, dtype=bool)
+    for burst in bursts:
+        low = np.searchsorted(timestamps, burst.center_seconds - burst.width_seconds)
+        high = np.searchsorted(timestamps, burst.center_seconds + burst.width_seconds)
+        mask[low:high] = True
+    return mask
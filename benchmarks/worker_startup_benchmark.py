@@ -0,0 +1,142 @@
+"""Per-job start-up overhead of the RQ worker modes.
+
+Example::
+
+    python -m benchmarks.worker_startup_benchmark --jobs 20 --output bench-startup.json
+
+Each mode runs in a fresh interpreter so imports done for one mode do not
+leak into another:
+
+* ``fork-cold``: the stock ``rq worker``; the parent has only RQ imported and
+  every forked work horse imports the job code itself.
+* ``fork-preloaded``: ``app.preload_worker``; the parent runs
+  ``preload_worker_modules`` before forking.
+* ``in-process``: ``app.preload_worker --no-fork`` and ``app.concurrent_worker``;
+  jobs run in the worker process.
+
+Start-up is the time from dispatching a job until its function is resolved and
+about to run, which is what ``chat_job_startup_seconds`` reports in production.
+No Redis is needed; the probe job analyzes a small synthetic chat.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from .common import write_report
+
+MODES = ("fork-cold", "fork-preloaded", "in-process")
+JOB_FUNCTION = "app.worker.run_analysis_stage"
+
+
+def probe_job(dispatched_at: float) -> Tuple[float, float]:
+    """What a work horse does before and while running a job: resolve, then run."""
+    module_name, _, function_name = JOB_FUNCTION.rpartition(".")
+    getattr(importlib.import_module(module_name), function_name)
+    ready = time.perf_counter()
+
+    # pylint: disable=import-outside-toplevel
+    from app.services.analysis_pipeline import analyze_messages
+    from app.services.chat_loader import ChatMessage
+
+    messages = [
+        ChatMessage(
+            timestamp_seconds=index * 0.5, message="w" if index % 7 else "草", is_member=False
+        )
+        for index in range(5000)
+    ]
+    analyze_messages(
+        messages,
+        "草",
+        {"bucket_size_seconds": 5.0, "smoothing_window_seconds": 60.0},
+        {"min_prominence": 2.0, "min_gap_seconds": 10.0},
+    )
+    return ready - dispatched_at, time.perf_counter() - dispatched_at
+
+
+def run_child(mode: str, jobs: int) -> List[Dict[str, float]]:
+    # pylint: disable=import-outside-toplevel,unused-import
+    import rq  # the stock worker's parent has RQ loaded
+
+    if mode == "fork-preloaded":
+        from app.preload import preload_worker_modules
+
+        preload_worker_modules()
+
+    samples = []
+    for _ in range(jobs):
+        dispatched_at = time.perf_counter()
+        if mode == "in-process":
+            startup, total = probe_job(dispatched_at)
+        else:
+            startup, total = _run_forked(dispatched_at)
+        samples.append({"startup_seconds": startup, "job_seconds": total})
+    return samples
+
+
+def _run_forked(dispatched_at: float) -> Tuple[float, float]:
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            os.write(write_fd, json.dumps(probe_job(dispatched_at)).encode("utf-8"))
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as fh:
+        body = fh.read()
+    os.waitpid(pid, 0)
+    startup, total = json.loads(body)
+    return startup, total
+
+
+def bench_mode(mode: str, jobs: int) -> Dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.worker_startup_benchmark", "--child", mode,
+         "--jobs", str(jobs)],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    elapsed = time.perf_counter() - started
+    samples = json.loads(output)
+    startups = [sample["startup_seconds"] for sample in samples]
+    totals = [sample["job_seconds"] for sample in samples]
+    return {
+        "mode": mode,
+        "jobs": jobs,
+        "startup_median_ms": statistics.median(startups) * 1000,
+        "startup_max_ms": max(startups) * 1000,
+        "job_median_ms": statistics.median(totals) * 1000,
+        # Includes the interpreter start and, for fork-preloaded, the preload itself.
+        "process_seconds": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ワーカー方式ごとのジョブ起動オーバーヘッド")
+    parser.add_argument("--jobs", type=int, default=20, help="方式ごとのジョブ数")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help="結果 JSON の出力先 (省略時は標準出力)")
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.jobs)))
+        return
+    results = [bench_mode(mode, args.jobs) for mode in args.modes]
+    write_report("worker_startup", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()